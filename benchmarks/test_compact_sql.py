@@ -0,0 +1,93 @@
+"""
+Compares the SQL text length and the PostgreSQL parse time of statements
+compiled with and without short anonymous names. The parse time is the time
+of a ``PREPARE`` statement, which parses and analyzes the statement without
+planning it. Run with::
+
+    py.test benchmarks/test_compact_sql.py -s
+"""
+import timeit
+
+import pytest
+
+from sqlalchemy_json_api import compile_statement
+
+NUMBER = 100
+
+
+def measure(function, number=NUMBER):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def inline_params(connection, compiled):
+    cursor = connection.connection.cursor()
+    try:
+        sql = cursor.mogrify(compiled.string, compiled.params)
+    finally:
+        cursor.close()
+    if isinstance(sql, bytes):
+        sql = sql.decode(connection.dialect.encoding)
+    return sql
+
+
+def measure_parse_time(connection, sql):
+    def prepare():
+        connection.execute('PREPARE compact_benchmark AS ' + sql)
+        connection.execute('DEALLOCATE compact_benchmark')
+
+    return measure(prepare)
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestCompactSQLBenchmark(object):
+    @pytest.fixture(
+        params=[
+            ('article', 'articles', 'select_one', {}),
+            (
+                'article with includes',
+                'articles',
+                'select_one',
+                {'include': ['author', 'comments.author', 'category']}
+            ),
+            (
+                'users with includes',
+                'users',
+                'select',
+                {'include': ['groups', 'all_friends', 'comments.article']}
+            ),
+        ],
+        ids=lambda param: param[0]
+    )
+    def request_params(self, request, model_mapping):
+        name, type_, method, kwargs = request.param
+        return name, model_mapping[type_], method, kwargs
+
+    def test_compact_sql(self, query_builder, session, request_params):
+        name, model, method, kwargs = request_params
+        if method == 'select_one':
+            query = query_builder.select_one(model, 1, **kwargs)
+        else:
+            query = query_builder.select(model, **kwargs)
+        connection = session.connection()
+
+        results = []
+        for compact in (False, True):
+            sql = inline_params(
+                connection,
+                compile_statement(query, connection.dialect, compact)
+            )
+            results.append((
+                'compact' if compact else 'default',
+                len(sql.encode('utf-8')),
+                measure_parse_time(connection, sql)
+            ))
+
+        print('\n{0}'.format(name))
+        print('{0:<16}{1:>10}{2:>14}'.format('mode', 'bytes', 'parse (us)'))
+        for mode, size, parse_time in results:
+            print('{0:<16}{1:>10}{2:>14.1f}'.format(
+                mode,
+                size,
+                parse_time * 10 ** 6
+            ))
+        assert results[1][1] < results[0][1]
@@ -0,0 +1,82 @@
+"""
+Compares the payload size and the encode time of MessagePack and CBOR
+encoded documents with raw json documents selected with ``as_text``. Run
+with::
+
+    py.test benchmarks/test_encodings.py -s
+"""
+import timeit
+
+import pytest
+
+from sqlalchemy_json_api import encode_document
+
+NUMBER = 1000
+
+
+def measure(function, number=NUMBER):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestEncodingBenchmark(object):
+    @pytest.fixture(
+        params=[
+            (
+                'article with includes',
+                'articles',
+                {'include': ['author', 'comments.author', 'category']}
+            ),
+            ('all users', 'users', {}),
+        ],
+        ids=lambda param: param[0]
+    )
+    def request_params(self, request, model_mapping):
+        name, type_, kwargs = request.param
+        return name, model_mapping[type_], kwargs
+
+    def test_encodings(self, query_builder, session, request_params):
+        pytest.importorskip('msgpack')
+        pytest.importorskip('cbor2')
+        name, model, kwargs = request_params
+        text_query = query_builder.select(model, as_text=True, **kwargs)
+        bytes_query = query_builder.select(model, as_bytes=True, **kwargs)
+        raw = session.execute(bytes_query).scalar()
+
+        results = [
+            (
+                'json (as_text)',
+                len(session.execute(text_query).scalar().encode('utf-8')),
+                0.0,
+                measure(lambda: session.execute(text_query).scalar(), 100)
+            )
+        ]
+        for encoding in ('msgpack', 'cbor'):
+            results.append((
+                encoding,
+                len(encode_document(raw, encoding)),
+                measure(lambda: encode_document(raw, encoding)),
+                measure(
+                    lambda: encode_document(
+                        session.execute(bytes_query).scalar(),
+                        encoding
+                    ),
+                    100
+                )
+            ))
+
+        print('\n{0}'.format(name))
+        print('{0:<16}{1:>10}{2:>14}{3:>14}'.format(
+            'encoding',
+            'bytes',
+            'encode (us)',
+            'total (us)'
+        ))
+        for encoding, size, encode_time, total_time in results:
+            print('{0:<16}{1:>10}{2:>14.1f}{3:>14.1f}'.format(
+                encoding,
+                size,
+                encode_time * 10 ** 6,
+                total_time * 10 ** 6
+            ))
+            assert size > 0
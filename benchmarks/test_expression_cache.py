@@ -0,0 +1,77 @@
+"""
+Compares the build time of queries selecting hybrid and column property
+attributes with a fresh :class:`QueryBuilder` and with a QueryBuilder whose
+caches of hybrid property names and column properties are warm. Both build
+and adapt the hybrid expressions once per selectable. Run with::
+
+    py.test benchmarks/test_expression_cache.py -s
+"""
+import timeit
+
+import pytest
+
+from sqlalchemy_json_api import QueryBuilder
+
+NUMBER = 100
+
+
+def measure(function, number=NUMBER):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+class TestExpressionCacheBenchmark(object):
+    @pytest.fixture(
+        params=[
+            (
+                'articles',
+                'articles',
+                {
+                    'fields': {
+                        'articles': ['name', 'name_upper', 'comment_count']
+                    }
+                }
+            ),
+            (
+                'comments with included articles',
+                'comments',
+                {
+                    'fields': {
+                        'comments': ['content', 'article'],
+                        'articles': ['name', 'name_upper', 'comment_count']
+                    },
+                    'include': ['article']
+                }
+            ),
+            (
+                'users with included articles',
+                'users',
+                {'include': ['authored_articles.comments.article']}
+            ),
+        ],
+        ids=lambda param: param[0]
+    )
+    def request_params(self, request, model_mapping):
+        name, type_, kwargs = request.param
+        return name, model_mapping[type_], kwargs
+
+    def test_build_time(self, model_mapping, request_params):
+        name, model, kwargs = request_params
+        query_builder = QueryBuilder(model_mapping)
+
+        def build_fresh():
+            QueryBuilder(model_mapping).select(model, **kwargs)
+
+        def build_cached():
+            query_builder.select(model, **kwargs)
+
+        build_cached()
+        print('\n{0}'.format(name))
+        print('{0:<16}{1:>14}'.format('builder', 'build (ms)'))
+        for label, function in (
+            ('fresh', build_fresh),
+            ('cached', build_cached)
+        ):
+            print('{0:<16}{1:>14.3f}'.format(
+                label,
+                measure(function) * 10 ** 3
+            ))
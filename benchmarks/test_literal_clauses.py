@@ -0,0 +1,106 @@
+"""
+Compares the memory allocated while building queries with the shared pool
+of literal clauses for member names, resource types and link fragments and
+with an empty pool, where every key of every query is a new TextClause.
+Allocations are measured with :mod:`tracemalloc`. Run with::
+
+    py.test benchmarks/test_literal_clauses.py -s
+"""
+import pytest
+import sqlalchemy as sa
+
+from sqlalchemy_json_api import utils
+
+NUMBER = 20
+
+
+def measure_allocations(function, number=NUMBER):
+    tracemalloc = pytest.importorskip('tracemalloc')
+    function()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        # Keep the built queries alive so that their allocations are
+        # included in the second snapshot.
+        queries = [function() for _ in range(number)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    stats = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in stats)
+    count = sum(stat.count_diff for stat in stats)
+    del queries
+    return size / number, count / number
+
+
+def count_text_clauses(function, monkeypatch):
+    clauses = []
+    text = sa.text
+
+    def counting_text(*args, **kwargs):
+        clause = text(*args, **kwargs)
+        clauses.append(clause)
+        return clause
+
+    with monkeypatch.context() as patch:
+        patch.setattr(sa, 'text', counting_text)
+        function()
+    return len(clauses)
+
+
+class TestLiteralClausesBenchmark(object):
+    @pytest.fixture(
+        params=[
+            ('articles', 'articles', {}),
+            (
+                'article with includes',
+                'articles',
+                {'include': ['author', 'comments.author', 'category']}
+            ),
+            (
+                'users with includes',
+                'users',
+                {'include': ['groups', 'all_friends', 'comments.article']}
+            ),
+        ],
+        ids=lambda param: param[0]
+    )
+    def request_params(self, request, model_mapping):
+        name, type_, kwargs = request.param
+        return name, model_mapping[type_], kwargs
+
+    def test_allocations(
+        self,
+        monkeypatch,
+        query_builder,
+        request_params
+    ):
+        name, model, kwargs = request_params
+
+        def build():
+            return query_builder.select(model, **kwargs)
+
+        results = []
+        for pool in ('interned', 'empty'):
+            if pool == 'empty':
+                monkeypatch.setattr(utils, '_literal_clauses', {})
+            size, count = measure_allocations(build)
+            results.append(
+                (pool, count_text_clauses(build, monkeypatch), size, count)
+            )
+
+        print('\n{0}'.format(name))
+        print('{0:<12}{1:>14}{2:>14}{3:>14}'.format(
+            'pool',
+            'text clauses',
+            'kB / query',
+            'blocks'
+        ))
+        for pool, clauses, size, count in results:
+            print('{0:<12}{1:>14}{2:>14.1f}{3:>14.0f}'.format(
+                pool,
+                clauses,
+                size / 1024.0,
+                count
+            ))
+        assert results[0][1] < results[1][1]
@@ -31,6 +31,9 @@ extras_require = {
         'isort==4.2.5',
         'natsort==3.5.6',
     ],
+    'arrow': ['pyarrow>=0.15.0'],
+    'cbor': ['cbor2>=4.0.0'],
+    'msgpack': ['msgpack>=0.6.0'],
 }
 
 
@@ -50,7 +53,9 @@ setup(
     include_package_data=True,
     platforms='any',
     dependency_links=[],
+    python_requires='>=3.4',
     install_requires=[
+        'SQLAlchemy>=1.1',
         'SQLAlchemy-Utils>=0.32.19'
     ],
     extras_require=extras_require,
@@ -61,9 +66,8 @@ setup(
         'Operating System :: OS Independent',
         'Programming Language :: Python',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.4',
         'Programming Language :: Python :: 3.5',
         'Programming Language :: Python :: 3.6',
@@ -1,12 +1,42 @@
+from .assembler import DocumentAssembler, RowSetQuery  # noqa
+from .cache import CacheStore, LRUCacheStore, ResultCache  # noqa
+from .cardinality import infer_cardinality_hints  # noqa
+from .cost import CostEstimate, CostEstimator  # noqa
+from .encoding import encode_document  # noqa
 from .exc import (  # noqa
     IdPropertyNotFound,
+    InvalidDocument,
     InvalidField,
+    InvalidPagination,
+    RequestTooComplex,
     UnknownField,
     UnknownFieldKey,
-    UnknownModel
+    UnknownModel,
+    UnknownRelationship
 )
+from .explain import (  # noqa
+    assert_plan_shape,
+    explain,
+    get_server_version_key,
+    QueryPlan
+)
+from .export import ExportQuery  # noqa
 from .hybrids import CompositeId  # noqa
+from .indexes import find_missing_indexes, MissingIndex  # noqa
 from .query_builder import QueryBuilder, RESERVED_KEYWORDS  # noqa
-from .utils import assert_json_document  # noqa
+from .statements import (  # noqa
+    compile_statement,
+    CompiledStatement,
+    get_metadata_hash,
+    StatementCache
+)
+from .utils import (  # noqa
+    assert_json_document,
+    ConditionalResult,
+    execute_conditional,
+    parse_if_none_match,
+    splice_members
+)
+from .writer import BulkWriter  # noqa
 
 __version__ = '0.4.7'
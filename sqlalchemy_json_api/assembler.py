@@ -0,0 +1,220 @@
+from collections import namedtuple
+
+ResourceShape = namedtuple(
+    'ResourceShape',
+    ['type', 'attributes', 'relationships']
+)
+
+RelationshipShape = namedtuple(
+    'RelationshipShape',
+    ['key', 'type', 'uselist']
+)
+
+RowSet = namedtuple('RowSet', ['shape', 'query'])
+
+
+def _included_sort_key(resource):
+    return (resource['type'], resource['id'])
+
+
+class DocumentAssembler(object):
+    """
+    Builds JSON API documents from flat row sets. Each row starts with the
+    resource id followed by the attribute values and the related resource ids
+    in the order given by the :class:`ResourceShape` of the row set.
+
+    :param base_url:
+        Base url to be used for building links objects. By default this is
+        `None` indicating that no link objects will be built.
+    :param sort_included:
+        Whether or not to sort included objects by type and id.
+    """
+    def __init__(self, base_url=None, sort_included=True):
+        self.base_url = base_url
+        self.sort_included = sort_included
+
+    def build_link(self, type_, id, postfix=''):
+        return '{0}{1}/{2}{3}'.format(self.base_url, type_, id, postfix)
+
+    def build_relationship(self, resource, relationship, value):
+        if relationship.uselist:
+            data = [
+                {'id': related_id, 'type': relationship.type}
+                for related_id in value
+            ]
+        elif value is None:
+            data = None
+        else:
+            data = {'id': value, 'type': relationship.type}
+        result = {'data': data}
+        if self.base_url:
+            result['links'] = {
+                'self': self.build_link(
+                    resource['type'],
+                    resource['id'],
+                    '/relationships/{0}'.format(relationship.key)
+                ),
+                'related': self.build_link(
+                    resource['type'],
+                    resource['id'],
+                    '/{0}'.format(relationship.key)
+                )
+            }
+        return result
+
+    def build_resource(self, shape, row, ids_only=False):
+        resource = {'id': row[0], 'type': shape.type}
+        if ids_only:
+            return resource
+        offset = len(shape.attributes) + 1
+        if shape.attributes:
+            resource['attributes'] = dict(
+                zip(shape.attributes, row[1:offset])
+            )
+        if shape.relationships:
+            resource['relationships'] = dict(
+                (
+                    relationship.key,
+                    self.build_relationship(resource, relationship, value)
+                )
+                for relationship, value
+                in zip(shape.relationships, row[offset:])
+            )
+        if self.base_url:
+            resource['links'] = {
+                'self': self.build_link(resource['type'], resource['id'])
+            }
+        return resource
+
+    def build_included(self, included):
+        resources = {}
+        for shape, rows in included:
+            for row in rows:
+                key = (shape.type, row[0])
+                if key not in resources:
+                    resources[key] = self.build_resource(shape, row)
+        resources = list(resources.values())
+        if self.sort_included:
+            resources.sort(key=_included_sort_key)
+        return resources
+
+    def assemble(
+        self,
+        shape,
+        rows,
+        included=None,
+        multiple=True,
+        ids_only=False,
+        links=None
+    ):
+        """
+        Assemble a JSON API document.
+
+        :param shape: The :class:`ResourceShape` of the main rows.
+        :param rows: The main rows.
+        :param included:
+            List of ``(shape, rows)`` pairs for included resources or `None`
+            if the document has no included member.
+        :param multiple:
+            Whether or not the primary data is an array of resources.
+        :param ids_only:
+            Whether or not to render only resource identifiers as primary
+            data.
+        :param links: A dictionary of top level links.
+        """
+        data = [self.build_resource(shape, row, ids_only) for row in rows]
+        document = {'data': data if multiple else (data[0] if data else None)}
+        if included is not None:
+            document['included'] = self.build_included(included)
+        if links:
+            document['links'] = dict(links)
+        return document
+
+
+class RowSetQuery(object):
+    """
+    Flat row queries returned by :meth:`QueryBuilder.select_rows` and
+    :meth:`QueryBuilder.select_one_rows`. The main row set and the included
+    row sets are selected side by side in a single statement (:attr:`query`)
+    so that all rows are read from the same snapshot and the main query is
+    evaluated only once. Call :meth:`execute` to run the query and assemble
+    the JSON API document in Python.
+    """
+    def __init__(
+        self,
+        assembler,
+        query,
+        main,
+        included=None,
+        multiple=True,
+        ids_only=False,
+        links=None
+    ):
+        self.assembler = assembler
+        self.query = query
+        self.main = main
+        self.included = included
+        self.multiple = multiple
+        self.ids_only = ids_only
+        self.links = links
+
+    def split_rows(self, rows):
+        """
+        Split the rows of :attr:`query` into the main rows and the rows of
+        each included row set. Each row of the query has the columns of the
+        main row set followed by the row number of the main row and the
+        columns of each included row set. Only the columns of the row set
+        the row belongs to are not `NULL`.
+
+        :param rows: The rows returned by :attr:`query`.
+        """
+        row_sets = [self.main] + list(self.included or [])
+        slices = []
+        offset = 0
+        for row_set in row_sets:
+            width = (
+                len(row_set.shape.attributes) +
+                len(row_set.shape.relationships) +
+                1
+            )
+            slices.append((offset, offset + width))
+            offset += width
+            if row_set is self.main:
+                offset += 1
+        split = [[] for row_set in row_sets]
+        for row in rows:
+            row = tuple(row)
+            for row_set_rows, (start, stop) in zip(split, slices):
+                if row[start] is not None:
+                    row_set_rows.append(row[start:stop])
+                    break
+        return split[0], split[1:]
+
+    def assemble(self, rows, included_rows=None):
+        if not self.multiple and not rows:
+            return None
+        included = None
+        if self.included is not None:
+            included = [
+                (row_set.shape, row_set_rows)
+                for row_set, row_set_rows
+                in zip(self.included, included_rows or [])
+            ]
+        return self.assembler.assemble(
+            self.main.shape,
+            rows,
+            included=included,
+            multiple=self.multiple,
+            ids_only=self.ids_only,
+            links=self.links
+        )
+
+    def execute(self, bind):
+        """
+        Execute the query with given bind (a connection or a session) and
+        return the assembled document.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        """
+        rows = bind.execute(self.query).fetchall()
+        return self.assemble(*self.split_rows(rows))
@@ -0,0 +1,343 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from sqlalchemy_utils.functions import get_mapper
+
+from .query_builder import RelationshipsExpression
+
+# Parameters of the select methods that change the result type. Cached
+# documents are always selected as text.
+RESULT_TYPE_PARAMETERS = ('as_text', 'as_bytes', 'etag')
+
+
+class CacheStore(object):
+    """
+    Interface for result cache stores. External stores (for example
+    memcached or redis clients) can be used with :class:`ResultCache` by
+    implementing :meth:`get`, :meth:`set` and :meth:`delete`. Stored values
+    are always text.
+    """
+    def get(self, key):
+        """
+        Return the value stored with given key or `None` if the key is not
+        found.
+        """
+        raise NotImplementedError()
+
+    def get_many(self, keys):
+        """
+        Return a list of values stored with given keys. Stores supporting
+        batch reads should override this method.
+        """
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, ttl=None):
+        """
+        Store given value with given key. If `ttl` is `None` the store
+        default time to live is used.
+        """
+        raise NotImplementedError()
+
+    def delete(self, key):
+        raise NotImplementedError()
+
+
+class LRUCacheStore(CacheStore):
+    """
+    In-process least recently used cache store with optional time to live.
+
+    ::
+
+        store = LRUCacheStore(max_size=1000, ttl=60)
+
+    :param max_size: Maximum number of stored values.
+    :param ttl:
+        Default time to live of stored values in seconds. By default values
+        never expire.
+    :param clock: A function returning the current time in seconds.
+    """
+    def __init__(self, max_size=1024, ttl=None, clock=time.time):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def stats(self):
+        """
+        A dictionary of cache metrics: number of hits, misses, evictions,
+        expirations and the current size of the store. The metrics cover all
+        keys of the store. When used by :class:`ResultCache` these include
+        the generation tokens, see :attr:`ResultCache.stats` for document
+        metrics.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'size': len(self._values)
+        }
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value, expires_at = self._values.pop(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires_at is not None and expires_at <= self.clock():
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._values[key] = (value, expires_at)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires_at = None if ttl is None else self.clock() + ttl
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = (value, expires_at)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class ResultCache(object):
+    """
+    Caches the raw json documents built by a :class:`QueryBuilder`. Cached
+    documents are keyed on the request shape (model, id, fields, include,
+    sort, limit, offset and links) and a user supplied version key.
+
+    ::
+
+        cache = ResultCache(query_builder, LRUCacheStore(ttl=60))
+
+        document = cache.select_one(
+            session,
+            Article,
+            1,
+            include=['comments'],
+            version=article_version
+        )
+
+        # After updating article 1
+        cache.invalidate('articles', 1)
+
+    Invalidation is based on generation tokens stored in the same store as
+    the documents, so it works across processes with external stores.
+    Invalidating a resource type invalidates every cached document whose
+    primary data, included resources or resource linkage of relationships
+    are of that type. Invalidating a
+    single resource invalidates only the cached :meth:`select_one` documents
+    of that resource.
+
+    :param query_builder: The :class:`QueryBuilder` used for building queries.
+    :param store:
+        A :class:`CacheStore` instance. By default an :class:`LRUCacheStore`
+        is used.
+    :param ttl:
+        Time to live of cached documents in seconds. By default the store
+        default is used.
+    :param prefix: Prefix for all keys in the store.
+    """
+    def __init__(
+        self,
+        query_builder,
+        store=None,
+        ttl=None,
+        prefix='sqlalchemy-json-api:'
+    ):
+        self.query_builder = query_builder
+        self.store = LRUCacheStore() if store is None else store
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def stats(self):
+        """
+        A dictionary of the number of cached document hits and misses.
+        Lookups of generation tokens are not counted.
+        """
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def generation_key(self, resource_type, id=None):
+        if id is None:
+            return '{0}generation:{1}'.format(self.prefix, resource_type)
+        return '{0}generation:{1}:{2}'.format(self.prefix, resource_type, id)
+
+    def get_generations(self, keys):
+        generations = self.store.get_many(keys)
+        for index, (key, generation) in enumerate(zip(keys, generations)):
+            if generation is None:
+                # A missing generation may have been evicted, so a new one is
+                # always generated instead of falling back to a constant.
+                generation = uuid.uuid4().hex
+                self.store.set(key, generation)
+                generations[index] = generation
+        return generations
+
+    def get_types(self, model, include, fields=None):
+        """
+        Return the sorted resource types a document depends on: the types of
+        the primary data and included resources and the types of the
+        resource linkage of the relationships rendered for each of them.
+        """
+        models = set([get_mapper(model).class_])
+        for path in include or []:
+            for subpath, relationships in (
+                self.query_builder.get_include_paths(model, path)
+            ):
+                models.add(relationships[-1].mapper.class_)
+        types = set()
+        for model in models:
+            types.add(self.query_builder.get_resource_type(model))
+            for relationship in RelationshipsExpression(
+                self.query_builder,
+                model,
+                model
+            ).get_relationship_properties(fields or {}):
+                types.add(
+                    self.query_builder.get_resource_type(
+                        relationship.mapper.class_
+                    )
+                )
+        return sorted(types)
+
+    def build_key(self, method, model, id=None, version=None, **kwargs):
+        if 'from_obj' in kwargs:
+            raise TypeError(
+                'ResultCache does not support from_obj parameter. Use the '
+                'version parameter for distinguishing documents instead.'
+            )
+        for key in RESULT_TYPE_PARAMETERS:
+            if key in kwargs:
+                raise ValueError(
+                    'ResultCache does not support {0} parameter. Cached '
+                    'documents are always returned as text.'.format(key)
+                )
+        resource_type = self.query_builder.get_resource_type(model)
+        generation_keys = [
+            self.generation_key(type_)
+            for type_ in self.get_types(
+                model,
+                kwargs.get('include'),
+                kwargs.get('fields')
+            )
+        ]
+        if id is not None:
+            generation_keys.append(self.generation_key(resource_type, id))
+        shape = json.dumps(
+            [
+                method,
+                resource_type,
+                None if id is None else str(id),
+                version,
+                kwargs,
+                self.get_generations(generation_keys)
+            ],
+            sort_keys=True,
+            default=str
+        )
+        return '{0}document:{1}'.format(
+            self.prefix,
+            hashlib.sha1(shape.encode('utf-8')).hexdigest()
+        )
+
+    def _fetch(self, bind, key, build_query):
+        document = self.store.get(key)
+        if document is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            document = bind.execute(build_query()).scalar()
+            if document is not None:
+                self.store.set(key, document, self.ttl)
+        return document
+
+    def select(self, bind, model, version=None, **kwargs):
+        """
+        Return the raw json document for :meth:`QueryBuilder.select` query
+        with given parameters, using the cached document if available. The
+        `from_obj`, `as_text`, `as_bytes` and `etag` parameters are not
+        supported.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param model: The root model to build the select query from.
+        :param version:
+            A user supplied data version key, for example the latest update
+            timestamp of the selected resources.
+        """
+        key = self.build_key('select', model, version=version, **kwargs)
+        return self._fetch(
+            bind,
+            key,
+            lambda: self.query_builder.select(model, as_text=True, **kwargs)
+        )
+
+    def select_one(self, bind, model, id, version=None, **kwargs):
+        """
+        Return the raw json document for :meth:`QueryBuilder.select_one`
+        query with given parameters, using the cached document if available.
+        Returns `None` if the resource does not exist. The `from_obj`,
+        `as_text`, `as_bytes` and `etag` parameters are not supported.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param model: The root model to build the select query from.
+        :param id: The id of the resource to select.
+        :param version:
+            A user supplied data version key, for example the update
+            timestamp of the selected resource.
+        """
+        key = self.build_key('select_one', model, id, version, **kwargs)
+        return self._fetch(
+            bind,
+            key,
+            lambda: self.query_builder.select_one(
+                model,
+                id,
+                as_text=True,
+                **kwargs
+            )
+        )
+
+    def invalidate(self, resource_type, id=None):
+        """
+        Invalidate cached documents by resource type or by single resource.
+
+        :param resource_type:
+            The resource type, for example 'articles', or the model class.
+        :param id:
+            The id of the resource. If `None` all documents involving given
+            resource type are invalidated.
+        """
+        if resource_type not in self.query_builder.resource_registry.by_type:
+            resource_type = self.query_builder.get_resource_type(
+                resource_type
+            )
+        self.store.set(
+            self.generation_key(resource_type, id),
+            uuid.uuid4().hex
+        )
@@ -0,0 +1,83 @@
+import math
+
+import sqlalchemy as sa
+from sqlalchemy_utils.functions import get_mapper
+
+STATISTICS_QUERY = sa.text('''
+    SELECT pg_stats.n_distinct, pg_stats.null_frac, pg_class.reltuples
+    FROM pg_stats
+    JOIN pg_namespace ON pg_namespace.nspname = pg_stats.schemaname
+    JOIN pg_class
+        ON pg_class.relnamespace = pg_namespace.oid
+        AND pg_class.relname = pg_stats.tablename
+    WHERE pg_stats.schemaname = coalesce(:schema, current_schema())
+    AND pg_stats.tablename = :table
+    AND pg_stats.attname = :column
+''')
+
+
+def get_referencing_column(relationship):
+    """
+    Return the column referencing the parent of given to-many relationship,
+    which is the foreign key column of the related table or the secondary
+    table, or `None` if the relationship is not based on a single foreign
+    key column of a table.
+    """
+    pairs = relationship.synchronize_pairs
+    if not relationship.uselist or len(pairs) != 1:
+        return None
+    column = pairs[0][1]
+    if not isinstance(column.table, sa.Table):
+        return None
+    return column
+
+
+def estimate_cardinality(n_distinct, null_frac, reltuples):
+    if reltuples <= 0 or not n_distinct:
+        return None
+    if n_distinct < 0:
+        n_distinct = -n_distinct * reltuples
+    return int(math.ceil(reltuples * (1 - null_frac) / n_distinct))
+
+
+def infer_cardinality_hints(bind, query_builder):
+    """
+    Infer the cardinality hints of the to-many relationships of the models
+    registered to given :class:`QueryBuilder` from the PostgreSQL planner
+    statistics. The cardinality of a relationship is estimated as the
+    average number of rows per distinct value of the foreign key column
+    referencing the parent, so the statistics should be up to date (see
+    ``ANALYZE``)::
+
+        query_builder.cardinality_hints.update(
+            infer_cardinality_hints(session, query_builder)
+        )
+
+    Relationships without statistics or with other than a single foreign key
+    column in a table, such as view-only relationships with custom join
+    conditions, are left out.
+
+    :param bind: A SQLAlchemy Connection or Session object.
+    :param query_builder: The :class:`QueryBuilder` of the models.
+    """
+    hints = {}
+    registry = query_builder.resource_registry
+    for type_, model in sorted(registry.by_type.items()):
+        for relationship in get_mapper(model).relationships:
+            column = get_referencing_column(relationship)
+            if column is None:
+                continue
+            row = bind.execute(
+                STATISTICS_QUERY,
+                {
+                    'schema': column.table.schema,
+                    'table': column.table.name,
+                    'column': column.name
+                }
+            ).first()
+            if row is None:
+                continue
+            cardinality = estimate_cardinality(*row)
+            if cardinality is not None:
+                hints['{0}.{1}'.format(type_, relationship.key)] = cardinality
+    return hints
@@ -0,0 +1,177 @@
+from collections import namedtuple
+
+import sqlalchemy as sa
+
+from .exc import RequestTooComplex
+from .query_builder import AttributesExpression, RelationshipsExpression
+
+CostEstimate = namedtuple('CostEstimate', ['total', 'by_type', 'branches'])
+
+IncludeBranch = namedtuple('IncludeBranch', ['path', 'type', 'rows', 'cost'])
+
+
+class CostEstimator(object):
+    """
+    Static cost model over the shape of a request. The cost of selecting
+    resources of a type is the estimated number of resources multiplied by
+    the width of a resource, which is the number of selected attributes plus
+    the estimated number of related resources of each selected relationship.
+
+    The estimated number of resources is one for single resource requests,
+    the limit for paginated requests and `default_rows` otherwise. Each
+    included relationship path is a branch of the included resources union
+    and multiplies the number of resources of its parent path by the
+    estimated number of related resources: one for to-one relationships, the
+    cardinality hint for to-many relationships with a hint and
+    `to_many_rows` for other to-many relationships.
+
+    When given to a :class:`QueryBuilder` the cost of every request is
+    checked while building the query, so overly complex requests are
+    rejected before any SQL is sent::
+
+        query_builder = QueryBuilder(
+            model_mapping,
+            cost_estimator=CostEstimator(
+                max_cost=100000,
+                max_type_costs={'comments': 20000}
+            )
+        )
+
+        query_builder.cost_estimator.estimate(
+            query_builder,
+            Article,
+            include=['comments.author']
+        ).total
+
+    :param max_cost:
+        The global budget. If the total cost of a request exceeds it,
+        :meth:`check` raises :class:`.RequestTooComplex`.
+    :param max_type_costs:
+        A dictionary of budgets per resource type.
+    :param default_rows:
+        The estimated number of resources of requests without a limit.
+    :param to_many_rows:
+        The estimated number of related resources of a to-many relationship.
+    """
+    def __init__(
+        self,
+        max_cost=None,
+        max_type_costs=None,
+        default_rows=1000,
+        to_many_rows=10
+    ):
+        self.max_cost = max_cost
+        self.max_type_costs = max_type_costs or {}
+        self.default_rows = default_rows
+        self.to_many_rows = to_many_rows
+
+    def get_rows(self, query_builder, model, relationship):
+        """
+        Return the estimated number of related resources per resource of
+        given relationship. The cardinality hint of the relationship is used
+        if given, see :meth:`QueryBuilder.get_cardinality`.
+        """
+        cardinality = query_builder.get_cardinality(model, relationship)
+        return self.to_many_rows if cardinality is None else cardinality
+
+    def get_width(self, query_builder, model, fields):
+        args = (query_builder, model, sa.orm.query.Query(model).subquery())
+        return (
+            len(AttributesExpression(*args).get_model_fields(fields)) +
+            sum(
+                self.get_rows(query_builder, model, relationship)
+                for relationship in RelationshipsExpression(
+                    *args
+                ).get_relationship_properties(fields)
+            )
+        )
+
+    def estimate(
+        self,
+        query_builder,
+        model,
+        fields=None,
+        include=None,
+        limit=None,
+        multiple=True
+    ):
+        """
+        Return a :class:`CostEstimate` with the total cost, the costs per
+        resource type and the included resources union branches of given
+        request.
+
+        :param query_builder: The :class:`QueryBuilder` of the request.
+        :param model: The root model of the request.
+        :param fields: A mapping of fields.
+        :param include: List of dot-separated relationship paths.
+        :param limit: The limit of the root resources.
+        :param multiple: Whether or not the request selects a collection.
+        """
+        fields = fields or {}
+        if not multiple:
+            rows = 1
+        elif limit is not None:
+            rows = limit
+        else:
+            rows = self.default_rows
+        resource_type = query_builder.get_resource_type(model)
+        by_type = {
+            resource_type: rows * self.get_width(query_builder, model, fields)
+        }
+        branches = []
+        for path in include or []:
+            branch_rows = rows
+            for subpath, relationships in (
+                query_builder.get_include_paths(model, path)
+            ):
+                relationship = relationships[-1].property
+                branch_rows *= self.get_rows(
+                    query_builder,
+                    relationships[-1].class_,
+                    relationship
+                )
+                related_model = relationship.mapper.class_
+                branch = IncludeBranch(
+                    path=subpath,
+                    type=query_builder.get_resource_type(related_model),
+                    rows=branch_rows,
+                    cost=branch_rows * self.get_width(
+                        query_builder,
+                        related_model,
+                        fields
+                    )
+                )
+                branches.append(branch)
+                by_type[branch.type] = by_type.get(branch.type, 0) + (
+                    branch.cost
+                )
+        return CostEstimate(
+            total=sum(by_type.values()),
+            by_type=by_type,
+            branches=branches
+        )
+
+    def check(self, query_builder, model, **kwargs):
+        """
+        Estimate the cost of given request and raise
+        :class:`.RequestTooComplex` if it exceeds the global budget or the
+        budget of a resource type. Accepts the same arguments as
+        :meth:`estimate`.
+        """
+        if self.max_cost is None and not self.max_type_costs:
+            return
+        estimate = self.estimate(query_builder, model, **kwargs)
+        if self.max_cost is not None and estimate.total > self.max_cost:
+            raise RequestTooComplex(
+                'Estimated request cost {0} exceeds the maximum cost '
+                '{1}.'.format(estimate.total, self.max_cost),
+                estimate
+            )
+        for type_, cost in sorted(estimate.by_type.items()):
+            max_cost = self.max_type_costs.get(type_)
+            if max_cost is not None and cost > max_cost:
+                raise RequestTooComplex(
+                    "Estimated cost {0} of '{1}' resources exceeds the "
+                    "maximum cost {2}.".format(cost, type_, max_cost),
+                    estimate
+                )
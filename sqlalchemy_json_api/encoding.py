@@ -0,0 +1,72 @@
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+
+ENCODINGS = ('msgpack', 'cbor')
+
+MEDIA_TYPES = {
+    'msgpack': 'application/msgpack',
+    'cbor': 'application/cbor'
+}
+
+
+def get_encoder(encoding):
+    if encoding == 'msgpack':
+        if msgpack is None:
+            raise ImportError(
+                "'msgpack' is required for MessagePack encoding. Install it "
+                "with 'pip install SQLAlchemy-JSON-API[msgpack]'."
+            )
+        return lambda document: msgpack.packb(document, use_bin_type=True)
+    if encoding == 'cbor':
+        if cbor2 is None:
+            raise ImportError(
+                "'cbor2' is required for CBOR encoding. Install it with "
+                "'pip install SQLAlchemy-JSON-API[cbor]'."
+            )
+        return cbor2.dumps
+    raise ValueError(
+        'Unknown encoding {0!r}. Encoding must be one of {1}.'.format(
+            encoding,
+            ', '.join(ENCODINGS)
+        )
+    )
+
+
+def encode_document(document, encoding='msgpack'):
+    """
+    Encode given JSON API document to MessagePack or CBOR. The document can
+    be given as a dictionary or as raw json returned by a query built with
+    the ``as_text`` or ``as_bytes`` parameter. Raw json is parsed with a
+    single :func:`json.loads` call, so selecting the document with
+    ``as_bytes`` and encoding it skips the json typecasting of the driver::
+
+        query = query_builder.select_one(Article, 1, as_bytes=True)
+        payload = encode_document(
+            session.execute(query).scalar(),
+            encoding='cbor'
+        )
+
+    The structure of the document is preserved as is. Returns `None` if the
+    document is `None`.
+
+    :param document: The JSON API document.
+    :param encoding: ``'msgpack'`` or ``'cbor'``.
+    """
+    encode = get_encoder(encoding)
+    if document is None:
+        return None
+    if isinstance(document, (bytes, bytearray, memoryview)):
+        document = bytes(document).decode('utf-8')
+    if isinstance(document, str):
+        document = json.loads(document)
+    return encode(document)
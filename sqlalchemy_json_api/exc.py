@@ -34,9 +34,47 @@ class UnknownFieldKey(QueryBuilderException):
     pass
 
 
+class InvalidDocument(QueryBuilderException):
+    """
+    This error is raised when the JSON API document given to one of the
+    insert or update methods of QueryBuilder is not a valid resource
+    document for the given model.
+    """
+    pass
+
+
 class IdPropertyNotFound(QueryBuilderException):
     """
     This error is raised when one of the referenced models in QueryBuilder
     query building process does not have an id property.
     """
     pass
+
+
+class UnknownRelationship(QueryBuilderException):
+    """
+    This error is raised when the given include path or relationship key
+    refers to a relationship that the model does not have.
+    """
+    pass
+
+
+class InvalidPagination(QueryBuilderException):
+    """
+    This error is raised when the pagination parameters given to one of the
+    select_* methods of QueryBuilder are not supported for the related
+    resources, for example keyset pagination of resources with a composite
+    id.
+    """
+    pass
+
+
+class RequestTooComplex(QueryBuilderException):
+    """
+    This error is raised when the estimated cost of a request exceeds the
+    budget of the cost estimator of QueryBuilder. The cost estimate is
+    available as the `estimate` attribute.
+    """
+    def __init__(self, message, estimate):
+        super(RequestTooComplex, self).__init__(message)
+        self.estimate = estimate
@@ -0,0 +1,277 @@
+import json
+import os
+from collections import namedtuple
+
+import sqlalchemy as sa
+
+PlanNode = namedtuple(
+    'PlanNode',
+    [
+        'node_type',
+        'relation',
+        'alias',
+        'parent_relationship',
+        'depth',
+        'plan_rows',
+        'actual_rows',
+        'actual_loops'
+    ]
+)
+
+SUBPLAN_RELATIONSHIPS = ('SubPlan', 'InitPlan')
+
+
+def explain(bind, query, analyze=True, buffers=True):
+    """
+    Run ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` for given query and
+    return a :class:`QueryPlan`::
+
+        query = query_builder.select(
+            Article,
+            include=['comments.author']
+        )
+        plan = explain(session, query)
+        plan.subplan_count
+        plan.seq_scans
+        plan.summarize(query_builder)
+
+    Note that with `analyze` the statement is executed, so data modifying
+    statements (for example those built by :meth:`QueryBuilder.insert`)
+    should be explained in a transaction that is rolled back.
+
+    :param bind: A SQLAlchemy Connection or Session object.
+    :param query: The query to explain.
+    :param analyze: Whether or not to execute the query and collect timings.
+    :param buffers: Whether or not to collect buffer usage.
+    """
+    if isinstance(bind, sa.orm.Session):
+        bind = bind.connection()
+    statement = getattr(query, 'statement', query)
+    compiled = statement.compile(dialect=bind.dialect)
+    options = [
+        option for option, enabled in (
+            ('ANALYZE', analyze),
+            ('BUFFERS', buffers and analyze),
+            ('FORMAT JSON', True)
+        )
+        if enabled
+    ]
+    result = bind.execute(
+        'EXPLAIN ({0}) {1}'.format(', '.join(options), compiled),
+        compiled.params
+    ).scalar()
+    if not isinstance(result, list):
+        result = json.loads(result)
+    return QueryPlan(result[0])
+
+
+class QueryPlan(object):
+    """
+    JSON format query plan returned by :func:`explain`.
+
+    :param result: A single query plan of an ``EXPLAIN (FORMAT JSON)`` result.
+    """
+    def __init__(self, result):
+        self.result = result
+        self.plan = result['Plan']
+        self.planning_time = result.get('Planning Time')
+        self.execution_time = result.get('Execution Time')
+
+    @property
+    def nodes(self):
+        """
+        List of :class:`PlanNode` objects in depth-first order.
+        """
+        nodes = []
+        stack = [(self.plan, 0)]
+        while stack:
+            plan, depth = stack.pop()
+            nodes.append(PlanNode(
+                node_type=plan['Node Type'],
+                relation=plan.get('Relation Name'),
+                alias=plan.get('Alias'),
+                parent_relationship=plan.get('Parent Relationship'),
+                depth=depth,
+                plan_rows=plan['Plan Rows'],
+                actual_rows=plan.get('Actual Rows'),
+                actual_loops=plan.get('Actual Loops')
+            ))
+            stack.extend(
+                (subplan, depth + 1)
+                for subplan in reversed(plan.get('Plans', []))
+            )
+        return nodes
+
+    @property
+    def subplan_count(self):
+        """
+        Number of correlated subplans and init plans in the plan.
+        """
+        return sum(
+            1 for node in self.nodes
+            if node.parent_relationship in SUBPLAN_RELATIONSHIPS
+        )
+
+    @property
+    def seq_scans(self):
+        """
+        Sorted list of the relation names scanned sequentially.
+        """
+        return sorted(
+            node.relation for node in self.nodes
+            if node.node_type == 'Seq Scan'
+        )
+
+    @property
+    def estimate_errors(self):
+        """
+        List of ``(node, error)`` tuples sorted by the error, largest first.
+        The error is the ratio between the planner row estimate and the
+        actual number of rows per loop. Available only for analyzed plans.
+        """
+        return sorted(
+            (
+                (node, estimate_error(node.plan_rows, node.actual_rows))
+                for node in self.nodes
+                if node.actual_rows is not None
+            ),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+    @property
+    def shape(self):
+        """
+        The plan tree as a list of lines with the node types, the scanned
+        relations and the subplan relationships. Costs, timings and row
+        counts are left out, so the shape of a query plan changes only when
+        the plan itself changes.
+        """
+        return [
+            '{0}{1}{2}{3}'.format(
+                '  ' * node.depth,
+                node.node_type,
+                ' on {0}'.format(node.relation) if node.relation else '',
+                ' ({0})'.format(node.parent_relationship)
+                if node.parent_relationship in SUBPLAN_RELATIONSHIPS else
+                ''
+            )
+            for node in self.nodes
+        ]
+
+    def summarize(self, query_builder=None):
+        """
+        Return a dictionary of scan statistics per scanned relation. If a
+        query builder is given, the relations of registered models are keyed
+        by the resource type (for example the resource type of an included
+        relationship) instead of the table name. Each value is a dictionary
+        with the number of scans, sequential scans, total loops, the total
+        number of actual rows and the largest row estimate error.
+
+        :param query_builder: The :class:`QueryBuilder` used for the query.
+        """
+        keys = {}
+        if query_builder is not None:
+            registry = query_builder.resource_registry
+            for type_, model in registry.by_type.items():
+                keys[sa.inspect(model).local_table.name] = type_
+        summary = {}
+        for node in self.nodes:
+            if node.relation is None:
+                continue
+            stats = summary.setdefault(
+                keys.get(node.relation, node.relation),
+                {
+                    'scans': 0,
+                    'seq_scans': 0,
+                    'loops': 0,
+                    'rows': 0,
+                    'max_estimate_error': None
+                }
+            )
+            stats['scans'] += 1
+            if node.node_type == 'Seq Scan':
+                stats['seq_scans'] += 1
+            if node.actual_rows is not None:
+                stats['loops'] += node.actual_loops
+                stats['rows'] += node.actual_rows * node.actual_loops
+                stats['max_estimate_error'] = max(
+                    stats['max_estimate_error'] or 0,
+                    estimate_error(node.plan_rows, node.actual_rows)
+                )
+        return summary
+
+
+def estimate_error(plan_rows, actual_rows):
+    return (
+        float(max(plan_rows, actual_rows)) /
+        max(min(plan_rows, actual_rows), 1)
+    )
+
+
+def get_server_version_key(bind):
+    """
+    Return the major version of the PostgreSQL server of given bind as a
+    string, for example ``'16'`` or ``'9.6'``. Query plan snapshots can be
+    stored in directories named after it.
+
+    :param bind: A SQLAlchemy Engine, Connection or Session object.
+    """
+    if isinstance(bind, sa.orm.Session):
+        bind = bind.connection()
+    version = bind.dialect.server_version_info
+    if version is None:
+        bind.connect().close()
+        version = bind.dialect.server_version_info
+    if version[0] >= 10:
+        return str(version[0])
+    return '{0}.{1}'.format(version[0], version[1])
+
+
+def assert_plan_shape(plan, path, update=None):
+    """
+    Assert that the shape of given :class:`QueryPlan` matches the snapshot
+    stored in given file. If `update` is true the snapshot is written
+    instead. By default `update` is read from the
+    ``SQLALCHEMY_JSON_API_UPDATE_PLANS`` environment variable. A missing
+    snapshot fails the assertion unless `update` is true.
+
+    Plan shapes differ between PostgreSQL versions, so snapshots should be
+    stored per server version, see :func:`get_server_version_key`::
+
+        def test_article_with_comments(session, query_builder):
+            plan = explain(
+                session,
+                query_builder.select(Article, include=['comments'])
+            )
+            assert_plan_shape(plan, os.path.join(
+                'tests/plans',
+                get_server_version_key(session),
+                'article_comments.txt'
+            ))
+
+    :param plan: A :class:`QueryPlan`.
+    :param path: Path of the snapshot file.
+    :param update: Whether or not to rewrite the snapshot.
+    """
+    if update is None:
+        update = bool(os.environ.get('SQLALCHEMY_JSON_API_UPDATE_PLANS'))
+    shape = '\n'.join(plan.shape) + '\n'
+    if update:
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(path, 'w') as file:
+            file.write(shape)
+        return
+    assert os.path.exists(path), (
+        'Query plan snapshot {0} does not exist. Set the '
+        'SQLALCHEMY_JSON_API_UPDATE_PLANS environment variable to record '
+        'it.\n\nActual:\n{1}'.format(path, shape)
+    )
+    with open(path) as file:
+        expected = file.read()
+    assert shape == expected, (
+        'Query plan shape does not match the snapshot {0}.\n\n'
+        'Expected:\n{1}\nActual:\n{2}'.format(path, expected, shape)
+    )
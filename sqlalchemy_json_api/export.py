@@ -0,0 +1,207 @@
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+def arrow_type(type_):
+    """
+    Return the Arrow data type of given SQLAlchemy column type or `None` if
+    the data type should be inferred from the values.
+    """
+    if isinstance(type_, postgresql.ARRAY):
+        item_type = arrow_type(type_.item_type)
+        return None if item_type is None else pyarrow.list_(item_type)
+    if isinstance(type_, sa.Boolean):
+        return pyarrow.bool_()
+    if isinstance(type_, sa.Integer):
+        return pyarrow.int64()
+    if isinstance(type_, sa.Float):
+        return pyarrow.float64()
+    if isinstance(type_, sa.String):
+        return pyarrow.string()
+    if isinstance(type_, sa.DateTime):
+        return pyarrow.timestamp('us', tz='UTC' if type_.timezone else None)
+    if isinstance(type_, sa.Date):
+        return pyarrow.date32()
+    return None
+
+
+class ExportQuery(object):
+    """
+    Query built by :meth:`QueryBuilder.select_export`. The rows are streamed
+    with ``COPY (SELECT ...) TO STDOUT`` straight into a file-like object, so
+    the result set is never loaded into Python objects. Rows of ``'csv'``
+    format queries can also be fetched in batches with a server-side cursor
+    and converted to Apache Arrow record batches for columnar analytics
+    reads.
+
+    :param query: The select query returning one row per resource.
+    :param format: The export format, ``'csv'`` or ``'jsonl'``.
+    :param header:
+        Whether or not to write a header row with the column names in
+        ``'csv'`` format.
+    """
+    def __init__(self, query, format='csv', header=True):
+        if format not in EXPORT_FORMATS:
+            raise ValueError(
+                'Unknown export format {0!r}. Export format must be one of '
+                '{1}.'.format(format, ', '.join(EXPORT_FORMATS))
+            )
+        self.query = query
+        self.format = format
+        self.header = header
+
+    @property
+    def options(self):
+        if self.format == 'csv':
+            return 'FORMAT csv, HEADER {0}'.format(
+                'true' if self.header else 'false'
+            )
+        # JSON text never contains raw control characters, so using them as
+        # quote and delimiter characters writes the documents unescaped.
+        return "FORMAT csv, QUOTE e'\\x01', DELIMITER e'\\x02'"
+
+    def copy_statement(self, cursor, dialect):
+        compiled = self.query.compile(dialect=dialect)
+        query = cursor.mogrify(str(compiled), compiled.params)
+        if isinstance(query, bytes):
+            query = query.decode(dialect.encoding)
+        return 'COPY ({0}) TO STDOUT WITH ({1})'.format(query, self.options)
+
+    def copy_to(self, bind, file):
+        """
+        Write the exported rows to given file-like object. Requires psycopg2.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param file: A file-like object with a `write` method.
+        """
+        if isinstance(bind, sa.orm.Session):
+            bind = bind.connection()
+        cursor = bind.connection.cursor()
+        try:
+            cursor.copy_expert(self.copy_statement(cursor, bind.dialect), file)
+        finally:
+            cursor.close()
+
+    def fetch_batches(self, bind, batch_size=10000):
+        """
+        Yield the exported rows of a ``'csv'`` format query in lists of at
+        most `batch_size` rows. The rows are fetched with a server-side
+        cursor, so only one batch is held in memory at a time.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param batch_size: Maximum number of rows in a batch.
+        """
+        if self.format != 'csv':
+            raise ValueError(
+                "Only 'csv' format export queries can be fetched in batches."
+            )
+        if isinstance(bind, sa.orm.Session):
+            bind = bind.connection()
+        result = bind.execution_options(stream_results=True).execute(
+            self.query
+        )
+        try:
+            while True:
+                rows = result.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            result.close()
+
+    @property
+    def arrow_schema(self):
+        """
+        The Arrow schema of the exported rows. Relationship ids are list
+        columns for to-many relationships. Columns whose type can not be
+        mapped to an Arrow type have `None` as their type.
+        """
+        if pyarrow is None:
+            raise ImportError(
+                "'pyarrow' is required for Arrow exports. Install it with "
+                "'pip install SQLAlchemy-JSON-API[arrow]'."
+            )
+        return [
+            (column.name, arrow_type(column.type))
+            for column in self.query.columns
+        ]
+
+    def record_batches(self, bind, batch_size=10000):
+        """
+        Yield the exported rows of a ``'csv'`` format query as
+        :class:`pyarrow.RecordBatch` objects of at most `batch_size` rows.
+        Requires pyarrow::
+
+            export_query = query_builder.select_export(
+                Article,
+                fields={'articles': ['name', 'comments']}
+            )
+            table = pyarrow.Table.from_batches(
+                export_query.record_batches(session)
+            )
+
+        Column types that can not be mapped to Arrow types are inferred from
+        the values of the first batch.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param batch_size: Maximum number of rows in a batch.
+        """
+        schema = self.arrow_schema
+        for rows in self.fetch_batches(bind, batch_size):
+            columns = list(zip(*rows))
+            arrays = [
+                pyarrow.array(values, type=type_)
+                for values, (name, type_) in zip(columns, schema)
+            ]
+            schema = [
+                (
+                    name,
+                    array.type
+                    if type_ is None and array.type != pyarrow.null() else
+                    type_
+                )
+                for array, (name, type_) in zip(arrays, schema)
+            ]
+            yield pyarrow.RecordBatch.from_arrays(
+                arrays,
+                [name for name, type_ in schema]
+            )
+
+    def write_parquet(self, bind, where, batch_size=10000, **kwargs):
+        """
+        Write the exported rows of a ``'csv'`` format query to a Parquet file
+        one record batch at a time. Requires pyarrow. Returns the number of
+        written rows.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param where: A file path or a writable file-like object.
+        :param batch_size: Maximum number of rows in a record batch.
+        :param kwargs:
+            Additional keyword arguments passed to
+            :class:`pyarrow.parquet.ParquetWriter`.
+        """
+        import pyarrow.parquet
+
+        writer = None
+        count = 0
+        try:
+            for batch in self.record_batches(bind, batch_size):
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(
+                        where,
+                        batch.schema,
+                        **kwargs
+                    )
+                writer.write_table(pyarrow.Table.from_batches([batch]))
+                count += batch.num_rows
+        finally:
+            if writer is not None:
+                writer.close()
+        return count
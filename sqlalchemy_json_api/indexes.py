@@ -0,0 +1,259 @@
+import argparse
+import importlib
+import sys
+from collections import namedtuple
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql.visitors import iterate
+from sqlalchemy_utils.functions import get_mapper
+
+
+class MissingIndex(
+    namedtuple('MissingIndex', ['table', 'columns', 'relationships'])
+):
+    """
+    An index missing from the columns of a table the queries of given
+    relationships join on, followed by the columns the relationships are
+    sorted by.
+
+    :param table: The Table object.
+    :param columns: Tuple of Column objects of the index.
+    :param relationships:
+        Tuple of dot-separated resource type and relationship names, eg.
+        ``'articles.comments'``.
+    """
+    __slots__ = ()
+
+    @property
+    def name(self):
+        return 'ix_{0}_{1}'.format(
+            self.table.name,
+            '_'.join(column.name for column in self.columns)
+        )
+
+    def create_statement(self, dialect=None):
+        """
+        Return the ``CREATE INDEX`` statement of this index.
+
+        :param dialect: The SQLAlchemy dialect. PostgreSQL by default.
+        """
+        if dialect is None:
+            dialect = postgresql.dialect()
+        preparer = dialect.identifier_preparer
+        return 'CREATE INDEX {0} ON {1} ({2})'.format(
+            preparer.quote(self.name),
+            preparer.format_table(self.table),
+            ', '.join(preparer.quote(column.name) for column in self.columns)
+        )
+
+    def alembic_operation(self):
+        """
+        Return the Alembic ``op.create_index`` operation of this index.
+        """
+        args = [
+            repr(self.name),
+            repr(self.table.name),
+            repr([column.name for column in self.columns])
+        ]
+        if self.table.schema is not None:
+            args.append('schema={0!r}'.format(self.table.schema))
+        return 'op.create_index({0})'.format(', '.join(args))
+
+
+def get_join_columns(relationship):
+    """
+    Return a tuple of the table and the columns the correlated subqueries of
+    given relationship look up rows with, or `None` if the columns do not
+    belong to a single table. For relationships with a secondary table these
+    are the columns of the secondary table in the primary join condition.
+    """
+    if relationship.secondary is not None:
+        table = relationship.secondary
+        join_columns = set(iterate(relationship.primaryjoin, {}))
+        columns = [column for column in table.c if column in join_columns]
+    else:
+        columns = []
+        for local, remote in relationship.local_remote_pairs:
+            if remote not in columns:
+                columns.append(remote)
+        tables = set(column.table for column in columns)
+        if len(tables) != 1:
+            return None
+        table = tables.pop()
+    if not columns or not isinstance(table, sa.Table):
+        return None
+    return table, columns
+
+
+def get_sort_columns(relationship, table):
+    if not relationship.order_by:
+        return []
+    return [
+        column for column in relationship.order_by
+        if isinstance(column, sa.Column) and column.table is table
+    ]
+
+
+def get_metadata_indexes(table):
+    indexes = [
+        [column.name for column in index.columns] for index in table.indexes
+    ]
+    indexes.extend(
+        [column.name for column in constraint.columns]
+        for constraint in table.constraints
+        if isinstance(
+            constraint,
+            (sa.PrimaryKeyConstraint, sa.UniqueConstraint)
+        )
+    )
+    return indexes
+
+
+def get_reflected_indexes(inspector, table):
+    try:
+        indexes = [
+            index['column_names']
+            for index in inspector.get_indexes(table.name, table.schema)
+        ]
+    except sa.exc.NoSuchTableError:
+        return []
+    indexes.append(
+        inspector.get_pk_constraint(
+            table.name,
+            table.schema
+        )['constrained_columns']
+    )
+    indexes.extend(
+        constraint['column_names']
+        for constraint
+        in inspector.get_unique_constraints(table.name, table.schema)
+    )
+    return indexes
+
+
+def is_covered(columns, indexes):
+    """
+    Return whether or not any of given indexes, given as lists of column
+    names, starts with given columns in any order.
+    """
+    names = set(column.name for column in columns)
+    return any(
+        set(index[:len(names)]) == names
+        for index in indexes
+    )
+
+
+def find_missing_indexes(query_builder, bind=None):
+    """
+    Return a list of :class:`MissingIndex` objects for the columns the
+    relationship and include queries of the models registered to given
+    :class:`QueryBuilder` join on, which are not the leading columns of any
+    index, primary key or unique constraint. Without an index every lookup
+    of related resources is a sequential scan. The columns of the
+    ``order_by`` of a relationship in the same table are appended to the
+    suggested index.
+
+    If `bind` is given the indexes are reflected from the database,
+    otherwise the indexes declared in the table metadata are used::
+
+        for index in find_missing_indexes(query_builder, session):
+            print(index.create_statement())
+
+    The same report is available from the command line, see ``python -m
+    sqlalchemy_json_api.indexes --help``.
+
+    :param query_builder: The :class:`QueryBuilder` of the models.
+    :param bind: An optional SQLAlchemy Engine, Connection or Session object.
+    """
+    if isinstance(bind, sa.orm.Session):
+        bind = bind.connection()
+    inspector = None if bind is None else sa.inspect(bind)
+    missing = {}
+    registry = query_builder.resource_registry
+    for type_, model in sorted(registry.by_type.items()):
+        for relationship in get_mapper(model).relationships:
+            join_columns = get_join_columns(relationship)
+            if join_columns is None:
+                continue
+            table, columns = join_columns
+            indexes = (
+                get_metadata_indexes(table)
+                if inspector is None else
+                get_reflected_indexes(inspector, table)
+            )
+            if is_covered(columns, indexes):
+                continue
+            columns = tuple(columns + [
+                column
+                for column in get_sort_columns(relationship, table)
+                if column not in columns
+            ])
+            relationships = missing.setdefault((table, columns), [])
+            relationships.append('{0}.{1}'.format(type_, relationship.key))
+    return [
+        MissingIndex(table, columns, tuple(relationships))
+        for (table, columns), relationships in sorted(
+            missing.items(),
+            key=lambda item: (
+                item[0][0].fullname,
+                [column.name for column in item[0][1]]
+            )
+        )
+    ]
+
+
+def import_object(path):
+    module_name, _, attr = path.partition(':')
+    obj = importlib.import_module(module_name)
+    for name in attr.split('.') if attr else []:
+        obj = getattr(obj, name)
+    return obj
+
+
+def main(argv=None, stdout=None):
+    stdout = sys.stdout if stdout is None else stdout
+    parser = argparse.ArgumentParser(
+        prog='python -m sqlalchemy_json_api.indexes',
+        description=(
+            'Report missing indexes on the columns the relationship and '
+            'include queries of a QueryBuilder join on.'
+        )
+    )
+    parser.add_argument(
+        'query_builder',
+        help='Import path of the QueryBuilder, eg. myapp.api:query_builder.'
+    )
+    parser.add_argument(
+        '--url',
+        help=(
+            'Database URL to reflect the indexes from. By default the '
+            'indexes declared in the table metadata are used.'
+        )
+    )
+    parser.add_argument(
+        '--alembic',
+        action='store_true',
+        help='Print Alembic operations instead of CREATE INDEX statements.'
+    )
+    args = parser.parse_args(argv)
+    query_builder = import_object(args.query_builder)
+    engine = None if args.url is None else sa.create_engine(args.url)
+    try:
+        missing_indexes = find_missing_indexes(query_builder, engine)
+    finally:
+        if engine is not None:
+            engine.dispose()
+    for index in missing_indexes:
+        stdout.write('{0} {1}\n{2}\n'.format(
+            '#' if args.alembic else '--',
+            ', '.join(index.relationships),
+            index.alembic_operation()
+            if args.alembic else
+            index.create_statement() + ';'
+        ))
+    return 1 if missing_indexes else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
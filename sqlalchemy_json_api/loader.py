@@ -0,0 +1,125 @@
+import asyncio
+import json
+from collections import OrderedDict
+
+
+class DocumentLoader(object):
+    """
+    Coalesces concurrent :meth:`QueryBuilder.select_one` calls. Calls with
+    the same model and parameters made within one event loop iteration are
+    loaded with a single :meth:`QueryBuilder.select_one_batch` query and the
+    documents are fanned out to the awaiting callers.
+
+    ::
+
+        async def execute(query):
+            return await database.fetch_all(query)
+
+        loader = DocumentLoader(query_builder, execute)
+
+        document = await loader.load(
+            Article,
+            1,
+            fields={'articles': ['name', 'author']},
+            include=['author']
+        )
+
+    :param query_builder: The :class:`QueryBuilder` used for building queries.
+    :param execute:
+        A function that takes a query and returns an awaitable resolving to
+        the list of result rows.
+    :param max_batch_size:
+        Maximum number of ids loaded with a single query. By default there
+        is no limit.
+    :param loop: The event loop to use. By default the current event loop.
+    """
+    def __init__(self, query_builder, execute, max_batch_size=None, loop=None):
+        self.query_builder = query_builder
+        self.execute = execute
+        self.max_batch_size = max_batch_size
+        self.loop = loop
+        self._batches = OrderedDict()
+        self._scheduled = False
+
+    def get_loop(self):
+        return self.loop if self.loop is not None else asyncio.get_event_loop()
+
+    def shape_key(self, model, kwargs):
+        return (model, json.dumps(kwargs, sort_keys=True, default=repr))
+
+    def load(self, model, id, **kwargs):
+        """
+        Return a future resolving to the document of the resource with given
+        id or `None` if the resource does not exist. Accepts the same keyword
+        arguments as :meth:`QueryBuilder.select_one`.
+
+        :param model: The root model to build the select query from.
+        :param id: The id of the resource to select.
+        """
+        loop = self.get_loop()
+        key = self.shape_key(model, kwargs)
+        try:
+            batch = self._batches[key]
+        except KeyError:
+            batch = self._batches[key] = (model, kwargs, OrderedDict())
+        future = loop.create_future()
+        batch[2].setdefault(id, []).append(future)
+        if not self._scheduled:
+            self._scheduled = True
+            loop.call_soon(self.dispatch)
+        return future
+
+    def dispatch(self):
+        batches = self._batches
+        self._batches = OrderedDict()
+        self._scheduled = False
+        for model, kwargs, futures in batches.values():
+            ids = list(futures.keys())
+            size = self.max_batch_size or len(ids)
+            for index in range(0, len(ids), size):
+                self.load_batch(
+                    model,
+                    kwargs,
+                    OrderedDict(
+                        (id, futures[id]) for id in ids[index:index + size]
+                    )
+                )
+
+    def load_batch(self, model, kwargs, futures):
+        try:
+            query = self.query_builder.select_one_batch(
+                model,
+                list(futures.keys()),
+                **kwargs
+            )
+            result = asyncio.ensure_future(
+                self.execute(query),
+                loop=self.get_loop()
+            )
+        except Exception as exception:
+            self.reject(futures, exception)
+            return
+        result.add_done_callback(
+            lambda result: self.resolve(futures, result)
+        )
+
+    def resolve(self, futures, result):
+        if result.cancelled():
+            self.reject(futures, asyncio.CancelledError())
+            return
+        if result.exception() is not None:
+            self.reject(futures, result.exception())
+            return
+        documents = dict(
+            (str(id), document) for id, document in result.result()
+        )
+        for id, id_futures in futures.items():
+            for future in id_futures:
+                if not future.done():
+                    future.set_result(documents.get(str(id)))
+
+    def reject(self, futures, exception):
+        for id_futures in futures.values():
+            for future in id_futures:
+                if not future.done():
+                    future.set_exception(exception)
@@ -1,27 +1,38 @@
-from collections import namedtuple
+import weakref
+from collections import namedtuple, OrderedDict
 from itertools import chain
 
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects.postgresql import JSON, JSONB
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.sql.elements import Label
 from sqlalchemy.sql.expression import union
+from sqlalchemy.sql.util import ClauseAdapter
 from sqlalchemy_utils import get_hybrid_properties
 from sqlalchemy_utils.functions import cast_if, get_mapper
 from sqlalchemy_utils.functions.orm import get_all_descriptors
-from sqlalchemy_utils.relationships import (
-    path_to_relationships,
-    select_correlated_expression
+from sqlalchemy_utils.relationships import select_correlated_expression
+
+from .assembler import (
+    DocumentAssembler,
+    RelationshipShape,
+    ResourceShape,
+    RowSet,
+    RowSetQuery
 )
-
 from .exc import (
     IdPropertyNotFound,
+    InvalidDocument,
     InvalidField,
+    InvalidPagination,
     UnknownField,
     UnknownFieldKey,
-    UnknownModel
+    UnknownModel,
+    UnknownRelationship
 )
+from .export import ExportQuery
 from .hybrids import CompositeId
 from .utils import (
     adapt,
@@ -29,7 +40,13 @@ from .utils import (
     get_attrs,
     get_descriptor_columns,
     get_selectable,
+    intern_literals,
+    parse_if_none_match,
+    RawJSONBytes,
+    ReturningInsert,
+    ReturningUpdate,
     s,
+    select_correlated_relationships,
     subpaths
 )
 
@@ -44,12 +61,38 @@ json_array = sa.cast(
 jsonb_array = sa.cast(
     postgresql.array([], type_=JSONB), postgresql.ARRAY(JSONB)
 )
+text_array = sa.cast(
+    postgresql.array([], type_=sa.Text), postgresql.ARRAY(sa.Text)
+)
+
+# Column types that psycopg2 returns as the same Python values as a JSON
+# document decode would. Attributes of any other type are selected through
+# to_json when building flat rows. The generic JSON type was added in
+# SQLAlchemy 1.1, older versions only have the PostgreSQL one.
+JSON_NATIVE_TYPES = (
+    sa.String,
+    sa.Integer,
+    sa.Boolean,
+    sa.Float,
+    getattr(sa, 'JSON', JSON),
+)
+
+BATCH_METHODS = (
+    'select',
+    'select_one',
+    'select_related',
+    'select_relationship',
+)
 
 RESERVED_KEYWORDS = (
     'id',
     'type',
 )
 
+# Include paths are given by clients, so the number of cached relationship
+# chains is bounded. The oldest chains are evicted first.
+INCLUDE_PATH_CACHE_SIZE = 1024
+
 
 class ResourceRegistry(object):
     def __init__(self, model_mapping):
@@ -104,13 +147,32 @@ class QueryBuilder(object):
         A dictionary of type formatters
     :param sort_included:
         Whether or not to sort included objects by type and id.
+    :param cost_estimator:
+        A :class:`CostEstimator` used for rejecting too complex requests
+        before building the query. By default the cost of requests is not
+        checked.
+    :param cardinality_hints:
+        A dictionary of expected numbers of related resources per resource of
+        to-many relationships. Keys are dot-separated resource type and
+        relationship names, for example ``'articles.comments'``. Hints can
+        also be given in the ``info`` dictionary of a relationship with the
+        ``'cardinality'`` key or inferred from the planner statistics with
+        :func:`infer_cardinality_hints`.
+    :param grouped_cardinality:
+        The cardinality from which the related resources of a to-many
+        relationship are aggregated once per collection in a grouped subquery
+        joined to the selected resources instead of a correlated subquery per
+        resource. See :meth:`get_relationship_strategy`.
     """
     def __init__(
         self,
         model_mapping,
         base_url=None,
         type_formatters=None,
-        sort_included=True
+        sort_included=True,
+        cost_estimator=None,
+        cardinality_hints=None,
+        grouped_cardinality=100
     ):
         self.validate_model_mapping(model_mapping)
         self.resource_registry = ResourceRegistry(model_mapping)
@@ -119,6 +181,37 @@ class QueryBuilder(object):
             {} if type_formatters is None else type_formatters
         )
         self.sort_included = sort_included
+        self.cost_estimator = cost_estimator
+        self.cardinality_hints = (
+            {} if cardinality_hints is None else cardinality_hints
+        )
+        self.grouped_cardinality = grouped_cardinality
+        self._include_paths = OrderedDict()
+        self._attribute_columns = {}
+        self._secondary_columns = {}
+        self._hybrid_names = {}
+        self._column_property_expressions = {}
+        self._class_expressions = {}
+        self._adapted_expressions = weakref.WeakKeyDictionary()
+        intern_literals(self.get_literal_values())
+
+    def get_literal_values(self):
+        """
+        Return the resource types, member names and link fragments of the
+        registered models. The queries built by this QueryBuilder share a
+        single literal clause for each of these values.
+        """
+        values = set()
+        if self.base_url is not None:
+            values.add(self.base_url)
+        for type_, model in self.resource_registry.by_type.items():
+            values.add(type_)
+            values.update(get_all_descriptors(model).keys())
+            values.update(get_hybrid_properties(model).keys())
+            for key in get_mapper(model).relationships.keys():
+                values.add('/{0}'.format(key))
+                values.add('/relationships/{0}'.format(key))
+        return sorted(values)
 
     def validate_model_mapping(self, model_mapping):
         for model in model_mapping.values():
@@ -140,21 +233,214 @@ class QueryBuilder(object):
                 'model mapping.' % model
             )
 
+    def get_include_paths(self, model, path):
+        """
+        Return a tuple of ``(subpath, relationships)`` pairs for given
+        dot-separated include path. The relationship chains are validated and
+        cached per model and path so that they can be reused across requests.
+        At most :data:`INCLUDE_PATH_CACHE_SIZE` paths are cached.
+
+        :param model: The root model of the include path.
+        :param path: Dot-separated relationship path, eg. 'comments.author'.
+        """
+        key = (model, path)
+        try:
+            return self._include_paths[key]
+        except KeyError:
+            pass
+        relationships = []
+        include_paths = []
+        cls = model
+        for subpath in subpaths(path):
+            name = subpath.rsplit('.', 1)[-1]
+            if name not in get_mapper(cls).relationships.keys():
+                raise UnknownRelationship(
+                    "Unknown include path '{0}'. Model {1} does not have "
+                    "relationship named '{2}'.".format(path, cls, name)
+                )
+            relationship = getattr(cls, name)
+            relationships.append(relationship)
+            include_paths.append((subpath, tuple(relationships)))
+            cls = relationship.mapper.class_
+        include_paths = tuple(include_paths)
+        while len(self._include_paths) >= INCLUDE_PATH_CACHE_SIZE:
+            self._include_paths.popitem(last=False)
+        self._include_paths[key] = include_paths
+        return include_paths
+
+    def get_cardinality(self, model, relationship):
+        """
+        Return the expected number of related resources per resource of given
+        relationship or `None` if the cardinality of a to-many relationship
+        is unknown. To-one relationships always have cardinality of one.
+
+        :param model: The model the relationship belongs to.
+        :param relationship: A RelationshipProperty object.
+        """
+        if not relationship.uselist:
+            return 1
+        key = '{0}.{1}'.format(
+            self.get_resource_type(model),
+            relationship.key
+        )
+        try:
+            return self.cardinality_hints[key]
+        except KeyError:
+            return relationship.info.get('cardinality')
+
+    def get_relationship_strategy(self, model, relationship):
+        """
+        Return the SQL strategy for selecting the related resources of given
+        relationship for a collection of resources:
+
+        * ``'subquery'``: A correlated subquery is evaluated per resource.
+          This is the best strategy for to-one relationships and to-many
+          relationships with few related resources per resource.
+        * ``'grouped'``: The related resources of all selected resources are
+          aggregated in a single subquery grouped by the resource id, which
+          is then joined to the selected resources.
+
+        The grouped strategy is chosen for to-many relationships with a
+        cardinality of at least `grouped_cardinality`, when the model has a
+        plain id column.
+
+        :param model: The model the relationship belongs to.
+        :param relationship: A RelationshipProperty object.
+        """
+        cardinality = self.get_cardinality(model, relationship)
+        if (
+            relationship.uselist and
+            cardinality is not None and
+            cardinality >= self.grouped_cardinality and
+            'id' in get_mapper(model).column_attrs.keys()
+        ):
+            return 'grouped'
+        return 'subquery'
+
+    def get_hybrid_names(self, model):
+        """
+        Return a tuple of the hybrid property names of given model. The
+        names are cached per model class.
+
+        :param model: A model class or an aliased model class.
+        """
+        cls = get_mapper(model).class_
+        try:
+            return self._hybrid_names[cls]
+        except KeyError:
+            pass
+        names = tuple(get_hybrid_properties(cls).keys())
+        self._hybrid_names[cls] = names
+        return names
+
+    def get_column_property_expressions(self, model):
+        """
+        Return a dictionary of the names and ColumnProperty objects of the
+        column properties of given model that are not plain columns, for
+        example correlated subqueries. The result is cached per model class.
+
+        :param model: A model class or an aliased model class.
+        """
+        mapper = get_mapper(model)
+        try:
+            return self._column_property_expressions[mapper.class_]
+        except KeyError:
+            pass
+        expressions = dict(
+            (key, attr)
+            for key, attr in mapper.attrs.items()
+            if (
+                isinstance(attr, sa.orm.ColumnProperty) and
+                not isinstance(attr.columns[0], sa.Column)
+            )
+        )
+        self._column_property_expressions[mapper.class_] = expressions
+        return expressions
+
+    def get_class_expression(self, model, key):
+        """
+        Return the class level expression of given hybrid property or column
+        property of given model. The expressions are cached per model class,
+        so the expression function of a hybrid property is called only once.
+
+        A hybrid property whose expression depends on runtime state, for
+        example the current user, can opt out of the cache with the
+        ``'cache_expression'`` key of its ``info`` dictionary::
+
+            class Article(Base):
+                @hybrid_property
+                def is_visible(self):
+                    ...
+
+                @is_visible.expression
+                def is_visible(cls):
+                    return cls.owner_id == get_current_user_id()
+
+                is_visible.info['cache_expression'] = False
+
+        :param model: A model class or an aliased model class.
+        :param key: The name of the hybrid property or column property.
+        """
+        cls = get_mapper(model).class_
+        try:
+            expression = self._class_expressions[(cls, key)]
+        except KeyError:
+            expression = getattr(cls, key)
+            hybrid = get_hybrid_properties(cls).get(key)
+            if hybrid is None or hybrid.info.get('cache_expression', True):
+                self._class_expressions[(cls, key)] = expression
+            else:
+                self._class_expressions[(cls, key)] = None
+            return expression
+        if expression is None:
+            return getattr(cls, key)
+        return expression
+
+    def adapt_expression(self, model, key, from_obj):
+        """
+        Return the expression of given hybrid property or column property
+        adapted to given selectable. Adapted expressions are cached per
+        selectable for as long as the selectable exists, so each expression
+        is adapted only once per query even though it is referenced from
+        several parts of the query. See :meth:`get_class_expression`.
+
+        :param model: A model class or an aliased model class.
+        :param key: The name of the hybrid property or column property.
+        :param from_obj: The selectable to adapt the expression to.
+        """
+        cls = get_mapper(model).class_
+        try:
+            adapted = self._adapted_expressions[from_obj]
+        except KeyError:
+            adapted = self._adapted_expressions[from_obj] = {}
+        try:
+            return adapted[(cls, key)]
+        except KeyError:
+            pass
+        adapted[(cls, key)] = adapt(
+            from_obj,
+            self.get_class_expression(cls, key)
+        )
+        return adapted[(cls, key)]
+
     def get_id(self, from_obj):
         return cast_if(get_attrs(from_obj).id, sa.String)
 
+    def build_resource_id(self, model, from_obj):
+        return cast_if(
+            AttributesExpression(
+                self,
+                model,
+                from_obj
+            ).adapt_attribute('id'),
+            sa.String
+        )
+
     def build_resource_identifier(self, model, from_obj):
         model_alias = self.get_resource_type(model)
         return [
             s('id'),
-            cast_if(
-                AttributesExpression(
-                    self,
-                    model,
-                    from_obj
-                ).adapt_attribute('id'),
-                sa.String
-            ),
+            self.build_resource_id(model, from_obj),
             s('type'),
             s(model_alias),
         ]
@@ -175,8 +461,18 @@ class QueryBuilder(object):
                 'category'
             )
 
+        The root object does not need to be loaded. Given a tuple of the root
+        model and the root resource id the related resources are selected in
+        a single query::
+
+            query = query_builder.select_related(
+                (Article, 1),
+                'comments'
+            )
+
         :param obj:
-            The root object to select the related resources from.
+            The root object to select the related resources from or a tuple
+            of the root model and the id of the root resource.
         :param fields:
             A mapping of fields. Keys representing model keys and values as
             lists of model descriptor names.
@@ -187,13 +483,38 @@ class QueryBuilder(object):
             query. Keys representing json keys and values as valid urls or
             dictionaries.
         :param sort:
-            List of attributes to apply as an order by for the root model.
+            List of attributes to apply as an order by for the related
+            resources of a to-many relationship.
+        :param limit:
+            Applies an SQL LIMIT to the related resources of a to-many
+            relationship. If the query builder has a `base_url`, pagination
+            links are added to the top level links.
+        :param offset:
+            Applies an SQL OFFSET to the related resources of a to-many
+            relationship.
+        :param after:
+            The id of the related resource after which the page starts
+            (keyset pagination). The related resources are sorted by the
+            `sort` parameter and id. Raises :class:`.InvalidPagination` if the
+            related resources have a composite id.
         :param from_obj:
             A SQLAlchemy selectable (for example a Query object) to select the
             query results from.
         :param as_text:
             Whether or not to build a query that returns the results as text
             (raw json).
+        :param as_bytes:
+            Whether or not to build a query that returns the results as UTF-8
+            encoded bytes (raw json). See :func:`splice_members` for adding
+            extra top level members to raw json documents.
+        :param etag:
+            Whether or not to build a query that also returns an md5 hash of
+            the document in an additional `etag` column.
+        :param if_none_match:
+            The value of an If-None-Match request header. If given along with
+            `etag` parameter, the query returns `NULL` as the document when
+            the hash of the document matches one of the given entity tags.
+            See :func:`execute_conditional`.
 
         .. versionadded: 0.2
         """
@@ -205,16 +526,36 @@ class QueryBuilder(object):
 
             article = session.query(Article).get(1)
 
-            query = query_builder.select_related(
+            query = query_builder.select_relationship(
                 article,
                 'category'
             )
 
+            # Without loading the root object
+            query = query_builder.select_relationship(
+                (Article, 1),
+                'category'
+            )
+
 
         :param obj:
-            The root object to select the related resources from.
+            The root object to select the related resources from or a tuple
+            of the root model and the id of the root resource.
         :param sort:
-            List of attributes to apply as an order by for the root model.
+            List of attributes to apply as an order by for the related
+            resources of a to-many relationship.
+        :param limit:
+            Applies an SQL LIMIT to the related resources of a to-many
+            relationship. If the query builder has a `base_url`, pagination
+            links are added to the top level links.
+        :param offset:
+            Applies an SQL OFFSET to the related resources of a to-many
+            relationship.
+        :param after:
+            The id of the related resource after which the page starts
+            (keyset pagination). The related resources are sorted by the
+            `sort` parameter and id. Raises :class:`.InvalidPagination` if the
+            related resources have a composite id.
         :param links:
             A dictionary of links to apply as top level links in the built
             query. Keys representing json keys and values as valid urls or
@@ -225,6 +566,18 @@ class QueryBuilder(object):
         :param as_text:
             Whether or not to build a query that returns the results as text
             (raw json).
+        :param as_bytes:
+            Whether or not to build a query that returns the results as UTF-8
+            encoded bytes (raw json). See :func:`splice_members` for adding
+            extra top level members to raw json documents.
+        :param etag:
+            Whether or not to build a query that also returns an md5 hash of
+            the document in an additional `etag` column.
+        :param if_none_match:
+            The value of an If-None-Match request header. If given along with
+            `etag` parameter, the query returns `NULL` as the document when
+            the hash of the document matches one of the given entity tags.
+            See :func:`execute_conditional`.
 
         .. versionadded: 0.2
         """
@@ -232,7 +585,22 @@ class QueryBuilder(object):
         return self._select_related(obj, relationship_key, **kwargs)
 
     def _select_related(self, obj, relationship_key, **kwargs):
-        mapper = sa.inspect(obj.__class__)
+        etag = kwargs.pop('etag', False)
+        if_none_match = kwargs.pop('if_none_match', None)
+        query = self._build_select_related(obj, relationship_key, **kwargs)
+        return self._select_with_etag(query, etag, if_none_match)
+
+    def _select_with_etag(self, query, etag=False, if_none_match=None):
+        if not etag:
+            return query
+        return select_with_etag(query, if_none_match)
+
+    def _build_select_related(self, obj, relationship_key, **kwargs):
+        if isinstance(obj, tuple):
+            parent_model, parent_id = obj
+        else:
+            parent_model = obj.__class__
+        mapper = sa.inspect(parent_model)
         prop = mapper.relationships[relationship_key]
         model = prop.mapper.class_
 
@@ -240,6 +608,20 @@ class QueryBuilder(object):
         if from_obj is None:
             from_obj = sa.orm.query.Query(model)
 
+        if isinstance(obj, tuple):
+            from_obj = self._filter_by_parent_id(
+                from_obj,
+                parent_model,
+                parent_id,
+                prop
+            )
+            return self._build_related_select(
+                from_obj,
+                prop,
+                parent_id,
+                **kwargs
+            )
+
         # SQLAlchemy Query.with_parent throws warning if the primary object
         # foreign key is NULL. Thus we need this ugly magic to return empty
         # data in that scenario.
@@ -248,23 +630,119 @@ class QueryBuilder(object):
             not prop.secondary and
             getattr(obj, prop.local_remote_pairs[0][0].key) is None
         ):
-            expr = sa.cast({'data': None}, JSONB)
-            if kwargs.get('as_text'):
-                expr = sa.cast(expr, sa.Text)
+            expr = render_json(
+                sa.cast({'data': None}, JSONB),
+                as_text=kwargs.get('as_text'),
+                as_bytes=kwargs.get('as_bytes')
+            )
             return sa.select([expr])
 
         from_obj = from_obj.with_parent(obj, prop)
+        return self._build_related_select(from_obj, prop, obj.id, **kwargs)
+
+    def _filter_by_parent_id(self, from_obj, parent_model, parent_id, prop):
+        return from_obj.filter(
+            self._parent_id_condition(parent_model, parent_id, prop)
+        )
+
+    def _parent_id_condition(self, parent_model, parent_id, prop):
+        # Semi-join the related resources with the parent resource through
+        # the relationship (including possible secondary tables) instead of
+        # loading the parent object.
+        model = prop.mapper.class_
+        parent_query = sa.orm.query.Query(parent_model).filter(
+            parent_model.id == parent_id
+        ).subquery()
+        alias = sa.orm.aliased(model)
+        subquery = select_correlated_expression(
+            parent_model,
+            alias.id,
+            prop.key,
+            alias,
+            parent_query,
+            correlate=False
+        ).with_only_columns(split_if_composite(alias.id))
+        return model.id.in_(subquery)
 
-        if prop.order_by:
+    def _build_related_select(self, from_obj, prop, parent_id, **kwargs):
+        after = kwargs.pop('after', None)
+        if prop.uselist:
+            from_obj = self._paginate_related(
+                from_obj,
+                prop,
+                parent_id,
+                after,
+                kwargs
+            )
+        elif prop.order_by:
             from_obj = from_obj.order_by(*prop.order_by)
 
         from_obj = from_obj.subquery()
 
-        return SelectExpression(self, model, from_obj).build_select(
+        return SelectExpression(
+            self,
+            prop.mapper.class_,
+            from_obj
+        ).build_select(
             multiple=prop.uselist,
             **kwargs
         )
 
+    def _paginate_related(self, from_obj, prop, parent_id, after, kwargs):
+        model = prop.mapper.class_
+        sort = kwargs.get('sort')
+        limit = kwargs.get('limit')
+        offset = kwargs.get('offset')
+        id_columns = split_if_composite(model.id)
+
+        if after is not None and len(id_columns) > 1:
+            raise InvalidPagination(
+                "Keyset pagination with the after parameter is not supported "
+                "for relationship '{0}'. The related resources have a "
+                "composite id.".format(prop.key)
+            )
+        if sort is None and after is not None:
+            sort = ['id']
+        if sort is not None:
+            from_obj = apply_sort(from_obj.statement, from_obj, sort)
+            if 'id' not in [param.lstrip('-') for param in sort]:
+                from_obj = from_obj.order_by(*id_columns)
+        elif prop.order_by:
+            from_obj = from_obj.order_by(*prop.order_by)
+        elif limit is not None or offset is not None:
+            from_obj = from_obj.order_by(*id_columns)
+
+        if after is not None:
+            from_obj = from_obj.filter(keyset_condition(model, sort, after))
+        unpaged = from_obj
+        if limit is not None:
+            from_obj = from_obj.limit(limit)
+        if offset is not None:
+            from_obj = from_obj.offset(offset)
+
+        if self.base_url and limit is not None:
+            url = '{0}{1}/{2}/{3}{4}'.format(
+                self.base_url,
+                self.get_resource_type(prop.parent.class_),
+                ':'.join(str(part) for part in parent_id)
+                if isinstance(parent_id, tuple) else
+                parent_id,
+                'relationships/' if kwargs.get('ids_only') else '',
+                prop.key
+            )
+            links = build_pagination_links(
+                url,
+                unpaged,
+                self.get_id(model),
+                sort=kwargs.get('sort'),
+                limit=limit,
+                offset=offset,
+                after=after
+            )
+            links.update(kwargs.get('links') or {})
+            kwargs['links'] = links
+        return from_obj
+
     def select(self, model, **kwargs):
         """
         Builds a query for selecting multiple resource instances::
@@ -315,25 +793,260 @@ class QueryBuilder(object):
         :param as_text:
             Whether or not to build a query that returns the results as text
             (raw json).
+        :param as_bytes:
+            Whether or not to build a query that returns the results as UTF-8
+            encoded bytes (raw json). See :func:`splice_members` for adding
+            extra top level members to raw json documents.
+        :param etag:
+            Whether or not to build a query that also returns an md5 hash of
+            the document in an additional `etag` column.
+        :param if_none_match:
+            The value of an If-None-Match request header. If given along with
+            `etag` parameter, the query returns `NULL` as the document when
+            the hash of the document matches one of the given entity tags.
+            See :func:`execute_conditional`.
         """
-        from_obj = kwargs.pop('from_obj', None)
+        return self._select(model, **kwargs)
+
+    def _select(self, model, cte_name='main_query', **kwargs):
+        etag = kwargs.pop('etag', False)
+        if_none_match = kwargs.pop('if_none_match', None)
+        from_obj = self._get_select_from_obj(
+            model,
+            kwargs.pop('from_obj', None),
+            cte_name,
+            **kwargs
+        )
+        query = SelectExpression(self, model, from_obj).build_select(**kwargs)
+        return self._select_with_etag(query, etag, if_none_match)
+
+    def _get_select_from_obj(
+        self,
+        model,
+        from_obj,
+        cte_name='main_query',
+        sort=None,
+        limit=None,
+        offset=None,
+        **kwargs
+    ):
         if from_obj is None:
             from_obj = sa.orm.query.Query(model)
 
-        if kwargs.get('sort') is not None:
-            from_obj = apply_sort(
-                from_obj.statement,
-                from_obj,
-                kwargs.get('sort')
+        if sort is not None:
+            from_obj = apply_sort(from_obj.statement, from_obj, sort)
+        if limit is not None:
+            from_obj = from_obj.limit(limit)
+        if offset is not None:
+            from_obj = from_obj.offset(offset)
+
+        return from_obj.cte(cte_name)
+
+    def select_one_batch(self, model, ids, **kwargs):
+        """
+        Builds a query for selecting the single resource documents of
+        multiple resources with the same parameters. The query returns a row
+        with the requested id and the document of each given id. The document
+        is `None` if the resource does not exist::
+
+            query = query_builder.select_one_batch(
+                Article,
+                [1, 2, 3],
+                include=['author']
             )
-        if kwargs.get('limit') is not None:
-            from_obj = from_obj.limit(kwargs.get('limit'))
-        if kwargs.get('offset') is not None:
-            from_obj = from_obj.offset(kwargs.get('offset'))
+            documents = dict(session.execute(query).fetchall())
 
-        from_obj = from_obj.cte('main_query')
+        Each document is built exactly as :meth:`select_one` would build it,
+        including the included resources of that document only. Models with
+        composite ids are not supported.
 
-        return SelectExpression(self, model, from_obj).build_select(**kwargs)
+        :param model:
+            The root model to build the select query from.
+        :param ids:
+            A list of ids of the resources to select.
+
+        .. versionadded: 0.5.0
+        """
+        requested_ids = sa.func.unnest(
+            sa.bindparam(
+                'ids',
+                list(ids),
+                type_=postgresql.ARRAY(model.id.type)
+            )
+        ).alias('requested_ids')
+        # A literal column is used so that SQLAlchemy does not add the
+        # requested ids to the FROM clauses of the correlated document query.
+        requested_id = sa.literal_column('requested_ids')
+        document = self.select_one(model, requested_id, **kwargs)
+        return sa.select(
+            [
+                requested_id.label('id'),
+                document.as_scalar().label('document')
+            ],
+            from_obj=requested_ids
+        )
+
+    def select_batch(self, requests):
+        """
+        Builds a query for selecting multiple independent documents in a
+        single statement. Each request is a tuple of a select method name,
+        the positional arguments and optionally the keyword arguments of the
+        method. The query returns a single row with one document column per
+        request::
+
+            query = query_builder.select_batch([
+                ('select_one', (Article, 1), {'include': ['author']}),
+                ('select', (User, ), {'fields': {'users': ['name']}}),
+                ('select_related', ((Article, 1), 'comments')),
+            ])
+            documents = list(session.execute(query).first())
+
+        The document of a `select_one` request is `None` if the resource does
+        not exist. The `etag` parameter is not supported in batches.
+
+        :param requests:
+            A list of ``(method, args)`` or ``(method, args, kwargs)`` tuples
+            where method is one of 'select', 'select_one', 'select_related'
+            and 'select_relationship'.
+
+        .. versionadded: 0.5.0
+        """
+        columns = []
+        for index, request in enumerate(requests):
+            method, args = request[0], request[1]
+            kwargs = dict(request[2]) if len(request) > 2 else {}
+            if kwargs.get('etag'):
+                raise TypeError(
+                    'The etag parameter is not supported in batch requests.'
+                )
+            if method == 'select':
+                # Every select query needs a CTE of its own.
+                query = self._select(
+                    *args,
+                    cte_name='main_query_{0}'.format(index),
+                    **kwargs
+                )
+            elif method in BATCH_METHODS:
+                query = getattr(self, method)(*args, **kwargs)
+            else:
+                raise ValueError(
+                    "Unknown batch request method '{0}'.".format(method)
+                )
+            columns.append(
+                query.as_scalar().label('document_{0}'.format(index))
+            )
+        return sa.select(columns)
+
+    def select_rows(self, model, **kwargs):
+        """
+        Builds flat row queries for selecting multiple resource instances.
+        Instead of building the JSON document in the database the returned
+        :class:`RowSetQuery` selects the resource ids, attributes and related
+        resource ids of the main and included resources as plain columns in a
+        single statement and assembles the document in Python::
+
+            row_set_query = query_builder.select_rows(
+                Article,
+                fields={'articles': ['name', 'author', 'comments']},
+                include=['author']
+            )
+            document = row_set_query.execute(session)
+
+        The assembled document is identical to the one returned by the
+        equivalent :meth:`select` query. This method accepts the same
+        parameters as :meth:`select` except for `as_text` and `as_bytes`.
+
+        .. versionadded: 0.5.0
+        """
+        from_obj = self._get_select_from_obj(
+            model,
+            kwargs.pop('from_obj', None),
+            **kwargs
+        )
+        return RowsExpression(self, model, from_obj).build_rows(**kwargs)
+
+    def select_export(self, model, format='csv', header=True, **kwargs):
+        """
+        Builds an :class:`.ExportQuery` for exporting resources in bulk. The
+        rows are written with ``COPY (SELECT ...) TO STDOUT`` directly to a
+        file-like object::
+
+            export_query = query_builder.select_export(
+                Article,
+                format='csv',
+                fields={'articles': ['name', 'author']},
+                sort=['id']
+            )
+            with open('articles.csv', 'w') as file:
+                export_query.copy_to(session, file)
+
+        Fields are selected and validated the same way as in :meth:`select`
+        and the type formatters of the query builder are applied. In
+        ``'csv'`` format each row has the resource id, the attributes and the
+        ids of the related resources as columns. In ``'jsonl'`` format each
+        line is a JSON API resource object.
+
+        :param model:
+            The root model to export the resources from.
+        :param format:
+            The export format, ``'csv'`` or ``'jsonl'``.
+        :param header:
+            Whether or not to write a header row in ``'csv'`` format.
+        :param fields:
+            A mapping of fields. Keys representing model keys and values as
+            lists of model descriptor names.
+        :param sort:
+            List of attributes to apply as an order by for the root model.
+        :param limit:
+            Applies an SQL LIMIT to the root model.
+        :param offset:
+            Applies an SQL OFFSET to the root model.
+        :param from_obj:
+            A SQLAlchemy selectable (for example a Query object) to select the
+            query results from.
+
+        .. versionadded: 0.5.0
+        """
+        fields = kwargs.pop('fields', None)
+        SelectExpression(self, model, model).validate_field_keys(fields)
+        from_obj = self._get_select_from_obj(
+            model,
+            kwargs.pop('from_obj', None),
+            **kwargs
+        )
+        data_expr = DataExpression(self, model, from_obj)
+        if format == 'jsonl':
+            query = data_expr.build_data(
+                Parameters(
+                    fields=fields or {},
+                    include=None,
+                    sort=None,
+                    offset=None,
+                    limit=None
+                )
+            )
+        else:
+            query = data_expr.build_export_rows(fields or {})
+        return ExportQuery(query, format=format, header=header)
+
+    def select_one_rows(self, model, id, **kwargs):
+        """
+        Builds flat row queries for selecting single resource instance. See
+        :meth:`select_rows` for details. The assembled document is `None`
+        if the resource does not exist.
+
+        .. versionadded: 0.5.0
+        """
+        from_obj = kwargs.pop('from_obj', None)
+        if from_obj is None:
+            from_obj = sa.orm.query.Query(model)
+
+        from_obj = from_obj.filter(model.id == id).subquery()
+
+        return RowsExpression(self, model, from_obj).build_rows(
+            multiple=False,
+            **kwargs
+        )
 
     def select_one(self, model, id, **kwargs):
         """
@@ -368,7 +1081,21 @@ class QueryBuilder(object):
         :param as_text:
             Whether or not to build a query that returns the results as text
             (raw json).
+        :param as_bytes:
+            Whether or not to build a query that returns the results as UTF-8
+            encoded bytes (raw json). See :func:`splice_members` for adding
+            extra top level members to raw json documents.
+        :param etag:
+            Whether or not to build a query that also returns an md5 hash of
+            the document in an additional `etag` column.
+        :param if_none_match:
+            The value of an If-None-Match request header. If given along with
+            `etag` parameter, the query returns `NULL` as the document when
+            the hash of the document matches one of the given entity tags.
+            See :func:`execute_conditional`.
         """
+        etag = kwargs.pop('etag', False)
+        if_none_match = kwargs.pop('if_none_match', None)
         from_obj = kwargs.pop('from_obj', None)
         if from_obj is None:
             from_obj = sa.orm.query.Query(model)
@@ -380,10 +1107,460 @@ class QueryBuilder(object):
             **kwargs
         )
         query = query.where(query._froms[0].c.data.isnot(None))
-        return query
+        return self._select_with_etag(query, etag, if_none_match)
+
+    def insert(self, model, document, **kwargs):
+        """
+        Builds a query that inserts a new resource and returns its JSON API
+        document in the same statement. The ``INSERT ... RETURNING``
+        statement is used as a CTE from which the document is selected::
+
+            query = query_builder.insert(
+                Article,
+                {
+                    'data': {
+                        'type': 'articles',
+                        'attributes': {'name': 'Some article'},
+                        'relationships': {
+                            'author': {'data': {'type': 'users', 'id': '1'}}
+                        }
+                    }
+                },
+                include=['author']
+            )
+            document = session.execute(query).scalar()
+
+        Attributes must map to single columns of the model table and only
+        to-one relationships with local foreign keys can be given. Note that
+        other parts of the statement see the database as it was before the
+        insert, so for example included resources that refer back to the new
+        resource do not contain it.
+
+        :param model:
+            The model of the resource to insert.
+        :param document:
+            A JSON API document with a resource object as primary data.
+        :param fields:
+            A mapping of fields. Keys representing model keys and values as
+            lists of model descriptor names.
+        :param include:
+            List of dot-separated relationship paths.
+        :param links:
+            A dictionary of links to apply as top level links in the built
+            query.
+        :param as_text:
+            Whether or not to build a query that returns the results as text
+            (raw json).
+        :param as_bytes:
+            Whether or not to build a query that returns the results as UTF-8
+            encoded bytes (raw json).
+
+        .. versionadded: 0.5.0
+        """
+        values = self.get_resource_values(model, document)
+        table = sa.inspect(model).local_table
+        from_obj = ReturningInsert(table).values(values).returning(
+            *table.c
+        ).cte('main_query')
+        return SelectExpression(self, model, from_obj).build_select(
+            multiple=False,
+            **kwargs
+        )
+
+    def update(self, model, id, document, **kwargs):
+        """
+        Builds a query that updates given resource and returns its JSON API
+        document in the same statement. The query returns no rows if the
+        resource does not exist. See :meth:`insert` for details::
+
+            query = query_builder.update(
+                Article,
+                1,
+                {
+                    'data': {
+                        'type': 'articles',
+                        'id': '1',
+                        'attributes': {'name': 'Updated article'}
+                    }
+                }
+            )
+
+        :param model:
+            The model of the resource to update.
+        :param id:
+            The id of the resource to update.
+        :param document:
+            A JSON API document with a resource object as primary data.
+
+        .. versionadded: 0.5.0
+        """
+        values = self.get_resource_values(model, document, id=id)
+        if values:
+            table = sa.inspect(model).local_table
+            from_obj = ReturningUpdate(table).values(values).where(
+                model.id == id
+            ).returning(*table.c).cte('main_query')
+        else:
+            from_obj = sa.orm.query.Query(model).filter(
+                model.id == id
+            ).subquery()
+        query = SelectExpression(self, model, from_obj).build_select(
+            multiple=False,
+            **kwargs
+        )
+        return query.where(query._froms[0].c.data.isnot(None))
+
+    def replace_relationship(self, obj, relationship_key, ids, **kwargs):
+        """
+        Builds a query that replaces the members of a to-many relationship
+        with given related resources and returns the new resource linkage
+        (``PATCH /articles/1/relationships/tags``). The rows to delete and
+        insert into the secondary table are computed in a single statement
+        without loading the relationship collection::
+
+            query = query_builder.replace_relationship(
+                (User, 1),
+                'groups',
+                [2, 3]
+            )
+            document, removed, added = session.execute(query).first()
+            # document == {'data': [
+            #     {'type': 'groups', 'id': '2'},
+            #     {'type': 'groups', 'id': '3'}
+            # ]}
+
+        Besides the document the query returns the number of removed and
+        added secondary table rows in the `removed` and `added` columns. Only
+        relationships with a secondary table can be mutated. Relationship
+        collections of objects already loaded in the session are not
+        updated.
+
+        :param obj:
+            The root object or a tuple of the root model and the id of the
+            root resource.
+        :param relationship_key:
+            The key of the to-many relationship.
+        :param ids:
+            The ids of the related resources.
+
+        Other keyword arguments are the same as in
+        :meth:`select_relationship`.
+
+        .. versionadded: 0.5.0
+        """
+        return self._mutate_relationship(
+            obj,
+            relationship_key,
+            ids,
+            remove=True,
+            add=True,
+            **kwargs
+        )
+
+    def add_to_relationship(self, obj, relationship_key, ids, **kwargs):
+        """
+        Builds a query that adds given related resources to a to-many
+        relationship and returns the new resource linkage
+        (``POST /articles/1/relationships/tags``). Resources that already
+        are members of the relationship are skipped. See
+        :meth:`replace_relationship` for details.
+
+        .. versionadded: 0.5.0
+        """
+        return self._mutate_relationship(
+            obj,
+            relationship_key,
+            ids,
+            add=True,
+            **kwargs
+        )
+
+    def remove_from_relationship(self, obj, relationship_key, ids, **kwargs):
+        """
+        Builds a query that removes given related resources from a to-many
+        relationship and returns the new resource linkage
+        (``DELETE /articles/1/relationships/tags``). See
+        :meth:`replace_relationship` for details.
+
+        .. versionadded: 0.5.0
+        """
+        return self._mutate_relationship(
+            obj,
+            relationship_key,
+            ids,
+            remove=True,
+            **kwargs
+        )
+
+    def _mutate_relationship(
+        self,
+        obj,
+        relationship_key,
+        ids,
+        remove=False,
+        add=False,
+        **kwargs
+    ):
+        if isinstance(obj, tuple):
+            parent_model, parent_id = obj
+        else:
+            parent_model, parent_id = obj.__class__, obj.id
+        table, local_column, remote_column = self.get_secondary_columns(
+            parent_model,
+            relationship_key
+        )
+        prop = sa.inspect(parent_model).relationships[relationship_key]
+        model = prop.mapper.class_
+        ids = sa.cast(
+            sa.bindparam('ids', [str(id) for id in ids]),
+            postgresql.ARRAY(remote_column.type)
+        )
+        is_member = self._parent_id_condition(parent_model, parent_id, prop)
+        in_ids = model.id == sa.any_(ids)
+
+        # The statements below run against the same snapshot as the linkage
+        # query, so the new linkage is computed from the given ids instead of
+        # reading the secondary table.
+        if remove and add:
+            condition = in_ids
+        elif add:
+            condition = sa.or_(is_member, in_ids)
+        else:
+            condition = sa.and_(is_member, model.id != sa.all_(ids))
+        query = self._build_related_select(
+            sa.orm.query.Query(model).filter(condition),
+            prop,
+            parent_id,
+            ids_only=True,
+            **kwargs
+        )
+
+        removed = sa.literal(0)
+        if remove:
+            deleted = table.delete().where(
+                local_column == parent_id
+            ).where(
+                remote_column != sa.all_(ids)
+                if add else
+                remote_column == sa.any_(ids)
+            ).returning(remote_column).cte('removed_rows')
+            removed = sa.select([
+                sa.func.count()
+            ]).select_from(deleted).as_scalar()
+        added = sa.literal(0)
+        if add:
+            new_ids = sa.select([
+                sa.func.unnest(ids).label('id')
+            ]).distinct().alias('new_ids')
+            inserted = postgresql.insert(table).from_select(
+                [local_column, remote_column],
+                sa.select([
+                    sa.literal(parent_id, local_column.type),
+                    new_ids.c.id
+                ]).where(
+                    ~sa.exists().where(
+                        sa.and_(
+                            local_column == parent_id,
+                            remote_column == new_ids.c.id
+                        )
+                    )
+                )
+            ).on_conflict_do_nothing().returning(
+                remote_column
+            ).cte('added_rows')
+            added = sa.select([
+                sa.func.count()
+            ]).select_from(inserted).as_scalar()
+        return query.column(removed.label('removed')).column(
+            added.label('added')
+        )
+
+    def get_resource_values(self, model, document, id=None):
+        """
+        Return a dictionary of column values for given JSON API resource
+        document.
+
+        :param model: The model of the resource.
+        :param document: A JSON API document with a resource object.
+        :param id:
+            The id of an existing resource. If given, the id of the resource
+            object must match it.
+        """
+        try:
+            data = document['data']
+            type_ = data['type']
+        except (KeyError, TypeError):
+            raise InvalidDocument(
+                'Given document does not have a resource object with a type '
+                'as primary data.'
+            )
+        if type_ != self.get_resource_type(model):
+            raise InvalidDocument(
+                "Resource type '{0}' does not match the type '{1}' of given "
+                "model.".format(type_, self.get_resource_type(model))
+            )
+        values = {}
+        if 'id' in data:
+            if id is not None:
+                if str(data['id']) != str(id):
+                    raise InvalidDocument(
+                        "Resource id '{0}' does not match the given id "
+                        "'{1}'.".format(data['id'], id)
+                    )
+            else:
+                values[self.get_value_column(model, 'id')] = data['id']
+
+        for field, value in get_members(data, 'attributes').items():
+            values[self.get_attribute_column(model, field)] = value
+
+        for key, relationship in get_members(data, 'relationships').items():
+            column = self.get_foreign_key_column(model, key)
+            values[column] = self.get_linkage_ids(model, key, relationship)
+        return values
+
+    def get_linkage_ids(self, model, key, relationship):
+        """
+        Return the related resource ids of the resource linkage of given
+        relationship object. For to-one relationships the id or `None` is
+        returned and for to-many relationships a list of ids. Raises
+        :class:`.InvalidDocument` if the linkage does not have the shape of
+        the relationship or the type of a resource identifier does not
+        match the type of the related model.
+
+        :param model: The model of the resource.
+        :param key: The name of the relationship.
+        :param relationship: A JSON API relationship object.
+        """
+        prop = self.get_relationship_property(model, key)
+        type_ = self.get_resource_type(prop.mapper.class_)
+        linkage = get_linkage(key, relationship)
+        if prop.uselist:
+            if not isinstance(linkage, list):
+                raise InvalidDocument(
+                    "Resource linkage of to-many relationship '{0}' must be "
+                    "an array.".format(key)
+                )
+            return [
+                get_identifier_id(key, type_, identifier)
+                for identifier in linkage
+            ]
+        if linkage is None:
+            return None
+        return get_identifier_id(key, type_, linkage)
+
+    def get_attribute_column(self, model, field):
+        """
+        Return the column of the model table given attribute is written to.
+        The attribute is validated against the model metadata only once and
+        the result is cached.
+
+        :param model: The model of the resource.
+        :param field: The name of the attribute.
+        """
+        key = (model, field)
+        try:
+            return self._attribute_columns[key]
+        except KeyError:
+            pass
+        expr = AttributesExpression(self, model, model)
+        if expr.is_relationship_field(field):
+            raise InvalidField(
+                "Field '{0}' is a relationship and must be given in "
+                "relationships object.".format(field)
+            )
+        if field not in self.get_hybrid_names(model):
+            expr.validate_field(field, get_all_descriptors(model))
+        column = self.get_value_column(model, field)
+        expr.validate_column(field, column)
+        self._attribute_columns[key] = column
+        return column
+
+    def get_relationship_property(self, model, key):
+        mapper = get_mapper(model)
+        if key not in mapper.relationships.keys():
+            raise UnknownRelationship(
+                "Unknown relationship '{0}'. Model {1} does not have "
+                "relationship named '{0}'.".format(key, model)
+            )
+        return mapper.relationships[key]
+
+    def get_foreign_key_column(self, model, key):
+        """
+        Return the local foreign key column of given to-one relationship.
+        Raises :class:`.InvalidField` if the relationship can not be written
+        by setting a single foreign key of the model table.
+
+        :param model: The model of the resource.
+        :param key: The name of the relationship.
+        """
+        prop = self.get_relationship_property(model, key)
+        if (
+            prop.direction.name != 'MANYTOONE' or
+            prop.secondary is not None or
+            len(prop.local_remote_pairs) != 1
+        ):
+            raise InvalidField(
+                "Relationship '{0}' can not be written. Only to-one "
+                "relationships with a single local foreign key are "
+                "supported.".format(key)
+            )
+        return prop.local_remote_pairs[0][0]
+
+    def get_secondary_columns(self, model, key):
+        """
+        Return a tuple of the secondary table of given to-many relationship
+        and the columns of the secondary table referring to the resource and
+        the related resource. Raises :class:`.InvalidField` if the
+        relationship can not be written through a secondary table.
+
+        :param model: The model of the resource.
+        :param key: The name of the relationship.
+        """
+        cache_key = (model, key)
+        try:
+            return self._secondary_columns[cache_key]
+        except KeyError:
+            pass
+        prop = self.get_relationship_property(model, key)
+        if (
+            prop.viewonly or
+            not isinstance(prop.secondary, sa.Table) or
+            len(prop.synchronize_pairs) != 1 or
+            len(prop.secondary_synchronize_pairs) != 1
+        ):
+            raise InvalidField(
+                "Relationship '{0}' can not be written. Only to-many "
+                "relationships with a secondary table and single foreign "
+                "keys are supported.".format(key)
+            )
+        columns = (
+            prop.secondary,
+            prop.synchronize_pairs[0][1],
+            prop.secondary_synchronize_pairs[0][1]
+        )
+        self._secondary_columns[cache_key] = columns
+        return columns
+
+    def get_value_column(self, model, field):
+        table = sa.inspect(model).local_table
+        attr = getattr(model, field)
+        column = getattr(attr, 'expression', attr)
+        if (
+            not isinstance(column, sa.Column) or
+            table.corresponding_column(column) is None
+        ):
+            raise InvalidField(
+                "Field '{0}' can not be written. Only attributes mapped to a "
+                "single column of the model table are supported.".format(field)
+            )
+        return table.corresponding_column(column)
 
 
 class Expression(object):
+    # Expression objects are created for every model and include of every
+    # request, so they don't carry an instance dictionary.
+    __slots__ = ('query_builder', 'model', 'from_obj')
+
     def __init__(self, query_builder, model, from_obj):
         self.query_builder = query_builder
         self.model = model
@@ -391,10 +1568,23 @@ class Expression(object):
 
     @property
     def args(self):
-        return [self.query_builder, self.model, self.from_obj]
+        return (self.query_builder, self.model, self.from_obj)
 
 
 class SelectExpression(Expression):
+    __slots__ = ()
+
+    def check_cost(self, fields, include, limit, multiple):
+        if self.query_builder.cost_estimator is not None:
+            self.query_builder.cost_estimator.check(
+                self.query_builder,
+                self.model,
+                fields=fields,
+                include=include,
+                limit=limit,
+                multiple=multiple
+            )
+
     def validate_field_keys(self, fields):
         if fields:
             unknown_keys = (
@@ -420,9 +1610,11 @@ class SelectExpression(Expression):
         links=None,
         multiple=True,
         ids_only=False,
-        as_text=False
+        as_text=False,
+        as_bytes=False
     ):
         self.validate_field_keys(fields)
+        self.check_cost(fields, include, limit, multiple)
         if fields is None:
             fields = {}
 
@@ -442,9 +1634,11 @@ class SelectExpression(Expression):
 
         main_json_query = sa.select(from_args).alias('main_json_query')
 
-        expr = sa.func.row_to_json(sa.text('main_json_query.*'))
-        if as_text:
-            expr = sa.cast(expr, sa.Text)
+        expr = render_json(
+            sa.func.row_to_json(sa.text('main_json_query.*')),
+            as_text=as_text,
+            as_bytes=as_bytes
+        )
 
         query = sa.select(
             [expr],
@@ -486,6 +1680,248 @@ class SelectExpression(Expression):
         return from_args
 
 
+class RowsExpression(Expression):
+    __slots__ = ()
+
+    def build_rows(
+        self,
+        fields=None,
+        include=None,
+        sort=None,
+        limit=None,
+        offset=None,
+        links=None,
+        multiple=True,
+        ids_only=False
+    ):
+        select_expr = SelectExpression(*self.args)
+        select_expr.validate_field_keys(fields)
+        select_expr.check_cost(fields, include, limit, multiple)
+        if fields is None:
+            fields = {}
+
+        main = DataExpression(*self.args).build_row_set(fields, ids_only)
+        included = None
+        if include:
+            include_expr = IncludeExpression(*self.args)
+            included = [
+                include_expr.build_single_included_row_set(
+                    fields,
+                    subpath,
+                    relationships
+                )
+                for path in include
+                for subpath, relationships
+                in self.query_builder.get_include_paths(self.model, path)
+            ]
+        assembler = DocumentAssembler(
+            base_url=self.query_builder.base_url,
+            sort_included=self.query_builder.sort_included
+        )
+        return RowSetQuery(
+            assembler,
+            self.build_rows_query(main, included),
+            main,
+            included=included,
+            multiple=multiple,
+            ids_only=ids_only,
+            links=links
+        )
+
+    def build_rows_query(self, main, included):
+        """
+        Build a single query returning the rows of the main row set and the
+        included row sets. The row sets are full outer joined on a false
+        condition, so each row has the columns of exactly one row set and
+        `NULL` in the columns of the others. The main rows keep their order
+        with the row number of the main row.
+        """
+        row_sets = [
+            label_row_set_columns(main.query).column(
+                sa.func.row_number().over().label('ordinal')
+            ).alias('row_set_0')
+        ]
+        row_sets.extend(
+            label_row_set_columns(row_set.query).alias(
+                'row_set_{0}'.format(index)
+            )
+            for index, row_set in enumerate(included or [], 1)
+        )
+        from_obj = row_sets[0]
+        for row_set in row_sets[1:]:
+            from_obj = from_obj.join(row_set, sa.false(), full=True)
+        return sa.select(
+            [column for row_set in row_sets for column in row_set.c],
+            from_obj=from_obj
+        ).order_by(row_sets[0].c.ordinal).apply_labels()
+
+
+def label_row_set_columns(query):
+    """
+    Label the columns of given row set query by position. Attributes
+    sharing a column would otherwise select the same column name twice.
+    """
+    return query.with_only_columns([
+        column.label('c{0}'.format(index))
+        for index, column in enumerate(query.inner_columns)
+    ])
+
+
+def get_linkage(key, relationship):
+    try:
+        return relationship['data']
+    except (KeyError, TypeError):
+        raise InvalidDocument(
+            "Relationship '{0}' does not have resource linkage "
+            "data.".format(key)
+        )
+
+
+def get_members(data, key):
+    members = data.get(key) or {}
+    if not isinstance(members, dict):
+        raise InvalidDocument(
+            "Member '{0}' of a resource object must be an object.".format(key)
+        )
+    return members
+
+
+def get_identifier_id(key, type_, identifier):
+    try:
+        identifier_type = identifier['type']
+        id = identifier['id']
+    except (KeyError, TypeError):
+        raise InvalidDocument(
+            "Resource linkage of relationship '{0}' must contain resource "
+            "identifier objects with a type and an id.".format(key)
+        )
+    if identifier_type != type_:
+        raise InvalidDocument(
+            "Resource type '{0}' does not match the type '{1}' of "
+            "relationship '{2}'.".format(identifier_type, type_, key)
+        )
+    return id
+
+
+def render_json(expr, as_text=False, as_bytes=False):
+    if as_bytes:
+        # The document is sent as text, which bypasses the json typecaster
+        # of the driver, and encoded to bytes in Python. Converting it to
+        # bytea in the database would double the size on the wire.
+        return sa.cast(expr, RawJSONBytes)
+    if as_text:
+        return sa.cast(expr, sa.Text)
+    return expr
+
+
+def select_with_etag(query, if_none_match=None):
+    # OFFSET 0 prevents PostgreSQL from pulling up the document subquery and
+    # evaluating the document expression once per reference.
+    document_query = query.offset(0).alias('document_query')
+    document = list(document_query.c)[0]
+    etag = sa.func.md5(sa.cast(document, sa.Text))
+    etag_query = sa.select(
+        [document.label('document'), etag.label('etag')],
+        from_obj=document_query
+    ).alias('etag_query')
+
+    document = etag_query.c.document
+    entity_tags = parse_if_none_match(if_none_match)
+    if entity_tags == ['*']:
+        document = sa.null()
+    elif entity_tags:
+        document = sa.type_coerce(
+            sa.case(
+                [(etag_query.c.etag.in_(entity_tags), sa.null())],
+                else_=document
+            ),
+            document.type
+        )
+    return sa.select(
+        [document.label('document'), etag_query.c.etag],
+        from_obj=etag_query
+    )
+
+
+def keyset_condition(model, sort, after):
+    """
+    Return a condition that filters the rows of given model that come after
+    the row with id `after` when the rows are sorted by given sort parameter
+    and id.
+    """
+    keys = [
+        (param[1:], True) if param[0] == '-' else (param, False)
+        for param in sort
+    ]
+    if 'id' not in [key for key, descending in keys]:
+        keys.append(('id', False))
+    table = get_selectable(model)
+    anchor = sa.orm.aliased(model)
+    anchor_table = get_selectable(anchor)
+    conditions = []
+    equal = []
+    for key, descending in keys:
+        column = getattr(table.c, key)
+        value = sa.select(
+            [getattr(anchor_table.c, key)]
+        ).where(anchor.id == after).as_scalar()
+        condition = column < value if descending else column > value
+        conditions.append(sa.and_(*(equal + [condition])))
+        equal.append(column == value)
+    return sa.or_(*conditions)
+
+
+def build_pagination_links(
+    url,
+    query,
+    id,
+    sort=None,
+    limit=None,
+    offset=None,
+    after=None
+):
+    """
+    Return JSON API pagination links for given unpaginated query. The next
+    link is `null` if there are no more rows after the current page.
+    """
+    params = []
+    if sort:
+        params.append('sort={0}'.format(','.join(sort)))
+    params.append('page[limit]={0}'.format(limit))
+
+    def build_url(*page_params):
+        return '{0}?{1}'.format(url, '&'.join(params + list(page_params)))
+
+    has_next = query.offset(limit + (offset or 0)).limit(1).exists()
+    if after is not None:
+        cursor = query.offset(limit - 1).limit(1).with_entities(id)
+        next_link = sa.func.concat(
+            s(build_url('page[after]=')),
+            cursor.as_scalar()
+        )
+        return {
+            'first': build_url(),
+            'next': sa.case([(has_next, next_link)], else_=sa.null())
+        }
+
+    offset = offset or 0
+    links = {
+        'first': build_url('page[offset]=0'),
+        'next': sa.case(
+            [(
+                has_next,
+                s(build_url('page[offset]={0}'.format(offset + limit)))
+            )],
+            else_=sa.null()
+        )
+    }
+    if offset:
+        links['prev'] = build_url(
+            'page[offset]={0}'.format(max(offset - limit, 0))
+        )
+    return links
+
+
 def apply_sort(from_obj, query, sort):
     for param in sort:
         query = query.order_by(
@@ -497,6 +1933,8 @@ def apply_sort(from_obj, query, sort):
 
 
 class AttributesExpression(Expression):
+    __slots__ = ()
+
     @property
     def all_fields(self):
         return [
@@ -512,30 +1950,52 @@ class AttributesExpression(Expression):
         ]
 
     def should_skip_columnar_descriptor(self, descriptor):
+        if isinstance(descriptor, hybrid_property):
+            # Use the cached adapted expression instead of evaluating the
+            # hybrid expression against the aliased class again.
+            descriptor = self.adapt_hybrid(descriptor)
         columns = get_descriptor_columns(self.from_obj, descriptor)
         return (len(columns) == 1 and columns[0].foreign_keys)
 
+    def adapt_hybrid(self, descriptor):
+        return self.query_builder.adapt_expression(
+            self.model,
+            descriptor.__name__,
+            self.from_obj
+        )
+
     @property
     def adapted_descriptors(self):
-        return (
-            get_all_descriptors(self.from_obj).items() +
-            [
+        return chain(
+            get_all_descriptors(self.from_obj).items(),
+            (
                 (
                     key,
-                    adapt(self.from_obj, getattr(self.model, key))
+                    self.query_builder.adapt_expression(
+                        self.model,
+                        key,
+                        self.from_obj
+                    )
                 )
-                for key in get_hybrid_properties(self.model).keys()
-            ]
+                for key in self.query_builder.get_hybrid_names(
+                    self.model
+                )
+            )
         )
 
     def adapt_attribute(self, attr_name):
         cols = get_attrs(self.from_obj)
-        hybrids = get_hybrid_properties(self.model).keys()
         if (
-            attr_name in hybrids or
+            attr_name in self.query_builder.get_hybrid_names(
+                self.model
+            ) or
             attr_name in self.column_property_expressions
         ):
-            column = adapt(self.from_obj, getattr(self.model, attr_name))
+            column = self.query_builder.adapt_expression(
+                self.model,
+                attr_name,
+                self.from_obj
+            )
         else:
             column = getattr(cols, attr_name)
         return self.format_column(column)
@@ -585,7 +2045,7 @@ class AttributesExpression(Expression):
 
     def validate_fields(self, fields):
         descriptors = get_all_descriptors(self.from_obj)
-        hybrids = get_hybrid_properties(self.model)
+        hybrids = self.query_builder.get_hybrid_names(self.model)
         expressions = self.column_property_expressions
 
         for field in fields:
@@ -595,15 +2055,7 @@ class AttributesExpression(Expression):
 
     @property
     def column_property_expressions(self):
-        return dict([
-            (key, attr)
-            for key, attr
-            in get_mapper(self.model).attrs.items()
-            if (
-                isinstance(attr, sa.orm.ColumnProperty) and
-                not isinstance(attr.columns[0], sa.Column)
-            )
-        ])
+        return self.query_builder.get_column_property_expressions(self.model)
 
     def get_model_fields(self, fields):
         model_key = self.query_builder.get_resource_type(self.model)
@@ -621,17 +2073,25 @@ class AttributesExpression(Expression):
     def build_attributes(self, fields):
         return chain_if(
             *(
-                [s(key), self.adapt_attribute(key)]
+                (s(key), self.adapt_attribute(key))
                 for key in self.get_model_fields(fields)
             )
         )
 
+    def build_row_attribute(self, key):
+        column = self.adapt_attribute(key)
+        if not isinstance(column.type, JSON_NATIVE_TYPES):
+            column = sa.func.to_json(column)
+        return column.label(key)
+
 
 class RelationshipsExpression(Expression):
-    def build_relationships(self, fields):
+    __slots__ = ()
+
+    def build_relationships(self, fields, joins=None):
         return chain_if(
             *(
-                self.build_relationship(relationship)
+                self.build_relationship(relationship, joins)
                 for relationship
                 in self.get_relationship_properties(fields)
             )
@@ -643,6 +2103,9 @@ class RelationshipsExpression(Expression):
             alias
         )
         expr = sa.func.json_build_object(*identifier).label('json_object')
+        return self.build_relationship_query(relationship, alias, expr)
+
+    def build_relationship_query(self, relationship, alias, expr):
         query = select_correlated_expression(
             self.model,
             expr,
@@ -650,7 +2113,7 @@ class RelationshipsExpression(Expression):
             alias,
             get_selectable(self.from_obj),
             order_by=self.build_order_by(relationship, alias)
-        ).alias('relationships')
+        ).alias()
         return query
 
     def build_order_by(self, relationship, alias):
@@ -676,27 +2139,84 @@ class RelationshipsExpression(Expression):
             )
         ]).select_from(query)
 
-    def build_relationship(self, relationship):
+    def build_grouped_relationship_data(self, relationship, alias, joins):
+        from_obj = get_selectable(self.from_obj)
+        identifier = self.query_builder.build_resource_identifier(
+            alias,
+            alias
+        )
+        expr = sa.func.json_build_object(*identifier)
+        order_by = [
+            ClauseAdapter(sa.inspect(alias).selectable).traverse(column)
+            for column in self.build_order_by(relationship, alias)
+        ]
+        parent_id = from_obj.c.id
+        query = select_correlated_expression(
+            self.model,
+            expr,
+            relationship.key,
+            alias,
+            from_obj,
+            correlate=False
+        ).with_only_columns([
+            parent_id.label('parent_id'),
+            sa.func.array_agg(
+                postgresql.aggregate_order_by(expr, *order_by)
+            ).label('json_objects')
+        ]).group_by(parent_id).alias()
+        joins.append((query, query.c.parent_id == parent_id))
+        return sa.func.coalesce(query.c.json_objects, json_array)
+
+    def build_relationship(self, relationship, joins=None):
         cls = relationship.mapper.class_
         alias = sa.orm.aliased(cls)
-        query = (
-            self.build_relationship_data_array(relationship, alias)
-            if relationship.uselist else
-            self.build_relationship_data(relationship, alias)
-        )
-        args = [s('data'), query.as_scalar()]
+        if joins is not None and (
+            self.query_builder.get_relationship_strategy(
+                self.model,
+                relationship
+            ) == 'grouped'
+        ):
+            data = self.build_grouped_relationship_data(
+                relationship,
+                alias,
+                joins
+            )
+        elif relationship.uselist:
+            data = self.build_relationship_data_array(
+                relationship,
+                alias
+            ).as_scalar()
+        else:
+            data = self.build_relationship_data(
+                relationship,
+                alias
+            ).as_scalar()
         if self.query_builder.base_url:
             links = LinksExpression(*self.args).build_relationship_links(
                 relationship.key
             )
-            args.extend([
+            data = sa.func.json_build_object(
+                s('data'),
+                data,
                 s('links'),
                 sa.func.json_build_object(*links)
-            ])
-        return [
-            s(relationship.key),
-            sa.func.json_build_object(*args)
-        ]
+            )
+        else:
+            data = sa.func.json_build_object(s('data'), data)
+        return (s(relationship.key), data)
+
+    def build_relationship_ids(self, relationship):
+        alias = sa.orm.aliased(relationship.mapper.class_)
+        query = self.build_relationship_query(
+            relationship,
+            alias,
+            self.query_builder.build_resource_id(alias, alias).label('id')
+        )
+        if relationship.uselist:
+            query = sa.select([
+                sa.func.coalesce(sa.func.array_agg(query.c.id), text_array)
+            ]).select_from(query)
+        return query.as_scalar().label(relationship.key)
 
     def get_relationship_properties(self, fields):
         model_alias = self.query_builder.get_resource_type(self.model)
@@ -712,6 +2232,8 @@ class RelationshipsExpression(Expression):
 
 
 class LinksExpression(Expression):
+    __slots__ = ()
+
     def build_link(self, postfix=None):
         args = [
             s(self.query_builder.base_url),
@@ -725,55 +2247,174 @@ class LinksExpression(Expression):
 
     def build_links(self):
         if self.query_builder.base_url:
-            return [s('self'), self.build_link()]
+            return (s('self'), self.build_link())
 
     def build_relationship_links(self, key):
         if self.query_builder.base_url:
-            return [
+            return (
                 s('self'),
                 self.build_link(s('/relationships/{0}'.format(key))),
                 s('related'),
                 self.build_link(s('/{0}'.format(key)))
-            ]
+            )
 
 
 class DataExpression(Expression):
-    def build_attrs_relationships_and_links(self, fields):
-        args = (self.query_builder, self.model, self.from_obj)
-        parts = {
-            'attributes': AttributesExpression(*args).build_attributes(
-                fields
+    __slots__ = ()
+
+    def build_attrs_relationships_and_links(self, fields, joins=None):
+        args = self.args
+        parts = (
+            (
+                'attributes',
+                AttributesExpression(*args).build_attributes(fields)
             ),
-            'relationships': RelationshipsExpression(
-                *args
-            ).build_relationships(fields),
-            'links': LinksExpression(*args).build_links()
-        }
+            (
+                'relationships',
+                RelationshipsExpression(*args).build_relationships(
+                    fields,
+                    joins
+                )
+            ),
+            ('links', LinksExpression(*args).build_links())
+        )
         return chain_if(
             *(
-                [s(key), sa.func.json_build_object(*values)]
-                for key, values in parts.items()
+                (s(key), sa.func.json_build_object(*values))
+                for key, values in parts
                 if values
             )
         )
 
-    def build_data_expr(self, params, ids_only=False):
+    def build_data_expr(self, params, ids_only=False, joins=None):
         json_fields = self.query_builder.build_resource_identifier(
             self.model,
             self.from_obj
         )
         if not ids_only:
             json_fields.extend(
-                self.build_attrs_relationships_and_links(params.fields)
+                self.build_attrs_relationships_and_links(
+                    params.fields,
+                    joins
+                )
             )
         return sa.func.json_build_object(*json_fields).label('data')
 
+    def build_row_set(self, fields, ids_only=False):
+        columns = [
+            self.query_builder.build_resource_id(
+                self.model,
+                self.from_obj
+            ).label('id')
+        ]
+        attributes = ()
+        relationships = ()
+        if not ids_only:
+            args = (self.query_builder, self.model, self.from_obj)
+            attributes_expr = AttributesExpression(*args)
+            attributes = tuple(attributes_expr.get_model_fields(fields))
+            columns.extend(
+                attributes_expr.build_row_attribute(key)
+                for key in attributes
+            )
+            relationships_expr = RelationshipsExpression(*args)
+            properties = relationships_expr.get_relationship_properties(
+                fields
+            )
+            relationships = tuple(
+                RelationshipShape(
+                    key=relationship.key,
+                    type=self.query_builder.get_resource_type(
+                        relationship.mapper.class_
+                    ),
+                    uselist=relationship.uselist
+                )
+                for relationship in properties
+            )
+            columns.extend(
+                relationships_expr.build_relationship_ids(relationship)
+                for relationship in properties
+            )
+        shape = ResourceShape(
+            type=self.query_builder.get_resource_type(self.model),
+            attributes=attributes,
+            relationships=relationships
+        )
+        return RowSet(shape, sa.select(columns, from_obj=self.from_obj))
+
+    def build_export_rows(self, fields):
+        args = (self.query_builder, self.model, self.from_obj)
+        attributes_expr = AttributesExpression(*args)
+        relationships_expr = RelationshipsExpression(*args)
+        columns = [
+            self.query_builder.build_resource_id(
+                self.model,
+                self.from_obj
+            ).label('id')
+        ]
+        columns.extend(
+            attributes_expr.adapt_attribute(key).label(key)
+            for key in attributes_expr.get_model_fields(fields)
+        )
+        columns.extend(
+            relationships_expr.build_relationship_ids(relationship)
+            for relationship
+            in relationships_expr.get_relationship_properties(fields)
+        )
+        return sa.select(columns, from_obj=self.from_obj)
+
     def build_data(self, params, ids_only=False):
         expr = self.build_data_expr(params, ids_only=ids_only)
         query = sa.select([expr], from_obj=self.from_obj)
         return query
 
+    def has_grouped_relationships(self, fields):
+        return any(
+            self.query_builder.get_relationship_strategy(
+                self.model,
+                relationship
+            ) == 'grouped'
+            for relationship in RelationshipsExpression(
+                *self.args
+            ).get_relationship_properties(fields)
+        )
+
+    def build_grouped_data_array(self, params):
+        # The grouped relationship subqueries are joined to the resources, so
+        # the resources are numbered first to keep them in the order of the
+        # selectable regardless of the join strategy of the planner.
+        numbered = sa.select([
+            self.from_obj.c.id,
+            sa.func.row_number().over().label('position')
+        ]).alias('numbered_query')
+        joins = []
+        expr = self.build_data_expr(params, joins=joins)
+        from_obj = self.from_obj.join(
+            numbered,
+            numbered.c.id == self.from_obj.c.id
+        )
+        for query, onclause in joins:
+            from_obj = from_obj.outerjoin(query, onclause)
+        data_query = sa.select(
+            [expr, numbered.c.position],
+            from_obj=from_obj
+        ).alias()
+        return sa.select(
+            [sa.func.coalesce(
+                sa.func.array_agg(
+                    postgresql.aggregate_order_by(
+                        data_query.c.data,
+                        data_query.c.position
+                    )
+                ),
+                json_array
+            )],
+            from_obj=data_query
+        ).correlate(self.from_obj)
+
     def build_data_array(self, params, ids_only=False):
+        if not ids_only and self.has_grouped_relationships(params.fields):
+            return self.build_grouped_data_array(params)
         data_query = self.build_data(params, ids_only=ids_only).alias()
         return sa.select(
             [sa.func.coalesce(
@@ -785,11 +2426,14 @@ class DataExpression(Expression):
 
 
 class IncludeExpression(Expression):
+    __slots__ = ()
+
     def build_included_union(self, params):
         selects = [
-            self.build_single_included(params.fields, subpath)
+            self.build_single_included(params.fields, subpath, relationships)
             for path in params.include
-            for subpath in subpaths(path)
+            for subpath, relationships
+            in self.query_builder.get_include_paths(self.model, path)
         ]
 
         union_select = union(*selects).alias()
@@ -837,26 +2481,36 @@ class IncludeExpression(Expression):
             JSONB
         ).label('included')
 
-    def build_single_included(self, fields, path):
-        relationships = path_to_relationships(path, self.model)
+    def build_single_included(self, fields, path, relationships):
+        alias = sa.orm.aliased(relationships[-1].mapper.class_)
+        expr = self.build_included_json_object(alias, fields)
+        query = sa.select([expr], from_obj=alias)
+        return self.filter_included(query, alias, relationships).distinct()
+
+    def build_single_included_row_set(self, fields, path, relationships):
+        alias = sa.orm.aliased(relationships[-1].mapper.class_)
+        shape, query = DataExpression(
+            self.query_builder,
+            alias,
+            sa.inspect(alias).selectable
+        ).build_row_set(fields)
+        return RowSet(
+            shape,
+            self.filter_included(query, alias, relationships)
+        )
 
-        cls = relationships[-1].mapper.class_
+    def filter_included(self, query, alias, relationships):
+        cls = sa.inspect(alias).mapper.class_
         subalias = sa.orm.aliased(cls)
-        subquery = select_correlated_expression(
-            self.model,
+        subquery = select_correlated_relationships(
             subalias.id,
-            path,
+            relationships,
             subalias,
             self.from_obj,
             correlate=False
         ).with_only_columns(split_if_composite(subalias.id)).distinct()
 
-        alias = sa.orm.aliased(cls)
-        expr = self.build_included_json_object(alias, fields)
-        query = sa.select(
-            [expr],
-            from_obj=alias
-        ).where(alias.id.in_(subquery)).distinct()
+        query = query.where(alias.id.in_(subquery))
 
         if cls is self.model:
             query = query.where(
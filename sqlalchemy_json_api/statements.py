@@ -0,0 +1,522 @@
+import gc
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import namedtuple
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.sql.elements import _anonymous_label
+from sqlalchemy_utils import get_hybrid_properties
+
+from .utils import RawJSONBytes
+
+STATEMENT_METHODS = ('select', 'select_one')
+
+COMPACT_PREFIXES = {
+    'alias': '_a',
+    'colident': '_c'
+}
+
+_compact_compilers = {}
+
+
+class CompactCompilerMixin(object):
+    """
+    Renders anonymous alias and label names, such as ``user_1`` or
+    ``json_build_object_1``, as short names numbered in the order they
+    appear in the statement, such as ``_a1`` and ``_c1``.
+
+    SQLAlchemy has no public hook for naming anonymous identifiers, so this
+    overrides the ``_truncated_identifier`` method of ``SQLCompiler``, which
+    has the same signature in all supported SQLAlchemy versions (1.1 to
+    1.3). :func:`compile_statement` uses the default names if the method is
+    missing.
+    """
+    def __init__(self, *args, **kwargs):
+        # The statement is compiled in the constructor of the base class.
+        self._compact_counts = {}
+        super(CompactCompilerMixin, self).__init__(*args, **kwargs)
+
+    def _truncated_identifier(self, ident_class, name):
+        key = (ident_class, name)
+        if (
+            key not in self.truncated_names and
+            ident_class in COMPACT_PREFIXES and
+            isinstance(name, _anonymous_label)
+        ):
+            count = self._compact_counts.get(ident_class, 0) + 1
+            self._compact_counts[ident_class] = count
+            self.truncated_names[key] = '{0}{1}'.format(
+                COMPACT_PREFIXES[ident_class],
+                count
+            )
+        return super(CompactCompilerMixin, self)._truncated_identifier(
+            ident_class,
+            name
+        )
+
+
+def compile_statement(statement, dialect, compact=False):
+    """
+    Compile given statement with given dialect. With `compact` the
+    anonymous alias and label names are rendered as short names (see
+    :class:`CompactCompilerMixin`), which makes the SQL text of statements
+    with many relationships and includes considerably shorter. The bind
+    parameter names are not changed.
+
+    :param statement: The statement to compile.
+    :param dialect: The SQLAlchemy dialect.
+    :param compact: Whether or not to use short anonymous names.
+    """
+    base = dialect.statement_compiler
+    if not compact or not hasattr(base, '_truncated_identifier'):
+        return statement.compile(dialect=dialect)
+    try:
+        compiler = _compact_compilers[base]
+    except KeyError:
+        compiler = type(
+            'Compact' + base.__name__,
+            (CompactCompilerMixin, base),
+            {}
+        )
+        _compact_compilers[base] = compiler
+    return compiler(dialect, statement)
+
+
+class CompiledStatement(
+    namedtuple('CompiledStatement', ['string', 'params', 'positiontup'])
+):
+    """
+    Compiled SQL text of a statement loaded from a statement cache file.
+
+    :param string: The SQL text in the paramstyle of the dialect.
+    :param params: A dictionary of the default bind parameter values.
+    :param positiontup:
+        The bind parameter names in positional order for dialects with a
+        positional paramstyle or `None`.
+    """
+    __slots__ = ()
+
+    def execute(self, bind, params):
+        values = dict(self.params)
+        values.update(params)
+        if self.positiontup is not None:
+            return bind.execute(
+                self.string,
+                tuple(values[name] for name in self.positiontup)
+            )
+        return bind.execute(self.string, values)
+
+
+def get_dialect_key(dialect):
+    return '{0}+{1}:{2}'.format(
+        dialect.name,
+        dialect.driver,
+        dialect.paramstyle
+    )
+
+
+def describe_expression(expression, dialect):
+    compiled = expression.compile(dialect=dialect)
+    return [str(compiled), sorted(compiled.params.items())]
+
+
+def describe_hybrid(query_builder, model, key, hybrid, dialect):
+    if not hybrid.info.get('cache_expression', True):
+        # The expression depends on runtime state, so only the name is
+        # stable.
+        return [key, None]
+    expression = query_builder.get_class_expression(model, key).expression
+    return [key, describe_expression(expression, dialect)]
+
+
+def describe_formatter(type_, formatter, dialect):
+    try:
+        return describe_expression(
+            formatter(sa.column('value', type_)),
+            dialect
+        )
+    except Exception:
+        code = getattr(formatter, '__code__', None)
+        if code is None:
+            return None
+        return hashlib.sha1(code.co_code).hexdigest()
+
+
+def get_metadata_hash(query_builder):
+    """
+    Return a hash of the mappings of the models registered to given
+    :class:`QueryBuilder` and the query builder options affecting the built
+    SQL. Changing a table, a column property, a relationship, a hybrid
+    property expression or a type formatter of a registered model changes
+    the hash.
+    """
+    description = []
+    dialect = psycopg2.dialect()
+    registry = query_builder.resource_registry
+    for type_, model in sorted(registry.by_type.items()):
+        mapper = sa.inspect(model)
+        description.append([
+            type_,
+            [
+                [table.fullname, [
+                    [column.name, str(column.type), column.primary_key]
+                    for column in table.c
+                ]]
+                for table in mapper.tables
+            ],
+            [
+                [
+                    prop.key,
+                    [
+                        describe_expression(column, dialect)
+                        for column in prop.columns
+                    ]
+                ]
+                for prop in mapper.column_attrs
+            ],
+            [
+                [
+                    relationship.key,
+                    str(relationship.primaryjoin),
+                    str(relationship.secondaryjoin),
+                    [str(column) for column in relationship.order_by or []],
+                    relationship.uselist
+                ]
+                for relationship in mapper.relationships
+            ],
+            sorted(
+                describe_hybrid(query_builder, model, key, hybrid, dialect)
+                for key, hybrid in get_hybrid_properties(model).items()
+            )
+        ])
+    description.append([
+        query_builder.base_url,
+        query_builder.sort_included,
+        sorted(query_builder.cardinality_hints.items()),
+        query_builder.grouped_cardinality,
+        sorted(
+            [
+                type_.__name__,
+                getattr(formatter, '__module__', None),
+                getattr(formatter, '__name__', None),
+                describe_formatter(type_, formatter, dialect)
+            ]
+            for type_, formatter in query_builder.type_formatters.items()
+        )
+    ])
+    return hashlib.sha1(
+        json.dumps(description, sort_keys=True, default=str).encode('utf-8')
+    ).hexdigest()
+
+
+class StatementCache(object):
+    """
+    Caches the compiled statements built by a :class:`QueryBuilder`. Compiled
+    statements are keyed on the request shape (model, fields, include, sort,
+    limit and links), while the resource id of :meth:`select_one` and the
+    offset of :meth:`select` are bound as parameters, so a shape is built and
+    compiled only once per process::
+
+        statement_cache = StatementCache(query_builder, engine.dialect)
+
+        document = statement_cache.select_one(
+            session,
+            Article,
+            1,
+            include=['comments']
+        )
+
+    Common request shapes can be compiled ahead of time with
+    :meth:`warm_up`, for example in the master process of a pre-fork server
+    so that the workers share the compiled statements copy-on-write.
+
+    The compiled SQL text of the statements can be stored in a local file
+    with :meth:`save`, so that new processes load them instead of building
+    and compiling them::
+
+        statement_cache = StatementCache(
+            query_builder,
+            engine.dialect,
+            path='/var/cache/myapp/statements.json'
+        )
+        statement_cache.warm_up(shapes)
+        statement_cache.save()
+
+    The file is keyed on the library and SQLAlchemy versions, the dialect
+    and a hash of the registered model mappings (see
+    :func:`get_metadata_hash`). A file with another key or that can not be
+    read is ignored, so the statements are compiled again and the file is
+    rewritten on the next :meth:`save`.
+
+    :param query_builder: The :class:`QueryBuilder` used for building queries.
+    :param dialect:
+        The SQLAlchemy dialect the statements are compiled with. By default
+        the psycopg2 dialect is used.
+    :param path:
+        Path of the statement cache file. If given and the file exists, the
+        statements stored in it are loaded.
+    :param compact:
+        Whether or not to compile the statements with short anonymous alias
+        and label names. See :func:`compile_statement`.
+    """
+    def __init__(self, query_builder, dialect=None, path=None, compact=False):
+        self.query_builder = query_builder
+        self.dialect = psycopg2.dialect() if dialect is None else dialect
+        self.path = path
+        self.compact = compact
+        self._statements = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+
+    @property
+    def file_key(self):
+        from . import __version__
+
+        return [
+            __version__,
+            sa.__version__,
+            get_dialect_key(self.dialect),
+            get_metadata_hash(self.query_builder),
+            self.compact
+        ]
+
+    def load(self):
+        """
+        Load the statements stored in the statement cache file and return
+        the number of loaded statements.
+        """
+        try:
+            with open(self.path) as file:
+                data = json.load(file)
+            if data['key'] != self.file_key:
+                return 0
+            statements = dict(
+                (key, CompiledStatement(
+                    statement['string'],
+                    statement['params'],
+                    statement['positiontup']
+                ))
+                for key, statement in data['statements'].items()
+            )
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return 0
+        with self._lock:
+            for key, statement in statements.items():
+                self._statements.setdefault(key, statement)
+        return len(statements)
+
+    def save(self):
+        """
+        Write the cached statements to the statement cache file and return
+        the number of written statements. Statements with bind parameter
+        values that can not be serialized to JSON are left out. The file is
+        replaced atomically, so concurrent processes never read a partially
+        written file.
+        """
+        with self._lock:
+            items = list(self._statements.items())
+        statements = {}
+        for key, compiled in items:
+            statement = {
+                'string': compiled.string,
+                'params': dict(compiled.params),
+                'positiontup': (
+                    list(compiled.positiontup)
+                    if self.dialect.positional else
+                    None
+                )
+            }
+            try:
+                json.dumps(statement['params'])
+            except (TypeError, ValueError):
+                continue
+            statements[key] = statement
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(
+                    {'key': self.file_key, 'statements': statements},
+                    file
+                )
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        return len(statements)
+
+    @property
+    def stats(self):
+        """
+        A dictionary of cache metrics: number of hits, misses and compiled
+        statements.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._statements)
+        }
+
+    def build_key(self, method, model, **kwargs):
+        if method not in STATEMENT_METHODS:
+            raise ValueError(
+                'Unknown method {0!r}. Method must be one of {1}.'.format(
+                    method,
+                    ', '.join(STATEMENT_METHODS)
+                )
+            )
+        for key in ('from_obj', 'if_none_match'):
+            if key in kwargs:
+                raise TypeError(
+                    'StatementCache does not support {0} parameter.'.format(
+                        key
+                    )
+                )
+        return json.dumps(
+            [method, self.query_builder.get_resource_type(model), kwargs],
+            sort_keys=True,
+            default=str
+        )
+
+    def build_statement(self, method, model, **kwargs):
+        if method == 'select_one':
+            return self.query_builder.select_one(
+                model,
+                sa.bindparam('resource_id'),
+                **kwargs
+            )
+        if kwargs.pop('offset', False):
+            kwargs['offset'] = sa.bindparam('page_offset')
+        return self.query_builder.select(model, **kwargs)
+
+    def compile(self, method, model, **kwargs):
+        """
+        Return the compiled statement of given request shape, building and
+        compiling it if it is not cached. Statements loaded from the
+        statement cache file are returned as :class:`CompiledStatement`
+        objects. The statement of :meth:`select`
+        requests with an offset takes the offset as the ``page_offset``
+        parameter and the statement of :meth:`select_one` requests takes the
+        resource id as the ``resource_id`` parameter.
+
+        :param method: ``'select'`` or ``'select_one'``.
+        :param model: The root model to build the select query from.
+        :param kwargs:
+            The parameters of the query builder method. For :meth:`select`
+            the `offset` parameter is a flag telling whether the requests of
+            the shape have an offset.
+        """
+        if method == 'select':
+            kwargs['offset'] = bool(kwargs.get('offset'))
+        key = self.build_key(method, model, **kwargs)
+        try:
+            compiled = self._statements[key]
+        except KeyError:
+            pass
+        else:
+            self.hits += 1
+            return compiled
+        compiled = compile_statement(
+            self.build_statement(method, model, **kwargs),
+            self.dialect,
+            self.compact
+        )
+        with self._lock:
+            self.misses += 1
+            return self._statements.setdefault(key, compiled)
+
+    def _fetch(self, bind, compiled, params, as_bytes=False):
+        if isinstance(bind, sa.orm.Session):
+            bind = bind.connection()
+        if not isinstance(compiled, CompiledStatement):
+            row = bind.execute(compiled, params).first()
+            return None if row is None else tuple(row)
+        row = compiled.execute(bind, params).first()
+        if row is None:
+            return None
+        # The results of statements loaded from the statement cache file are
+        # not processed by SQLAlchemy result types, so raw json documents
+        # are encoded here.
+        row = tuple(row)
+        if as_bytes:
+            document = RawJSONBytes().process_result_value(row[0], None)
+            row = (document,) + row[1:]
+        return row
+
+    def select(self, bind, model, offset=None, **kwargs):
+        """
+        Execute the compiled statement of :meth:`QueryBuilder.select` query
+        with given parameters and return the first row of the result as a
+        tuple. The first value of the row is the document.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param model: The root model to build the select query from.
+        :param offset: Applies an SQL OFFSET to the query.
+        """
+        compiled = self.compile(
+            'select',
+            model,
+            offset=offset is not None,
+            **kwargs
+        )
+        params = {} if offset is None else {'page_offset': offset}
+        return self._fetch(bind, compiled, params, kwargs.get('as_bytes'))
+
+    def select_one(self, bind, model, id, **kwargs):
+        """
+        Execute the compiled statement of :meth:`QueryBuilder.select_one`
+        query with given parameters and return the first row of the result
+        as a tuple or `None` if the resource does not exist.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param model: The root model to build the select query from.
+        :param id: The id of the resource to select.
+        """
+        compiled = self.compile('select_one', model, **kwargs)
+        return self._fetch(
+            bind,
+            compiled,
+            {'resource_id': id},
+            kwargs.get('as_bytes')
+        )
+
+    def warm_up(self, shapes, freeze=False):
+        """
+        Build and compile given request shapes ahead of time and return the
+        number of compiled statements in the cache::
+
+            statement_cache.warm_up([
+                {'model': Article, 'include': ['comments'], 'limit': 20},
+                {'model': Article, 'include': ['comments'], 'limit': 20,
+                 'offset': True},
+                {'method': 'select_one', 'model': Article,
+                 'include': ['comments']},
+            ])
+
+        :param shapes:
+            An iterable of dictionaries with the `model`, the query builder
+            `method` (``'select'`` by default) and the parameters of
+            :meth:`compile`.
+        :param freeze:
+            Whether or not to move all objects tracked by the garbage
+            collector to a permanent generation with :func:`gc.freeze` after
+            compiling (Python 3.7+). Calling it in the master process right
+            before forking keeps the garbage collector of the workers from
+            touching, and thereby copying, the memory pages of the compiled
+            statements.
+        """
+        for shape in shapes:
+            shape = dict(shape)
+            method = shape.pop('method', 'select')
+            model = shape.pop('model')
+            self.compile(method, model, **shape)
+        if freeze and hasattr(gc, 'freeze'):
+            gc.freeze()
+        return len(self._statements)
@@ -1,8 +1,57 @@
+import json
+from collections import namedtuple
 from itertools import chain
 
 import sqlalchemy as sa
 from sqlalchemy.orm.attributes import InstrumentedAttribute, QueryableAttribute
+from sqlalchemy.sql.dml import Insert, Update
 from sqlalchemy.sql.util import ClauseAdapter
+from sqlalchemy_utils.relationships import (
+    adapt_expr,
+    chained_inverse_join,
+    relationship_to_correlation
+)
+
+ConditionalResult = namedtuple(
+    'ConditionalResult',
+    ['document', 'etag', 'not_modified']
+)
+
+
+class RawJSONBytes(sa.types.TypeDecorator):
+    """
+    Text type for raw json documents that are returned as UTF-8 encoded
+    bytes. The document is sent by the database as text, so the json
+    typecaster of the driver is skipped. The driver still decodes the text
+    and the document is encoded back to UTF-8 here, since psycopg2 can only
+    return raw bytes for all text columns of a cursor, not for a single
+    column.
+    """
+    impl = sa.Text
+
+    def process_result_value(self, value, dialect):
+        if value is not None and not isinstance(value, bytes):
+            value = value.encode('utf-8')
+        return value
+
+
+class ReturningInsert(Insert):
+    """
+    INSERT statement that is considered to be derived from its target table.
+    This allows adapting hybrid and column property expressions to a CTE
+    built from ``INSERT ... RETURNING`` statement.
+    """
+    def is_derived_from(self, fromclause):
+        return self.table.is_derived_from(fromclause)
+
+
+class ReturningUpdate(Update):
+    """
+    UPDATE statement that is considered to be derived from its target table.
+    See :class:`ReturningInsert`.
+    """
+    def is_derived_from(self, fromclause):
+        return self.table.is_derived_from(fromclause)
 
 
 def adapt(adapt_with, expression):
@@ -14,6 +63,32 @@ def adapt(adapt_with, expression):
     return ClauseAdapter(adapt_with).traverse(expression.expression)
 
 
+def select_correlated_relationships(
+    expr,
+    relationships,
+    leaf_model,
+    from_obj,
+    correlate=True
+):
+    """
+    Return a select of given expression correlated to `from_obj` through
+    given chain of relationship attributes. Works like
+    :func:`sqlalchemy_utils.relationships.select_correlated_expression` but
+    takes an already validated relationship chain instead of resolving a
+    dot-separated path again.
+    """
+    relationships = list(reversed(relationships))
+    join_expr, aliases = chained_inverse_join(relationships, leaf_model)
+    condition = adapt_expr(
+        relationship_to_correlation(relationships[-1], aliases[-1]),
+        from_obj
+    )
+    query = sa.select([expr]).select_from(join_expr.selectable)
+    if correlate:
+        query = query.correlate(from_obj)
+    return query.where(condition)
+
+
 def get_attrs(obj):
     if isinstance(obj, sa.orm.Mapper):
         return obj.class_
@@ -37,8 +112,40 @@ def subpaths(path):
     ]
 
 
+# Literal clauses for the member names, resource types and link fragments
+# known ahead of time. These are shared by all queries instead of creating
+# a new TextClause for every key of every query.
+_literal_clauses = {}
+
+
+def intern_literals(values):
+    """
+    Add literal clauses of given string values to the shared pool used by
+    :func:`s`.
+    """
+    for value in values:
+        if value not in _literal_clauses:
+            _literal_clauses[value] = sa.text("'{0}'".format(value))
+
+
 def s(value):
-    return sa.text("'{0}'".format(value))
+    try:
+        return _literal_clauses[value]
+    except KeyError:
+        return sa.text("'{0}'".format(value))
+
+
+intern_literals([
+    'attributes',
+    'data',
+    'id',
+    'links',
+    'related',
+    'relationships',
+    'self',
+    'type',
+    '/',
+])
 
 
 def get_descriptor_columns(model, descriptor):
@@ -73,6 +180,101 @@ def chain_if(*args):
     return []
 
 
+def splice_members(document, members, dumps=json.dumps):
+    """
+    Add given top level members to a raw json document without parsing it.
+    This can be used for adding members such as ``meta`` and ``jsonapi``
+    to documents returned by queries built with ``as_text`` or ``as_bytes``
+    parameters::
+
+        query = query_builder.select(Article, as_bytes=True)
+        document = splice_members(
+            session.execute(query).scalar(),
+            {'meta': {'total': 10}},
+            dumps=orjson.dumps
+        )
+
+    The given members must not already exist in the document.
+
+    :param document: The raw json document as text or bytes.
+    :param members: A dictionary of top level members to add.
+    :param dumps:
+        The function used for serializing the members. It may return either
+        text or bytes.
+    """
+    if document is None or not members:
+        return document
+    encoded = dumps(members)
+    if isinstance(document, bytes):
+        if not isinstance(encoded, bytes):
+            encoded = encoded.encode('utf-8')
+        end = document.rindex(b'}')
+        separator = b','
+    else:
+        if isinstance(encoded, bytes):
+            encoded = encoded.decode('utf-8')
+        end = document.rindex('}')
+        separator = ','
+    return document[:end] + separator + encoded.lstrip()[1:]
+
+
+def parse_if_none_match(header):
+    """
+    Return the list of entity tags in given If-None-Match header value. Weak
+    validator prefixes and quotes are stripped.
+
+    :param header: The value of an If-None-Match header or `None`.
+    """
+    if not header:
+        return []
+    entity_tags = []
+    for entity_tag in header.split(','):
+        entity_tag = entity_tag.strip()
+        if entity_tag.startswith('W/'):
+            entity_tag = entity_tag[2:]
+        entity_tag = entity_tag.strip('"')
+        if entity_tag:
+            entity_tags.append(entity_tag)
+    return entity_tags
+
+
+def execute_conditional(bind, query):
+    """
+    Execute a query built with the ``etag`` parameter and return a
+    :class:`ConditionalResult` or `None` if the query returned no rows (for
+    example when :meth:`QueryBuilder.select_one` does not find the resource)::
+
+        query = query_builder.select_one(
+            Article,
+            1,
+            etag=True,
+            if_none_match=request.headers.get('If-None-Match')
+        )
+        result = execute_conditional(session, query)
+        if result is None:
+            abort(404)
+        headers = {'ETag': '"{0}"'.format(result.etag)}
+        if result.not_modified:
+            return Response(status=304, headers=headers)
+        return Response(json.dumps(result.document), headers=headers)
+
+    When the entity tag matches the If-None-Match header the document is
+    neither serialized nor transferred from the database.
+
+    :param bind: A SQLAlchemy Connection or Session object.
+    :param query: A query built with the ``etag`` parameter.
+    """
+    row = bind.execute(query).first()
+    if row is None:
+        return None
+    document, etag = row
+    return ConditionalResult(
+        document=document,
+        etag=etag,
+        not_modified=document is None
+    )
+
+
 def _included_sort_key(value):
     return (value['type'], value['id'])
 
@@ -0,0 +1,228 @@
+import io
+import json
+from collections import OrderedDict
+
+import sqlalchemy as sa
+
+from .exc import InvalidDocument
+from .query_builder import get_members
+
+WRITE_METHODS = ('values', 'executemany', 'copy')
+
+
+class BulkWriter(object):
+    """
+    Writes JSON API resource objects in batches. Resource types are mapped to
+    models with the resource registry of given :class:`QueryBuilder` and
+    attribute and relationship names are validated against the model metadata
+    only once per model.
+
+    ::
+
+        writer = BulkWriter(query_builder, batch_size=5000, method='copy')
+
+        writer.write(session, [
+            {
+                'type': 'users',
+                'id': '1',
+                'attributes': {'name': 'User 1'},
+                'relationships': {
+                    'groups': {'data': [{'type': 'groups', 'id': '1'}]}
+                }
+            },
+            {
+                'type': 'articles',
+                'attributes': {'name': 'Some article'},
+                'relationships': {
+                    'author': {'data': {'type': 'users', 'id': '1'}}
+                }
+            }
+        ])
+
+    To-one relationships are written to the local foreign key columns and
+    to-many relationships with a secondary table to the secondary table. Rows
+    are written in the order the resource types first appear in the given
+    resources and secondary table rows are written after the resource rows,
+    so resources should be given after the resources they refer to.
+
+    :param query_builder: The :class:`QueryBuilder` used for validation.
+    :param batch_size:
+        Maximum number of pending rows. When reached all pending rows are
+        written.
+    :param method:
+        How the rows are written. One of ``'values'`` (multi-row ``INSERT``
+        statements), ``'executemany'`` or ``'copy'`` (``COPY FROM STDIN``,
+        requires psycopg2).
+    """
+    def __init__(self, query_builder, batch_size=1000, method='values'):
+        if method not in WRITE_METHODS:
+            raise ValueError(
+                'Unknown write method {0!r}. Write method must be one of '
+                '{1}.'.format(method, ', '.join(WRITE_METHODS))
+            )
+        self.query_builder = query_builder
+        self.batch_size = batch_size
+        self.method = method
+
+    def get_model(self, resource):
+        try:
+            type_ = resource['type']
+        except (KeyError, TypeError):
+            raise InvalidDocument(
+                'Given resource object does not have a type.'
+            )
+        try:
+            return self.query_builder.resource_registry.by_type[type_]
+        except KeyError:
+            raise InvalidDocument(
+                "Unknown resource type '{0}'.".format(type_)
+            )
+
+    def get_rows(self, resource):
+        """
+        Return a tuple of the model table row and secondary table rows for
+        given resource object. Rows are tuples of a table and a dictionary of
+        column values.
+
+        :param resource: A JSON API resource object.
+        """
+        model = self.get_model(resource)
+        values = {}
+        if 'id' in resource:
+            column = self.query_builder.get_value_column(model, 'id')
+            values[column] = resource['id']
+        for field, value in get_members(resource, 'attributes').items():
+            column = self.query_builder.get_attribute_column(model, field)
+            values[column] = value
+
+        secondary_rows = []
+        relationships = get_members(resource, 'relationships')
+        for key, relationship in relationships.items():
+            ids = self.query_builder.get_linkage_ids(model, key, relationship)
+            prop = self.query_builder.get_relationship_property(model, key)
+            if prop.secondary is None:
+                column = self.query_builder.get_foreign_key_column(model, key)
+                values[column] = ids
+                continue
+            table, local_column, remote_column = (
+                self.query_builder.get_secondary_columns(model, key)
+            )
+            if ids and 'id' not in resource:
+                raise InvalidDocument(
+                    "Relationship '{0}' can only be written for resources "
+                    "with an id.".format(key)
+                )
+            for id in ids:
+                secondary_rows.append((
+                    table,
+                    {local_column: resource['id'], remote_column: id}
+                ))
+        return (sa.inspect(model).local_table, values), secondary_rows
+
+    def write(self, bind, resources):
+        """
+        Write given resource objects and return the number of written
+        resources.
+
+        :param bind: A SQLAlchemy Connection or Session object.
+        :param resources: An iterable of JSON API resource objects.
+        """
+        batches = OrderedDict()
+        secondary_batches = OrderedDict()
+        pending = 0
+        count = 0
+        for resource in resources:
+            row, secondary_rows = self.get_rows(resource)
+            add_row(batches, row)
+            for secondary_row in secondary_rows:
+                add_row(secondary_batches, secondary_row)
+            pending += 1 + len(secondary_rows)
+            count += 1
+            if pending >= self.batch_size:
+                self.flush(bind, batches, secondary_batches)
+                pending = 0
+        self.flush(bind, batches, secondary_batches)
+        return count
+
+    def flush(self, bind, *batch_groups):
+        for batches in batch_groups:
+            for (table, columns), rows in batches.items():
+                if not rows:
+                    continue
+                if columns:
+                    getattr(self, 'write_' + self.method)(
+                        bind,
+                        table,
+                        columns,
+                        rows
+                    )
+                else:
+                    self.write_defaults(bind, table, len(rows))
+                del rows[:]
+
+    def write_defaults(self, bind, table, count):
+        """
+        Write given number of rows with only default values. Used for
+        resources without an id and attributes, which have no columns to
+        write with any of the write methods.
+        """
+        if isinstance(bind, sa.orm.Session):
+            bind = bind.connection()
+        bind.execute(
+            sa.text(
+                'INSERT INTO {0} SELECT FROM generate_series(1, :count)'
+                .format(bind.dialect.identifier_preparer.format_table(table))
+            ),
+            count=count
+        )
+
+    def write_values(self, bind, table, columns, rows):
+        bind.execute(table.insert().values([
+            dict((column.key, value) for column, value in zip(columns, row))
+            for row in rows
+        ]))
+
+    def write_executemany(self, bind, table, columns, rows):
+        bind.execute(table.insert(), [
+            dict((column.key, value) for column, value in zip(columns, row))
+            for row in rows
+        ])
+
+    def write_copy(self, bind, table, columns, rows):
+        if isinstance(bind, sa.orm.Session):
+            bind = bind.connection()
+        preparer = bind.dialect.identifier_preparer
+        statement = 'COPY {0} ({1}) FROM STDIN WITH (FORMAT csv)'.format(
+            preparer.format_table(table),
+            ', '.join(preparer.format_column(column) for column in columns)
+        )
+        data = io.StringIO()
+        for row in rows:
+            data.write(','.join(copy_value(value) for value in row))
+            data.write('\n')
+        data.seek(0)
+        cursor = bind.connection.cursor()
+        try:
+            cursor.copy_expert(statement, data)
+        finally:
+            cursor.close()
+
+
+def add_row(batches, row):
+    table, values = row
+    columns = tuple(sorted(values, key=lambda column: column.key))
+    batches.setdefault((table, columns), []).append(
+        tuple(values[column] for column in columns)
+    )
+
+
+def copy_value(value):
+    """
+    Return given value as a CSV field of ``COPY FROM``. Unquoted empty
+    fields are read as NULL.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return '"{0}"'.format(str(value).replace('"', '""'))
@@ -0,0 +1,77 @@
+import pytest
+
+from sqlalchemy_json_api.query_builder import (
+    AttributesExpression,
+    DataExpression,
+    Expression,
+    IncludeExpression,
+    LinksExpression,
+    RelationshipsExpression,
+    RowsExpression,
+    SelectExpression
+)
+
+# Upper bound for the memory allocated while building a query and freed
+# before the build returns (expression objects, intermediate lists) relative
+# to the memory of the built query itself. The measured ratio is about
+# 0.0026.
+MAX_TRANSIENT_RATIO = 0.01
+
+# Upper bound for the number of expression objects created while building
+# the include heavy request below.
+MAX_EXPRESSIONS = 51
+
+INCLUDE = ['author', 'comments.author', 'category']
+
+
+@pytest.mark.parametrize(
+    'cls',
+    (
+        Expression,
+        AttributesExpression,
+        DataExpression,
+        IncludeExpression,
+        LinksExpression,
+        RelationshipsExpression,
+        RowsExpression,
+        SelectExpression
+    )
+)
+def test_expression_has_no_instance_dict(query_builder, article_cls, cls):
+    expression = cls(query_builder, article_cls, article_cls.__table__)
+    assert not hasattr(expression, '__dict__')
+
+
+def test_include_heavy_request_allocations(query_builder, article_cls):
+    tracemalloc = pytest.importorskip('tracemalloc')
+
+    def build():
+        return query_builder.select(article_cls, include=INCLUDE)
+
+    # Fill the caches of the QueryBuilder first.
+    build()
+    tracemalloc.start()
+    try:
+        query = build()
+        size, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert query is not None
+    assert peak - size < size * MAX_TRANSIENT_RATIO
+
+
+def test_include_heavy_request_expressions(
+    monkeypatch,
+    query_builder,
+    article_cls
+):
+    expressions = []
+    init = Expression.__init__
+
+    def counting_init(self, *args):
+        expressions.append(type(self))
+        init(self, *args)
+
+    monkeypatch.setattr(Expression, '__init__', counting_init)
+    query_builder.select(article_cls, include=INCLUDE)
+    assert len(expressions) <= MAX_EXPRESSIONS
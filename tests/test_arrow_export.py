@@ -0,0 +1,45 @@
+import io
+
+import pytest
+
+pyarrow = pytest.importorskip('pyarrow')
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestArrowExport(object):
+    @pytest.fixture
+    def export_query(self, query_builder, user_cls):
+        return query_builder.select_export(
+            user_cls,
+            fields={'users': ['name', 'groups']},
+            sort=['id']
+        )
+
+    def test_record_batches(self, session, export_query):
+        batches = list(export_query.record_batches(session, batch_size=2))
+        assert [batch.num_rows for batch in batches] == [2, 2, 1]
+        table = pyarrow.Table.from_batches(batches)
+        assert table.schema.names == ['id', 'name', 'groups']
+        assert table.schema.field('groups').type == (
+            pyarrow.list_(pyarrow.string())
+        )
+        assert table.column('name').to_pylist() == [
+            'User 1',
+            'User 2',
+            'User 3',
+            'User 4',
+            'User 5'
+        ]
+        assert [
+            sorted(ids) for ids in table.column('groups').to_pylist()
+        ] == [['1', '2'], [], ['1'], ['2'], []]
+
+    def test_write_parquet(self, session, export_query):
+        import pyarrow.parquet
+
+        file = io.BytesIO()
+        assert export_query.write_parquet(session, file, batch_size=2) == 5
+        file.seek(0)
+        table = pyarrow.parquet.read_table(file)
+        assert table.num_rows == 5
+        assert table.column('id').to_pylist() == ['1', '2', '3', '4', '5']
@@ -0,0 +1,198 @@
+import pytest
+import sqlalchemy as sa
+
+from sqlalchemy_json_api import (
+    BulkWriter,
+    InvalidDocument,
+    InvalidField,
+    UnknownField,
+    UnknownRelationship
+)
+
+
+@pytest.fixture
+def rollback(session):
+    yield
+    session.rollback()
+
+
+@pytest.fixture
+def resources():
+    return [
+        {'type': 'groups', 'id': '10', 'attributes': {'name': 'Group 10'}},
+        {
+            'type': 'users',
+            'id': '10',
+            'attributes': {'name': 'User "10", first'},
+            'relationships': {
+                'groups': {
+                    'data': [
+                        {'type': 'groups', 'id': '1'},
+                        {'type': 'groups', 'id': '10'}
+                    ]
+                }
+            }
+        },
+        {'type': 'users', 'id': '11', 'attributes': {'name': None}},
+        {
+            'type': 'articles',
+            'id': '10',
+            'attributes': {'name': '', 'content': 'Content'},
+            'relationships': {
+                'author': {'data': {'type': 'users', 'id': '10'}},
+                'category': {'data': None}
+            }
+        },
+    ]
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset', 'rollback')
+class TestBulkWriter(object):
+    @pytest.mark.parametrize('method', ('values', 'executemany', 'copy'))
+    @pytest.mark.parametrize('batch_size', (1, 2, 1000))
+    def test_write(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        user_cls,
+        resources,
+        method,
+        batch_size
+    ):
+        writer = BulkWriter(query_builder, batch_size, method)
+        assert writer.write(session, resources) == 4
+        session.expire_all()
+        user = session.query(user_cls).get(10)
+        assert user.name == 'User "10", first'
+        assert sorted(group.name for group in user.groups) == [
+            'Group 1',
+            'Group 10'
+        ]
+        assert session.query(user_cls).get(11).name is None
+        article = session.query(article_cls).get(10)
+        assert article.name == ''
+        assert article.content == 'Content'
+        assert article.author is user
+        assert article.category_id is None
+
+    @pytest.mark.parametrize('method', ('values', 'executemany', 'copy'))
+    def test_write_resources_without_columns(
+        self,
+        query_builder,
+        session,
+        group_cls,
+        method
+    ):
+        session.execute(sa.select([sa.func.setval('group_id_seq', 100)]))
+        count = session.query(group_cls).count()
+        writer = BulkWriter(query_builder, method=method)
+        assert writer.write(session, [{'type': 'groups'}] * 3) == 3
+        assert session.query(group_cls).count() == count + 3
+        assert session.query(group_cls).filter(
+            group_cls.id > 100,
+            group_cls.name.is_(None)
+        ).count() == 3
+
+    def test_unknown_method(self, query_builder):
+        with pytest.raises(ValueError):
+            BulkWriter(query_builder, method='some')
+
+    @pytest.mark.parametrize(
+        ('resource', 'exception'),
+        (
+            ({'attributes': {}}, InvalidDocument),
+            ({'type': 'some'}, InvalidDocument),
+            ({'type': 'users', 'attributes': {'some': 1}}, UnknownField),
+            (
+                {'type': 'articles', 'attributes': {'author_id': 1}},
+                InvalidField
+            ),
+            (
+                {'type': 'users', 'relationships': {'some': {'data': None}}},
+                UnknownRelationship
+            ),
+            (
+                {'type': 'articles', 'relationships': {'comments': {}}},
+                InvalidDocument
+            ),
+            (
+                {
+                    'type': 'articles',
+                    'relationships': {'comments': {'data': []}}
+                },
+                InvalidField
+            ),
+            (
+                {
+                    'type': 'users',
+                    'id': '10',
+                    'relationships': {'all_friends': {'data': []}}
+                },
+                InvalidField
+            ),
+            (
+                {
+                    'type': 'users',
+                    'relationships': {
+                        'groups': {'data': [{'type': 'groups', 'id': '1'}]}
+                    }
+                },
+                InvalidDocument
+            ),
+            (
+                {
+                    'type': 'articles',
+                    'relationships': {
+                        'author': {'data': {'type': 'articles', 'id': '1'}}
+                    }
+                },
+                InvalidDocument
+            ),
+            (
+                {
+                    'type': 'articles',
+                    'relationships': {'author': {'data': {'type': 'users'}}}
+                },
+                InvalidDocument
+            ),
+            (
+                {
+                    'type': 'users',
+                    'id': '10',
+                    'relationships': {
+                        'groups': {'data': {'type': 'groups', 'id': '1'}}
+                    }
+                },
+                InvalidDocument
+            ),
+            (
+                {
+                    'type': 'users',
+                    'id': '10',
+                    'relationships': {
+                        'groups': {'data': [{'type': 'users', 'id': '1'}]}
+                    }
+                },
+                InvalidDocument
+            ),
+            (
+                {
+                    'type': 'users',
+                    'id': '10',
+                    'relationships': {'groups': {'data': ['1']}}
+                },
+                InvalidDocument
+            ),
+            ({'type': 'users', 'attributes': ['name']}, InvalidDocument),
+        )
+    )
+    def test_invalid_resource(
+        self,
+        query_builder,
+        session,
+        resource,
+        exception
+    ):
+        with pytest.raises(exception):
+            BulkWriter(query_builder).write(session, [resource])
@@ -0,0 +1,220 @@
+import json
+
+import pytest
+
+from sqlalchemy_json_api import LRUCacheStore, ResultCache
+
+
+class Clock(object):
+    def __init__(self):
+        self.time = 0
+
+    def __call__(self):
+        return self.time
+
+
+class TestLRUCacheStore(object):
+    def test_get_and_set(self):
+        store = LRUCacheStore()
+        store.set('a', '1')
+        assert store.get('a') == '1'
+        assert store.get('b') is None
+        assert store.stats == {
+            'hits': 1,
+            'misses': 1,
+            'evictions': 0,
+            'expirations': 0,
+            'size': 1
+        }
+
+    def test_evicts_least_recently_used(self):
+        store = LRUCacheStore(max_size=2)
+        store.set('a', '1')
+        store.set('b', '2')
+        store.get('a')
+        store.set('c', '3')
+        assert store.get('b') is None
+        assert store.get('a') == '1'
+        assert store.get('c') == '3'
+        assert store.stats['evictions'] == 1
+
+    def test_expiration(self):
+        clock = Clock()
+        store = LRUCacheStore(ttl=10, clock=clock)
+        store.set('a', '1')
+        store.set('b', '2', ttl=20)
+        clock.time = 10
+        assert store.get('a') is None
+        assert store.get('b') == '2'
+        assert store.stats['expirations'] == 1
+        assert store.stats['size'] == 1
+
+    def test_delete(self):
+        store = LRUCacheStore()
+        store.set('a', '1')
+        store.delete('a')
+        store.delete('b')
+        assert store.get('a') is None
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestResultCache(object):
+    @pytest.fixture
+    def cache(self, query_builder):
+        return ResultCache(query_builder, LRUCacheStore())
+
+    @pytest.fixture
+    def queries(self, session):
+        queries = []
+
+        def execute(query):
+            queries.append(query)
+            return execute.original(query)
+
+        execute.original = session.execute
+        session.execute = execute
+        yield queries
+        del session.execute
+
+    def test_select_one(self, cache, queries, session, article_cls):
+        for _ in range(2):
+            document = cache.select_one(
+                session,
+                article_cls,
+                1,
+                fields={'articles': ['name']}
+            )
+            assert json.loads(document) == {
+                'data': {
+                    'type': 'articles',
+                    'id': '1',
+                    'attributes': {'name': 'Some article'}
+                }
+            }
+        assert len(queries) == 1
+
+    def test_select_one_with_unknown_id(
+        self,
+        cache,
+        queries,
+        session,
+        article_cls
+    ):
+        assert cache.select_one(session, article_cls, 99) is None
+        assert cache.select_one(session, article_cls, 99) is None
+        assert len(queries) == 2
+
+    def test_keyed_by_request_shape(
+        self,
+        cache,
+        queries,
+        session,
+        article_cls
+    ):
+        cache.select(session, article_cls, fields={'articles': ['name']})
+        cache.select(session, article_cls, fields={'articles': ['content']})
+        cache.select(session, article_cls, include=['author'])
+        cache.select(session, article_cls, fields={'articles': ['name']})
+        assert len(queries) == 3
+
+    def test_keyed_by_version(self, cache, queries, session, article_cls):
+        cache.select_one(session, article_cls, 1, version=1)
+        cache.select_one(session, article_cls, 1, version=2)
+        cache.select_one(session, article_cls, 1, version=1)
+        assert len(queries) == 2
+
+    def test_invalidate_resource(
+        self,
+        cache,
+        queries,
+        session,
+        article_cls
+    ):
+        cache.select_one(session, article_cls, 1)
+        cache.select(session, article_cls)
+        cache.invalidate('articles', 1)
+        cache.select_one(session, article_cls, 1)
+        cache.select(session, article_cls)
+        assert len(queries) == 3
+
+    def test_invalidate_included_type(
+        self,
+        cache,
+        queries,
+        session,
+        article_cls,
+        user_cls
+    ):
+        fields = {'articles': ['name', 'comments'], 'comments': ['author']}
+        cache.select_one(
+            session,
+            article_cls,
+            1,
+            include=['comments.author'],
+            fields=fields
+        )
+        cache.select_one(session, article_cls, 1, fields=fields)
+        cache.invalidate(user_cls)
+        cache.select_one(
+            session,
+            article_cls,
+            1,
+            include=['comments.author'],
+            fields=fields
+        )
+        cache.select_one(session, article_cls, 1, fields=fields)
+        assert len(queries) == 3
+
+    def test_invalidate_linkage_type(
+        self,
+        cache,
+        session,
+        article_cls,
+        comment_cls
+    ):
+        fields = {'articles': ['comments']}
+        cache.select_one(session, article_cls, 1, fields=fields)
+        session.add(comment_cls(id=20, article_id=1))
+        session.flush()
+        try:
+            cache.invalidate('comments')
+            document = cache.select_one(session, article_cls, 1, fields=fields)
+        finally:
+            session.rollback()
+        assert len(
+            json.loads(document)['data']['relationships']['comments']['data']
+        ) == 5
+
+    def test_stats(self, cache, session, article_cls):
+        cache.select_one(session, article_cls, 1)
+        cache.select_one(session, article_cls, 1)
+        assert cache.stats == {'hits': 1, 'misses': 1}
+
+    @pytest.mark.parametrize('method', ('select', 'select_one'))
+    @pytest.mark.parametrize('key', ('as_text', 'as_bytes', 'etag'))
+    def test_result_type_parameters_are_not_supported(
+        self,
+        cache,
+        session,
+        article_cls,
+        method,
+        key
+    ):
+        args = (1, ) if method == 'select_one' else ()
+        with pytest.raises(ValueError) as excinfo:
+            getattr(cache, method)(
+                session,
+                article_cls,
+                *args,
+                **{key: True}
+            )
+        assert key in str(excinfo.value)
+        assert cache.stats == {'hits': 0, 'misses': 0}
+
+    def test_from_obj_is_not_supported(self, cache, session, article_cls):
+        with pytest.raises(TypeError):
+            cache.select(
+                session,
+                article_cls,
+                from_obj=session.query(article_cls)
+            )
@@ -0,0 +1,166 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from sqlalchemy_json_api import infer_cardinality_hints, QueryBuilder
+
+
+@pytest.fixture
+def grouped_query_builder(model_mapping):
+    return QueryBuilder(
+        model_mapping,
+        cardinality_hints={
+            'articles.comments': 1000,
+            'users.groups': 1000,
+            'users.all_friends': 1000,
+            'users.comments': 1000,
+        }
+    )
+
+
+class TestGetCardinality(object):
+    def test_to_one_relationship(self, query_builder, article_cls):
+        relationship = sa.inspect(article_cls).relationships['author']
+        assert query_builder.get_cardinality(article_cls, relationship) == 1
+
+    def test_unknown_cardinality(self, query_builder, article_cls):
+        relationship = sa.inspect(article_cls).relationships['comments']
+        assert query_builder.get_cardinality(
+            article_cls,
+            relationship
+        ) is None
+
+    def test_hint(self, grouped_query_builder, article_cls):
+        relationship = sa.inspect(article_cls).relationships['comments']
+        assert grouped_query_builder.get_cardinality(
+            article_cls,
+            relationship
+        ) == 1000
+
+    def test_relationship_info(self, query_builder, article_cls):
+        relationship = sa.inspect(article_cls).relationships['comments']
+        relationship.info['cardinality'] = 500
+        try:
+            assert query_builder.get_cardinality(
+                article_cls,
+                relationship
+            ) == 500
+        finally:
+            del relationship.info['cardinality']
+
+
+class TestGetRelationshipStrategy(object):
+    def test_to_one_relationship(self, grouped_query_builder, article_cls):
+        relationship = sa.inspect(article_cls).relationships['author']
+        assert grouped_query_builder.get_relationship_strategy(
+            article_cls,
+            relationship
+        ) == 'subquery'
+
+    def test_unknown_cardinality(self, query_builder, article_cls):
+        relationship = sa.inspect(article_cls).relationships['comments']
+        assert query_builder.get_relationship_strategy(
+            article_cls,
+            relationship
+        ) == 'subquery'
+
+    @pytest.mark.parametrize(
+        ('cardinality', 'strategy'),
+        ((99, 'subquery'), (100, 'grouped'))
+    )
+    def test_grouped_cardinality(
+        self,
+        model_mapping,
+        article_cls,
+        cardinality,
+        strategy
+    ):
+        query_builder = QueryBuilder(
+            model_mapping,
+            cardinality_hints={'articles.comments': cardinality}
+        )
+        relationship = sa.inspect(article_cls).relationships['comments']
+        assert query_builder.get_relationship_strategy(
+            article_cls,
+            relationship
+        ) == strategy
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestGroupedStrategy(object):
+    @pytest.mark.parametrize(
+        ('model', 'kwargs'),
+        (
+            ('article_cls', {}),
+            ('user_cls', {}),
+            ('user_cls', {'sort': ['-name']}),
+            ('user_cls', {'fields': {'users': ['groups', 'all_friends']}}),
+            ('user_cls', {'include': ['groups', 'all_friends']}),
+            ('user_cls', {'limit': 2, 'sort': ['-id']}),
+        )
+    )
+    def test_same_document_as_subquery_strategy(
+        self,
+        request,
+        session,
+        query_builder,
+        grouped_query_builder,
+        model,
+        kwargs
+    ):
+        model = request.getfixturevalue(model)
+        expected = session.execute(
+            query_builder.select(model, **kwargs)
+        ).scalar()
+        query = grouped_query_builder.select(model, **kwargs)
+        assert 'GROUP BY' in str(query.compile(dialect=postgresql.dialect()))
+        assert session.execute(query).scalar() == expected
+
+    def test_select_related(
+        self,
+        session,
+        query_builder,
+        grouped_query_builder,
+        user_cls
+    ):
+        obj = session.query(user_cls).get(2)
+        expected = session.execute(
+            query_builder.select_related(obj, 'all_friends')
+        ).scalar()
+        assert session.execute(
+            grouped_query_builder.select_related(obj, 'all_friends')
+        ).scalar() == expected
+
+    def test_select_one_uses_subqueries(
+        self,
+        session,
+        grouped_query_builder,
+        article_cls
+    ):
+        query = grouped_query_builder.select_one(article_cls, 1)
+        assert 'GROUP BY' not in str(
+            query.compile(dialect=postgresql.dialect())
+        )
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestInferCardinalityHints(object):
+    def test_infers_hints_from_statistics(
+        self,
+        session,
+        connection,
+        query_builder
+    ):
+        session.commit()
+        connection.execute('ANALYZE')
+        hints = infer_cardinality_hints(session, query_builder)
+        assert hints['articles.comments'] == 4
+        assert hints['users.groups'] == 2
+        assert 'users.all_friends' not in hints
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestInferCardinalityHintsWithoutStatistics(object):
+    def test_no_statistics(self, session, query_builder):
+        hints = infer_cardinality_hints(session, query_builder)
+        assert 'articles.comments' not in hints
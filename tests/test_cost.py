@@ -0,0 +1,139 @@
+import pytest
+
+from sqlalchemy_json_api import CostEstimator, QueryBuilder, RequestTooComplex
+
+
+@pytest.fixture
+def estimator():
+    return CostEstimator(default_rows=100, to_many_rows=10)
+
+
+class TestCostEstimator(object):
+    def test_single_resource(self, query_builder, estimator, article_cls):
+        estimate = estimator.estimate(
+            query_builder,
+            article_cls,
+            fields={'articles': ['name', 'content']},
+            multiple=False
+        )
+        assert estimate.total == 2
+        assert estimate.by_type == {'articles': 2}
+        assert estimate.branches == []
+
+    @pytest.mark.parametrize(
+        ('limit', 'total'),
+        ((None, 100 * (1 + 10 + 1)), (5, 5 * (1 + 10 + 1)))
+    )
+    def test_relationship_width(
+        self,
+        query_builder,
+        estimator,
+        article_cls,
+        limit,
+        total
+    ):
+        estimate = estimator.estimate(
+            query_builder,
+            article_cls,
+            fields={'articles': ['name', 'comments', 'author']},
+            limit=limit
+        )
+        assert estimate.total == total
+
+    def test_include_branches(self, query_builder, estimator, article_cls):
+        estimate = estimator.estimate(
+            query_builder,
+            article_cls,
+            fields={
+                'articles': ['name'],
+                'comments': ['content', 'author'],
+                'users': ['name']
+            },
+            include=['comments.author'],
+            multiple=False
+        )
+        assert [
+            (branch.path, branch.type, branch.rows, branch.cost)
+            for branch in estimate.branches
+        ] == [
+            ('comments', 'comments', 10, 10 * 2),
+            ('comments.author', 'users', 10, 10 * 1)
+        ]
+        assert estimate.by_type == {
+            'articles': 1,
+            'comments': 20,
+            'users': 10
+        }
+        assert estimate.total == 31
+
+    def test_cardinality_hints(self, model_mapping, estimator, article_cls):
+        query_builder = QueryBuilder(
+            model_mapping,
+            cardinality_hints={'articles.comments': 50}
+        )
+        estimate = estimator.estimate(
+            query_builder,
+            article_cls,
+            fields={'articles': ['comments'], 'comments': ['content']},
+            include=['comments'],
+            multiple=False
+        )
+        assert estimate.by_type == {'articles': 50, 'comments': 50}
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestCostGuard(object):
+    @pytest.fixture
+    def query_builder(self, model_mapping):
+        return QueryBuilder(
+            model_mapping,
+            cost_estimator=CostEstimator(
+                max_cost=1000,
+                max_type_costs={'users': 50},
+                default_rows=10,
+                to_many_rows=10
+            )
+        )
+
+    def test_within_budget(self, query_builder, session, article_cls):
+        query = query_builder.select(
+            article_cls,
+            fields={'articles': ['name'], 'users': ['name']},
+            include=['author']
+        )
+        assert session.execute(query).scalar()['data'][0]['id'] == '1'
+
+    def test_exceeds_max_cost(self, query_builder, article_cls):
+        with pytest.raises(RequestTooComplex) as excinfo:
+            query_builder.select(
+                article_cls,
+                include=['comments.author.groups.users.comments']
+            )
+        assert excinfo.value.estimate.total > 1000
+
+    def test_exceeds_type_cost(self, query_builder, article_cls):
+        with pytest.raises(RequestTooComplex) as excinfo:
+            query_builder.select_one(
+                article_cls,
+                1,
+                fields={'users': ['name', 'groups']},
+                include=['comments.author']
+            )
+        assert excinfo.value.estimate.by_type['users'] == 10 * 11
+        assert excinfo.value.estimate.total < 1000
+        assert "'users'" in str(excinfo.value)
+
+    def test_select_rows(self, query_builder, article_cls):
+        with pytest.raises(RequestTooComplex):
+            query_builder.select_rows(
+                article_cls,
+                include=['comments.author.groups.users']
+            )
+
+    def test_select_related(self, query_builder, user_cls):
+        with pytest.raises(RequestTooComplex):
+            query_builder.select_related(
+                (user_cls, 1),
+                'all_friends',
+                include=['comments.article.comments']
+            )
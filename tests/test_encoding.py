@@ -0,0 +1,62 @@
+import pytest
+
+from sqlalchemy_json_api import encode_document
+
+DECODERS = {
+    'msgpack': lambda payload: pytest.importorskip('msgpack').unpackb(
+        payload,
+        raw=False
+    ),
+    'cbor': lambda payload: pytest.importorskip('cbor2').loads(payload)
+}
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestEncodeDocument(object):
+    @pytest.mark.parametrize('encoding', ('msgpack', 'cbor'))
+    @pytest.mark.parametrize(
+        'kwargs',
+        ({}, {'as_text': True}, {'as_bytes': True})
+    )
+    def test_preserves_document(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        encoding,
+        kwargs
+    ):
+        pytest.importorskip('msgpack' if encoding == 'msgpack' else 'cbor2')
+        query = query_builder.select_one(
+            article_cls,
+            1,
+            fields={'articles': ['name', 'author'], 'users': ['name']},
+            include=['author'],
+            **kwargs
+        )
+        payload = encode_document(session.execute(query).scalar(), encoding)
+        assert DECODERS[encoding](payload) == {
+            'data': {
+                'type': 'articles',
+                'id': '1',
+                'attributes': {'name': 'Some article'},
+                'relationships': {
+                    'author': {'data': {'type': 'users', 'id': '1'}}
+                }
+            },
+            'included': [
+                {
+                    'type': 'users',
+                    'id': '1',
+                    'attributes': {'name': 'User 1'}
+                }
+            ]
+        }
+
+    def test_none(self):
+        pytest.importorskip('msgpack')
+        assert encode_document(None) is None
+
+    def test_unknown_encoding(self):
+        with pytest.raises(ValueError):
+            encode_document({'data': None}, 'xml')
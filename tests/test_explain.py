@@ -0,0 +1,129 @@
+import os
+import re
+
+import pytest
+
+from sqlalchemy_json_api import (
+    assert_plan_shape,
+    explain,
+    get_server_version_key
+)
+
+PLANS_DIR = os.path.join(os.path.dirname(__file__), 'plans')
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestExplain(object):
+    def test_analyze(self, query_builder, session, article_cls):
+        query = query_builder.select_one(
+            article_cls,
+            1,
+            fields={'articles': ['name', 'comments'], 'comments': ['content']},
+            include=['comments']
+        )
+        plan = explain(session, query)
+        assert plan.execution_time is not None
+        assert plan.subplan_count > 0
+        assert 'comment' in plan.seq_scans
+        errors = [error for node, error in plan.estimate_errors]
+        assert errors == sorted(errors, reverse=True)
+        assert all(error >= 1 for error in errors)
+        summary = plan.summarize(query_builder)
+        assert summary['comments']['scans'] > 0
+        assert summary['comments']['rows'] >= 4
+        assert summary['articles']['max_estimate_error'] >= 1
+
+    def test_without_analyze(self, query_builder, session, article_cls):
+        plan = explain(session, query_builder.select(article_cls), False)
+        assert plan.execution_time is None
+        assert plan.estimate_errors == []
+        assert plan.summarize()['article']['loops'] == 0
+
+    def test_shape(self, query_builder, session, user_cls):
+        plan = explain(
+            session,
+            query_builder.select(user_cls, fields={'users': ['name']})
+        )
+        assert not plan.shape[0].startswith(' ')
+        assert any(
+            line.endswith('(SubPlan)') or line.endswith('(InitPlan)')
+            for line in plan.shape
+        )
+
+    def test_server_version_key(self, session):
+        key = get_server_version_key(session)
+        assert re.match(r'^\d+(\.\d+)?$', key)
+        assert key == get_server_version_key(session.bind)
+
+    def test_assert_plan_shape(self, query_builder, session, user_cls, tmpdir):
+        plan = explain(session, query_builder.select(user_cls))
+        path = str(tmpdir.join('plans', 'plan.txt'))
+        with pytest.raises(AssertionError):
+            assert_plan_shape(plan, path, update=False)
+        assert not os.path.exists(path)
+        assert_plan_shape(plan, path, update=True)
+        assert_plan_shape(plan, path, update=False)
+        with open(path, 'w') as file:
+            file.write('Result\n')
+        with pytest.raises(AssertionError):
+            assert_plan_shape(plan, path, update=False)
+        assert_plan_shape(plan, path, update=True)
+        assert_plan_shape(plan, path, update=False)
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestPlanShapes(object):
+    @pytest.mark.parametrize(
+        ('name', 'method', 'args', 'kwargs'),
+        (
+            (
+                'select_articles_with_includes',
+                'select',
+                ('articles', ),
+                {'include': ['author', 'comments.author']}
+            ),
+            (
+                'select_one_user',
+                'select_one',
+                ('users', 1),
+                {'fields': {'users': ['name', 'groups']}}
+            ),
+            (
+                'select_related_comments',
+                'select_related',
+                (('articles', 1), 'comments'),
+                {'fields': {'comments': ['content']}, 'limit': 2}
+            ),
+            (
+                'select_relationship_groups',
+                'select_relationship',
+                (('users', 1), 'groups'),
+                {}
+            ),
+        )
+    )
+    def test_plan_shape(
+        self,
+        query_builder,
+        session,
+        model_mapping,
+        name,
+        method,
+        args,
+        kwargs
+    ):
+        if isinstance(args[0], tuple):
+            args = ((model_mapping[args[0][0]], args[0][1]), ) + args[1:]
+        else:
+            args = (model_mapping[args[0]], ) + args[1:]
+        # Plan shapes differ between PostgreSQL versions, so the snapshots
+        # are stored per server version. A missing snapshot fails the test
+        # unless the plan tests are explicitly skipped.
+        if os.environ.get('SQLALCHEMY_JSON_API_SKIP_PLANS'):
+            pytest.skip('SQLALCHEMY_JSON_API_SKIP_PLANS is set.')
+        plans_dir = os.path.join(PLANS_DIR, get_server_version_key(session))
+        query = getattr(query_builder, method)(*args, **kwargs)
+        assert_plan_shape(
+            explain(session, query),
+            os.path.join(plans_dir, name + '.txt')
+        )
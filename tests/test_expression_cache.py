@@ -0,0 +1,149 @@
+from itertools import count
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.util import ClauseAdapter
+
+from sqlalchemy_json_api import QueryBuilder, utils
+
+
+@pytest.fixture
+def traversals(monkeypatch):
+    traversals = []
+
+    class CountingClauseAdapter(ClauseAdapter):
+        def traverse(self, obj):
+            traversals.append(obj)
+            return super(CountingClauseAdapter, self).traverse(obj)
+
+    monkeypatch.setattr(utils, 'ClauseAdapter', CountingClauseAdapter)
+    return traversals
+
+
+class TestExpressionCache(object):
+    def test_hybrid_names(self, query_builder, article_cls):
+        names = query_builder.get_hybrid_names(article_cls)
+        assert names == ('name', 'name_upper')
+        assert query_builder.get_hybrid_names(article_cls) is names
+
+    def test_column_property_expressions(self, query_builder, article_cls):
+        expressions = query_builder.get_column_property_expressions(
+            article_cls
+        )
+        assert list(expressions) == ['comment_count']
+        assert query_builder.get_column_property_expressions(
+            article_cls
+        ) is expressions
+
+    def test_adapts_once_per_selectable(
+        self,
+        query_builder,
+        article_cls,
+        traversals
+    ):
+        from_obj = article_cls.__table__.alias()
+        adapted = query_builder.adapt_expression(
+            article_cls,
+            'name_upper',
+            from_obj
+        )
+        assert query_builder.adapt_expression(
+            article_cls,
+            'name_upper',
+            from_obj
+        ) is adapted
+        assert len(traversals) == 1
+        query_builder.adapt_expression(
+            article_cls,
+            'name_upper',
+            article_cls.__table__.alias()
+        )
+        assert len(traversals) == 2
+
+    def test_select_adapts_each_expression_once(
+        self,
+        query_builder,
+        comment_cls,
+        traversals
+    ):
+        query_builder.select(
+            comment_cls,
+            fields={
+                'comments': ['article'],
+                'articles': ['name', 'name_upper', 'comment_count']
+            },
+            include=['article']
+        )
+        # name_upper and comment_count of the included articles, name is a
+        # plain column and does not need a traversal.
+        assert len(traversals) == 2
+
+    @pytest.mark.usefixtures('table_creator', 'dataset')
+    def test_included_hybrids(self, session, query_builder, comment_cls):
+        query = query_builder.select(
+            comment_cls,
+            fields={
+                'comments': ['article'],
+                'articles': ['name_upper', 'comment_count']
+            },
+            include=['article'],
+            sort=['id']
+        )
+        included = session.execute(query).scalar()['included']
+        assert included[0]['attributes'] == {
+            'name_upper': 'SOME ARTICLE',
+            'comment_count': 4
+        }
+
+    def test_class_expression_is_built_once(self):
+        calls = []
+
+        class Counter(declarative_base()):
+            __tablename__ = 'counter'
+            id = sa.Column(sa.Integer, primary_key=True)
+
+            @hybrid_property
+            def value(self):
+                return 1
+
+            @value.expression
+            def value(cls):
+                calls.append(cls)
+                return sa.literal(1)
+
+        query_builder = QueryBuilder({'counters': Counter})
+        for _ in range(2):
+            query_builder.select(Counter, fields={'counters': ['value']})
+        assert len(calls) == 1
+
+    def test_uncached_hybrid_expression_is_built_for_each_query(self):
+        counter = count()
+
+        class Counter(declarative_base()):
+            __tablename__ = 'counter'
+            id = sa.Column(sa.Integer, primary_key=True)
+
+            @hybrid_property
+            def value(self):
+                return next(counter)
+
+            @value.expression
+            def value(cls):
+                return sa.literal(next(counter))
+
+            value.info['cache_expression'] = False
+
+        query_builder = QueryBuilder({'counters': Counter})
+        values = [
+            query_builder.select_one(
+                Counter,
+                1,
+                fields={'counters': ['value']}
+            ).compile(dialect=postgresql.dialect()).params
+            for _ in range(2)
+        ]
+        assert values[0]['param_1'] == 0
+        assert values[1]['param_1'] == 1
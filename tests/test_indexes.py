@@ -0,0 +1,123 @@
+import sys
+import types
+
+import pytest
+import sqlalchemy as sa
+
+from sqlalchemy_json_api import find_missing_indexes
+from sqlalchemy_json_api.indexes import main
+
+MISSING_INDEXES = [
+    ('article', ('author_id',), ('users.authored_articles',)),
+    ('article', ('category_id',), ('categories.articles',)),
+    ('article', ('owner_id',), ('users.owned_articles',)),
+    ('category', ('parent_id',), ('categories.subcategories',)),
+    ('comment', ('article_id',), ('articles.comments',)),
+    ('comment', ('author_id',), ('users.comments',)),
+    ('group_user', ('group_id',), ('groups.users',)),
+    ('group_user', ('user_id',), ('users.groups',)),
+    ('organization_membership', ('user_id',), ('users.memberships',)),
+]
+
+
+def as_tuples(missing_indexes):
+    return [
+        (
+            index.table.name,
+            tuple(column.name for column in index.columns),
+            index.relationships
+        )
+        for index in missing_indexes
+    ]
+
+
+@pytest.fixture
+def app_module(monkeypatch, query_builder):
+    module = types.ModuleType('index_advisor_app')
+    module.query_builder = query_builder
+    monkeypatch.setitem(sys.modules, 'index_advisor_app', module)
+    return module
+
+
+class TestFindMissingIndexes(object):
+    def test_metadata_indexes(self, query_builder):
+        assert as_tuples(
+            find_missing_indexes(query_builder)
+        ) == MISSING_INDEXES
+
+    def test_declared_index(self, query_builder, comment_cls):
+        index = sa.Index(
+            'ix_comment_article_id',
+            comment_cls.__table__.c.article_id
+        )
+        try:
+            tables = as_tuples(find_missing_indexes(query_builder))
+        finally:
+            comment_cls.__table__.indexes.remove(index)
+        assert ('comment', ('article_id',), ('articles.comments',)) not in (
+            tables
+        )
+
+    def test_create_statement(self, query_builder):
+        statements = [
+            index.create_statement()
+            for index in find_missing_indexes(query_builder)
+        ]
+        assert statements[0] == (
+            'CREATE INDEX ix_article_author_id ON article (author_id)'
+        )
+
+    def test_alembic_operation(self, query_builder):
+        operations = [
+            index.alembic_operation()
+            for index in find_missing_indexes(query_builder)
+        ]
+        assert operations[-1] == (
+            "op.create_index('ix_organization_membership_user_id', "
+            "'organization_membership', ['user_id'])"
+        )
+
+
+@pytest.mark.usefixtures('table_creator')
+class TestFindMissingIndexesReflected(object):
+    def test_reflected_indexes(self, session, query_builder):
+        assert as_tuples(
+            find_missing_indexes(query_builder, session)
+        ) == MISSING_INDEXES
+
+    def test_created_index(self, session, query_builder):
+        session.execute(
+            'CREATE INDEX ix_group_user_user_id_group_id '
+            'ON group_user (user_id, group_id)'
+        )
+        try:
+            tables = as_tuples(find_missing_indexes(query_builder, session))
+        finally:
+            session.rollback()
+        assert ('group_user', ('user_id',), ('users.groups',)) not in tables
+        assert ('group_user', ('group_id',), ('groups.users',)) in tables
+
+    def test_main_with_url(self, capsys, dns, app_module):
+        assert main(['index_advisor_app:query_builder', '--url', dns]) == 1
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 2 * len(MISSING_INDEXES)
+
+
+class TestMain(object):
+    def test_create_statements(self, capsys, app_module):
+        assert main(['index_advisor_app:query_builder']) == 1
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[:2] == [
+            '-- users.authored_articles',
+            'CREATE INDEX ix_article_author_id ON article (author_id);'
+        ]
+        assert len(lines) == 2 * len(MISSING_INDEXES)
+
+    def test_alembic_operations(self, capsys, app_module):
+        assert main(['index_advisor_app:query_builder', '--alembic']) == 1
+        lines = capsys.readouterr().out.splitlines()
+        assert lines[:2] == [
+            '# users.authored_articles',
+            "op.create_index('ix_article_author_id', 'article', "
+            "['author_id'])"
+        ]
@@ -0,0 +1,235 @@
+import pytest
+
+from sqlalchemy_json_api import (
+    InvalidDocument,
+    InvalidField,
+    UnknownField,
+    UnknownRelationship
+)
+
+
+@pytest.fixture
+def rollback(session):
+    yield
+    session.rollback()
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset', 'rollback')
+class TestInsert(object):
+    def test_returns_inserted_document(
+        self,
+        query_builder,
+        session,
+        article_cls
+    ):
+        query = query_builder.insert(
+            article_cls,
+            {
+                'data': {
+                    'type': 'articles',
+                    'id': '10',
+                    'attributes': {
+                        'name': 'New article',
+                        'content': 'Content'
+                    },
+                    'relationships': {
+                        'author': {'data': {'type': 'users', 'id': '2'}},
+                        'category': {'data': None}
+                    }
+                }
+            },
+            fields={
+                'articles': ['name', 'name_upper', 'comment_count', 'author'],
+                'users': ['name']
+            },
+            include=['author']
+        )
+        assert session.execute(query).scalar() == {
+            'data': {
+                'type': 'articles',
+                'id': '10',
+                'attributes': {
+                    'name': 'New article',
+                    'name_upper': 'NEW ARTICLE',
+                    'comment_count': 0
+                },
+                'relationships': {
+                    'author': {'data': {'type': 'users', 'id': '2'}}
+                }
+            },
+            'included': [
+                {
+                    'type': 'users',
+                    'id': '2',
+                    'attributes': {'name': 'User 2'}
+                }
+            ]
+        }
+        article = session.query(article_cls).get(10)
+        assert article.author_id == 2
+        assert article.content == 'Content'
+
+    def test_generated_id(self, query_builder, session, group_cls):
+        query = query_builder.insert(
+            group_cls,
+            {'data': {'type': 'groups', 'attributes': {'name': 'Group 3'}}}
+        )
+        document = session.execute(query).scalar()
+        assert document['data']['attributes'] == {'name': 'Group 3'}
+        assert session.query(group_cls).get(
+            int(document['data']['id'])
+        ).name == 'Group 3'
+
+    def test_type_mismatch(self, query_builder, article_cls):
+        with pytest.raises(InvalidDocument):
+            query_builder.insert(article_cls, {'data': {'type': 'users'}})
+
+    def test_missing_data(self, query_builder, article_cls):
+        with pytest.raises(InvalidDocument):
+            query_builder.insert(article_cls, {})
+
+    def test_unknown_attribute(self, query_builder, article_cls):
+        with pytest.raises(UnknownField):
+            query_builder.insert(
+                article_cls,
+                {'data': {'type': 'articles', 'attributes': {'some': 1}}}
+            )
+
+    def test_computed_attribute(self, query_builder, article_cls):
+        with pytest.raises(InvalidField):
+            query_builder.insert(
+                article_cls,
+                {
+                    'data': {
+                        'type': 'articles',
+                        'attributes': {'comment_count': 1}
+                    }
+                }
+            )
+
+    def test_unknown_relationship(self, query_builder, article_cls):
+        with pytest.raises(UnknownRelationship):
+            query_builder.insert(
+                article_cls,
+                {
+                    'data': {
+                        'type': 'articles',
+                        'relationships': {'some': {'data': None}}
+                    }
+                }
+            )
+
+    def test_to_many_relationship(self, query_builder, article_cls):
+        with pytest.raises(InvalidField):
+            query_builder.insert(
+                article_cls,
+                {
+                    'data': {
+                        'type': 'articles',
+                        'relationships': {'comments': {'data': []}}
+                    }
+                }
+            )
+
+    @pytest.mark.parametrize(
+        'linkage',
+        (
+            {'type': 'articles', 'id': '1'},
+            [{'type': 'users', 'id': '1'}],
+            {'type': 'users'},
+            {'id': '1'},
+            '1',
+        )
+    )
+    def test_invalid_linkage(self, query_builder, article_cls, linkage):
+        with pytest.raises(InvalidDocument):
+            query_builder.insert(
+                article_cls,
+                {
+                    'data': {
+                        'type': 'articles',
+                        'relationships': {'author': {'data': linkage}}
+                    }
+                }
+            )
+
+    @pytest.mark.parametrize('key', ('attributes', 'relationships'))
+    def test_invalid_members(self, query_builder, article_cls, key):
+        with pytest.raises(InvalidDocument):
+            query_builder.insert(
+                article_cls,
+                {'data': {'type': 'articles', key: [{'name': 'Article'}]}}
+            )
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset', 'rollback')
+class TestUpdate(object):
+    def test_returns_updated_document(
+        self,
+        query_builder,
+        session,
+        article_cls
+    ):
+        query = query_builder.update(
+            article_cls,
+            1,
+            {
+                'data': {
+                    'type': 'articles',
+                    'id': '1',
+                    'attributes': {'name': 'Updated article'},
+                    'relationships': {
+                        'author': {'data': {'type': 'users', 'id': '2'}}
+                    }
+                }
+            },
+            fields={'articles': ['name', 'comment_count', 'author']}
+        )
+        assert session.execute(query).scalar() == {
+            'data': {
+                'type': 'articles',
+                'id': '1',
+                'attributes': {
+                    'name': 'Updated article',
+                    'comment_count': 4
+                },
+                'relationships': {
+                    'author': {'data': {'type': 'users', 'id': '2'}}
+                }
+            }
+        }
+        assert session.query(article_cls).get(1).author_id == 2
+
+    def test_without_values(self, query_builder, session, article_cls):
+        query = query_builder.update(
+            article_cls,
+            1,
+            {'data': {'type': 'articles', 'id': '1'}},
+            fields={'articles': ['name']}
+        )
+        assert session.execute(query).scalar() == {
+            'data': {
+                'type': 'articles',
+                'id': '1',
+                'attributes': {'name': 'Some article'}
+            }
+        }
+
+    @pytest.mark.parametrize(
+        'document',
+        (
+            {'data': {'type': 'articles', 'attributes': {'name': 'Name'}}},
+            {'data': {'type': 'articles', 'id': '99'}}
+        )
+    )
+    def test_unknown_id(self, query_builder, session, article_cls, document):
+        query = query_builder.update(article_cls, 99, document)
+        assert session.execute(query).scalar() is None
+
+    def test_id_mismatch(self, query_builder, article_cls):
+        with pytest.raises(InvalidDocument):
+            query_builder.update(
+                article_cls,
+                1,
+                {'data': {'type': 'articles', 'id': '2'}}
+            )
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from sqlalchemy_json_api import UnknownFieldKey
+from sqlalchemy_json_api.loader import DocumentLoader
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestDocumentLoader(object):
+    @pytest.fixture
+    def loop(self):
+        loop = asyncio.new_event_loop()
+        yield loop
+        loop.close()
+
+    @pytest.fixture
+    def queries(self):
+        return []
+
+    @pytest.fixture
+    def loader(self, query_builder, session, loop, queries):
+        def execute(query):
+            queries.append(query)
+            future = loop.create_future()
+            future.set_result(session.execute(query).fetchall())
+            return future
+
+        return DocumentLoader(query_builder, execute, loop=loop)
+
+    def test_coalesces_calls_with_same_shape(
+        self,
+        loader,
+        loop,
+        queries,
+        query_builder,
+        session,
+        user_cls
+    ):
+        kwargs = {
+            'fields': {'users': ['name', 'groups']},
+            'include': ['groups']
+        }
+        documents = loop.run_until_complete(
+            asyncio.gather(
+                loader.load(user_cls, 1, **kwargs),
+                loader.load(user_cls, 3, **kwargs),
+                loader.load(user_cls, 1, **kwargs),
+                loader.load(user_cls, 99, **kwargs),
+            )
+        )
+        assert len(queries) == 1
+        assert documents == [
+            session.execute(
+                query_builder.select_one(user_cls, id, **kwargs)
+            ).scalar()
+            for id in (1, 3, 1, 99)
+        ]
+        assert documents[-1] is None
+
+    def test_separate_queries_for_different_shapes(
+        self,
+        loader,
+        loop,
+        queries,
+        user_cls,
+        article_cls
+    ):
+        documents = loop.run_until_complete(
+            asyncio.gather(
+                loader.load(user_cls, 1, fields={'users': ['name']}),
+                loader.load(user_cls, 2, fields={'users': ['name']}),
+                loader.load(user_cls, 1, fields={'users': []}),
+                loader.load(article_cls, 1, fields={'articles': []}),
+            )
+        )
+        assert len(queries) == 3
+        assert [document['data']['id'] for document in documents] == [
+            '1', '2', '1', '1'
+        ]
+
+    def test_max_batch_size(self, loader, loop, queries, user_cls):
+        loader.max_batch_size = 2
+        loop.run_until_complete(
+            asyncio.gather(*(loader.load(user_cls, id) for id in range(1, 6)))
+        )
+        assert len(queries) == 3
+
+    def test_exceptions_are_propagated(self, loader, loop, user_cls):
+        with pytest.raises(UnknownFieldKey):
+            loop.run_until_complete(
+                loader.load(user_cls, 1, fields={'unknown': []})
+            )
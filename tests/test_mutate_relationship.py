@@ -0,0 +1,84 @@
+import pytest
+
+from sqlalchemy_json_api import InvalidField
+
+
+@pytest.fixture
+def group(session, group_cls):
+    group = group_cls(id=3, name='Group 3')
+    session.add(group)
+    session.flush()
+    yield group
+    session.rollback()
+
+
+def group_ids(session, group_user_cls, user_id):
+    return sorted(
+        row.group_id for row in session.execute(
+            group_user_cls.select().where(group_user_cls.c.user_id == user_id)
+        )
+    )
+
+
+def linkage(*ids):
+    return {'data': [{'type': 'groups', 'id': str(id)} for id in ids]}
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset', 'group')
+class TestMutateRelationship(object):
+    @pytest.mark.parametrize(
+        ('method', 'ids', 'result'),
+        (
+            ('replace_relationship', [2, 3], ([2, 3], 1, 1)),
+            ('replace_relationship', ['1', '2'], ([1, 2], 0, 0)),
+            ('replace_relationship', [], ([], 2, 0)),
+            ('add_to_relationship', [2, 3, 3], ([1, 2, 3], 0, 1)),
+            ('add_to_relationship', [], ([1, 2], 0, 0)),
+            ('remove_from_relationship', [1, 3], ([2], 1, 0)),
+            ('remove_from_relationship', [], ([1, 2], 0, 0)),
+        )
+    )
+    def test_mutation(
+        self,
+        query_builder,
+        session,
+        user_cls,
+        group_user_cls,
+        method,
+        ids,
+        result
+    ):
+        query = getattr(query_builder, method)(
+            (user_cls, 1),
+            'groups',
+            ids,
+            sort=['id']
+        )
+        document, removed, added = session.execute(query).first()
+        new_ids, expected_removed, expected_added = result
+        assert document == linkage(*new_ids)
+        assert (removed, added) == (expected_removed, expected_added)
+        assert group_ids(session, group_user_cls, 1) == new_ids
+
+    def test_with_object(
+        self,
+        query_builder,
+        session,
+        user_cls,
+        group_user_cls
+    ):
+        query = query_builder.add_to_relationship(
+            session.query(user_cls).get(2),
+            'groups',
+            [3],
+            as_text=True
+        )
+        assert session.execute(query).scalar() == (
+            '{"data":[{"id" : "3", "type" : "groups"}]}'
+        )
+        assert group_ids(session, group_user_cls, 2) == [3]
+
+    @pytest.mark.parametrize('key', ('all_friends', 'memberships'))
+    def test_unsupported_relationship(self, query_builder, user_cls, key):
+        with pytest.raises(InvalidField):
+            query_builder.replace_relationship((user_cls, 1), key, [1])
@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestSelectBatch(object):
+    def test_matches_separate_queries(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        user_cls,
+        category_cls
+    ):
+        requests = [
+            (
+                'select_one',
+                (article_cls, 1),
+                {'fields': {'articles': ['name']}, 'include': ['author']}
+            ),
+            ('select', (user_cls, ), {'fields': {'users': ['name']}}),
+            (
+                'select',
+                (category_cls, ),
+                {'sort': ['-id'], 'limit': 2, 'include': ['parent']}
+            ),
+            ('select_related', ((article_cls, 1), 'comments')),
+            ('select_relationship', ((user_cls, 1), 'groups')),
+            ('select_one', (user_cls, 99)),
+        ]
+        query = query_builder.select_batch(requests)
+        documents = list(session.execute(query).first())
+        assert documents == [
+            session.execute(
+                getattr(query_builder, request[0])(
+                    *request[1],
+                    **(request[2] if len(request) > 2 else {})
+                )
+            ).scalar()
+            for request in requests
+        ]
+        assert documents[-1] is None
+
+    def test_as_text(self, query_builder, session, article_cls):
+        query = query_builder.select_batch([
+            (
+                'select_one',
+                (article_cls, 1),
+                {'fields': {'articles': ['name']}, 'as_text': True}
+            ),
+        ])
+        document = session.execute(query).scalar()
+        assert json.loads(document) == {
+            'data': {
+                'type': 'articles',
+                'id': '1',
+                'attributes': {'name': 'Some article'}
+            }
+        }
+
+    def test_unknown_method(self, query_builder, article_cls):
+        with pytest.raises(ValueError):
+            query_builder.select_batch([('delete', (article_cls, 1))])
+
+    def test_etag_is_not_supported(self, query_builder, article_cls):
+        with pytest.raises(TypeError):
+            query_builder.select_batch([
+                ('select_one', (article_cls, 1), {'etag': True})
+            ])
@@ -0,0 +1,111 @@
+import io
+import json
+
+import pytest
+
+from sqlalchemy_json_api import UnknownField, UnknownFieldKey
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestSelectExport(object):
+    def test_csv(self, query_builder, session, article_cls):
+        export_query = query_builder.select_export(
+            article_cls,
+            fields={
+                'articles': ['name', 'name_upper', 'comment_count', 'author']
+            }
+        )
+        file = io.StringIO()
+        export_query.copy_to(session, file)
+        assert file.getvalue() == (
+            'id,name,name_upper,comment_count,author\n'
+            '1,Some article,SOME ARTICLE,4,1\n'
+        )
+
+    def test_csv_without_header(self, query_builder, session, user_cls):
+        export_query = query_builder.select_export(
+            user_cls,
+            header=False,
+            fields={'users': ['name', 'groups']},
+            sort=['id'],
+            limit=2
+        )
+        file = io.StringIO()
+        export_query.copy_to(session, file)
+        rows = file.getvalue().splitlines()
+        assert rows[0] in ('1,User 1,"{1,2}"', '1,User 1,"{2,1}"')
+        assert rows[1] == '2,User 2,{}'
+
+    def test_jsonl(self, query_builder, session, user_cls):
+        export_query = query_builder.select_export(
+            user_cls,
+            format='jsonl',
+            fields={'users': ['name']},
+            sort=['-id'],
+            limit=2
+        )
+        file = io.StringIO()
+        export_query.copy_to(session, file)
+        assert [json.loads(line) for line in file.getvalue().splitlines()] == [
+            {'id': '5', 'type': 'users', 'attributes': {'name': 'User 5'}},
+            {'id': '4', 'type': 'users', 'attributes': {'name': 'User 4'}}
+        ]
+
+    def test_jsonl_escapes(self, query_builder, session, article_cls):
+        export_query = query_builder.select_export(
+            article_cls,
+            format='jsonl',
+            fields={'articles': ['content']},
+            from_obj=session.query(article_cls).filter(
+                article_cls.content == 'Some\n"content"\\%'
+            )
+        )
+        session.add(article_cls(id=10, content='Some\n"content"\\%'))
+        session.flush()
+        file = io.BytesIO()
+        export_query.copy_to(session, file)
+        session.rollback()
+        assert json.loads(file.getvalue().decode('utf-8')) == {
+            'id': '10',
+            'type': 'articles',
+            'attributes': {'content': 'Some\n"content"\\%'}
+        }
+
+    def test_unknown_format(self, query_builder, user_cls):
+        with pytest.raises(ValueError):
+            query_builder.select_export(user_cls, format='xml')
+
+    @pytest.mark.parametrize(
+        ('fields', 'exception'),
+        (
+            ({'some': []}, UnknownFieldKey),
+            ({'users': ['some']}, UnknownField),
+        )
+    )
+    def test_invalid_fields(self, query_builder, user_cls, fields, exception):
+        with pytest.raises(exception):
+            query_builder.select_export(user_cls, fields=fields)
+
+    def test_fetch_batches(self, query_builder, session, user_cls):
+        export_query = query_builder.select_export(
+            user_cls,
+            fields={'users': ['name', 'groups']},
+            sort=['id']
+        )
+        batches = list(export_query.fetch_batches(session, batch_size=2))
+        assert [len(rows) for rows in batches] == [2, 2, 1]
+        assert [tuple(row[:2]) for row in batches[0]] == [
+            ('1', 'User 1'),
+            ('2', 'User 2')
+        ]
+        assert sorted(batches[0][0][2]) == ['1', '2']
+
+    def test_fetch_batches_of_jsonl_query(
+        self,
+        query_builder,
+        session,
+        user_cls
+    ):
+        export_query = query_builder.select_export(user_cls, format='jsonl')
+        with pytest.raises(ValueError):
+            list(export_query.fetch_batches(session))
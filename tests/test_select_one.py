@@ -62,3 +62,31 @@ class TestSelectOne(object):
                 }
             }
         }
+
+    def test_as_bytes_parameter(self, query_builder, session, article_cls):
+        query = query_builder.select_one(
+            article_cls,
+            1,
+            fields={'articles': ['name']},
+            as_bytes=True
+        )
+        result = session.execute(query).scalar()
+        assert isinstance(result, bytes)
+        # The raw document is returned as is, without a json round trip.
+        assert result == session.execute(
+            query_builder.select_one(
+                article_cls,
+                1,
+                fields={'articles': ['name']},
+                as_text=True
+            )
+        ).scalar().encode('utf-8')
+        assert json.loads(result.decode('utf-8')) == {
+            'data': {
+                'type': 'articles',
+                'id': '1',
+                'attributes': {
+                    'name': 'Some article'
+                }
+            }
+        }
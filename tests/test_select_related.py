@@ -88,6 +88,66 @@ class TestSelectRelated(object):
         )
         assert session.execute(query).scalar() == result
 
+    @pytest.mark.parametrize(
+        ('model', 'id', 'relationship_key'),
+        (
+            ('article_cls', 1, 'comments'),
+            ('article_cls', 1, 'author'),
+            ('category_cls', 1, 'subcategories'),
+            ('category_cls', 3, 'parent'),
+            ('category_cls', 1, 'parent'),
+            ('user_cls', 1, 'groups'),
+            ('user_cls', 2, 'all_friends'),
+            ('user_cls', 1, 'memberships'),
+            ('group_cls', 1, 'users'),
+        )
+    )
+    def test_with_model_and_id(
+        self,
+        request,
+        query_builder,
+        session,
+        model,
+        id,
+        relationship_key
+    ):
+        model = request.getfixturevalue(model)
+        expected = session.execute(
+            query_builder.select_related(
+                session.query(model).get(id),
+                relationship_key
+            )
+        ).scalar()
+        query = query_builder.select_related(
+            (model, id),
+            relationship_key
+        )
+        result = session.execute(query).scalar()
+        if isinstance(expected['data'], list):
+            # Relationships without order_by have no deterministic order.
+            expected['data'].sort(key=lambda resource: resource['id'])
+            result['data'].sort(key=lambda resource: resource['id'])
+        assert result == expected
+
+    def test_with_composite_id(
+        self,
+        query_builder,
+        session,
+        organization_membership_cls
+    ):
+        query = query_builder.select_related(
+            (organization_membership_cls, (1, 1)),
+            'organization',
+            fields={'organizations': ['name']}
+        )
+        assert session.execute(query).scalar() == {
+            'data': {
+                'type': 'organizations',
+                'id': '1',
+                'attributes': {'name': 'Organization 1'}
+            }
+        }
+
 
 @pytest.mark.usefixtures('table_creator', 'dataset')
 class TestSelectRelationshipWithLinks(object):
@@ -326,3 +386,18 @@ class TestSelectRelationshipWithLinks(object):
             as_text=True
         )
         assert json.loads(session.execute(query).scalar()) == result
+
+    def test_empty_result_as_bytes(
+        self,
+        query_builder,
+        session,
+        category_cls
+    ):
+        query = query_builder.select_related(
+            session.query(category_cls).get(1),
+            'parent',
+            fields={'categories': []},
+            as_bytes=True
+        )
+        result = session.execute(query).scalar()
+        assert json.loads(result.decode('utf-8')) == {'data': None}
@@ -0,0 +1,148 @@
+import pytest
+
+from sqlalchemy_json_api import InvalidPagination, QueryBuilder
+
+
+def ids(document):
+    return [resource['id'] for resource in document['data']]
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestSelectRelatedWithPagination(object):
+    @pytest.mark.parametrize(
+        ('kwargs', 'result'),
+        (
+            ({'sort': ['-id']}, ['4', '3', '2', '1']),
+            ({'sort': ['-id'], 'limit': 2}, ['4', '3']),
+            ({'sort': ['-id'], 'limit': 2, 'offset': 2}, ['2', '1']),
+            ({'limit': 3, 'offset': 2}, ['3', '4']),
+            ({'sort': ['-id'], 'limit': 2, 'after': 3}, ['2', '1']),
+            ({'limit': 2, 'after': 1}, ['2', '3']),
+            ({'sort': ['author_id', '-content'], 'limit': 3}, ['3', '1', '4']),
+            (
+                {'sort': ['author_id', '-content'], 'limit': 2, 'after': 1},
+                ['4', '2']
+            ),
+        )
+    )
+    def test_to_many_relationship(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        kwargs,
+        result
+    ):
+        query = query_builder.select_related(
+            (article_cls, 1),
+            'comments',
+            fields={'comments': []},
+            **kwargs
+        )
+        assert ids(session.execute(query).scalar()) == result
+
+    def test_select_relationship(self, query_builder, session, user_cls):
+        query = query_builder.select_relationship(
+            session.query(user_cls).get(2),
+            'all_friends',
+            limit=2,
+            offset=1
+        )
+        assert session.execute(query).scalar() == {
+            'data': [
+                {'type': 'users', 'id': '3'},
+                {'type': 'users', 'id': '4'}
+            ]
+        }
+
+    @pytest.mark.parametrize('after', ('1:1', (1, 1)))
+    def test_after_with_composite_id(
+        self,
+        query_builder,
+        organization_cls,
+        after
+    ):
+        with pytest.raises(InvalidPagination):
+            query_builder.select_related(
+                (organization_cls, 1),
+                'members',
+                limit=2,
+                after=after
+            )
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestSelectRelatedPaginationLinks(object):
+    @pytest.fixture
+    def query_builder(self, model_mapping):
+        return QueryBuilder(model_mapping, base_url='/')
+
+    @pytest.mark.parametrize(
+        ('kwargs', 'links'),
+        (
+            (
+                {'limit': 2},
+                {
+                    'first': '/articles/1/comments?page[limit]=2'
+                             '&page[offset]=0',
+                    'next': '/articles/1/comments?page[limit]=2'
+                            '&page[offset]=2'
+                }
+            ),
+            (
+                {'limit': 2, 'offset': 2, 'sort': ['-id']},
+                {
+                    'first': '/articles/1/comments?sort=-id&page[limit]=2'
+                             '&page[offset]=0',
+                    'prev': '/articles/1/comments?sort=-id&page[limit]=2'
+                            '&page[offset]=0',
+                    'next': None
+                }
+            ),
+            (
+                {'limit': 2, 'after': 1},
+                {
+                    'first': '/articles/1/comments?page[limit]=2',
+                    'next': '/articles/1/comments?page[limit]=2'
+                            '&page[after]=3'
+                }
+            ),
+            (
+                {'limit': 2, 'after': 2},
+                {
+                    'first': '/articles/1/comments?page[limit]=2',
+                    'next': None
+                }
+            ),
+        )
+    )
+    def test_pagination_links(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        kwargs,
+        links
+    ):
+        query = query_builder.select_related(
+            (article_cls, 1),
+            'comments',
+            fields={'comments': []},
+            **kwargs
+        )
+        assert session.execute(query).scalar()['links'] == links
+
+    def test_relationship_links(self, query_builder, session, article_cls):
+        query = query_builder.select_relationship(
+            (article_cls, 1),
+            'comments',
+            limit=3,
+            links={'self': '/articles/1/relationships/comments'}
+        )
+        assert session.execute(query).scalar()['links'] == {
+            'self': '/articles/1/relationships/comments',
+            'first': '/articles/1/relationships/comments?page[limit]=3'
+                     '&page[offset]=0',
+            'next': '/articles/1/relationships/comments?page[limit]=3'
+                    '&page[offset]=3'
+        }
@@ -260,3 +260,28 @@ class TestSelectRelationshipWithLinks(object):
             as_text=True
         )
         assert json.loads(session.execute(query).scalar()) == result
+
+    @pytest.mark.parametrize(
+        ('id', 'result'),
+        (
+            (
+                1,
+                {'data': [
+                    {'type': 'groups', 'id': '1'},
+                    {'type': 'groups', 'id': '2'}
+                ]}
+            ),
+            (2, {'data': []}),
+            (99, {'data': []})
+        )
+    )
+    def test_with_model_and_id(
+        self,
+        query_builder,
+        session,
+        user_cls,
+        id,
+        result
+    ):
+        query = query_builder.select_relationship((user_cls, id), 'groups')
+        assert session.execute(query).scalar() == result
@@ -0,0 +1,160 @@
+import pytest
+import sqlalchemy as sa
+
+from sqlalchemy_json_api import assert_json_document, QueryBuilder
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestSelectRows(object):
+    @pytest.mark.parametrize(
+        ('fields', 'include'),
+        (
+            ({'articles': ['name', 'name_upper', 'comment_count']}, None),
+            ({'articles': ['author', 'comments']}, None),
+            ({'articles': []}, []),
+            (None, None),
+            (
+                {
+                    'articles': ['name', 'comments', 'category'],
+                    'comments': ['content', 'author'],
+                    'users': ['name'],
+                    'categories': ['name', 'subcategories']
+                },
+                ['comments.author', 'category.subcategories']
+            ),
+            (
+                {'articles': ['author', 'owner'], 'users': ['all_friends']},
+                ['author.all_friends', 'owner']
+            ),
+        )
+    )
+    def test_matches_select(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        fields,
+        include
+    ):
+        expected = session.execute(
+            query_builder.select(article_cls, fields=fields, include=include)
+        ).scalar()
+        document = query_builder.select_rows(
+            article_cls,
+            fields=fields,
+            include=include
+        ).execute(session)
+        assert_json_document(document, expected)
+
+    def test_self_referencing_included(
+        self,
+        query_builder,
+        session,
+        category_cls
+    ):
+        kwargs = dict(
+            fields={'categories': ['name', 'parent']},
+            include=['subcategories.subcategories'],
+            from_obj=session.query(category_cls).filter(
+                category_cls.id.in_([1, 2])
+            )
+        )
+        expected = session.execute(
+            query_builder.select(category_cls, **kwargs)
+        ).scalar()
+        document = query_builder.select_rows(
+            category_cls,
+            **kwargs
+        ).execute(session)
+        assert_json_document(document, expected)
+
+    def test_composite_ids(self, query_builder, session, user_cls):
+        kwargs = dict(
+            fields={'users': ['memberships'], 'memberships': ['is_admin']},
+            include=['memberships.organization']
+        )
+        expected = session.execute(
+            query_builder.select_one(user_cls, 1, **kwargs)
+        ).scalar()
+        document = query_builder.select_one_rows(
+            user_cls,
+            1,
+            **kwargs
+        ).execute(session)
+        assert_json_document(document, expected)
+
+    def test_sort_limit_and_offset(self, query_builder, session, user_cls):
+        kwargs = dict(fields={'users': ['name']}, sort=['-name'], limit=2)
+        expected = session.execute(
+            query_builder.select(user_cls, offset=1, **kwargs)
+        ).scalar()
+        document = query_builder.select_rows(
+            user_cls,
+            offset=1,
+            **kwargs
+        ).execute(session)
+        assert document == expected
+
+    def test_links(self, session, model_mapping, article_cls):
+        query_builder = QueryBuilder(
+            model_mapping,
+            base_url='/'
+        )
+        kwargs = dict(
+            fields={'articles': ['name', 'author'], 'users': ['name']},
+            include=['author'],
+            links={'self': '/articles'}
+        )
+        expected = session.execute(
+            query_builder.select(article_cls, **kwargs)
+        ).scalar()
+        document = query_builder.select_rows(
+            article_cls,
+            **kwargs
+        ).execute(session)
+        assert_json_document(document, expected)
+
+    def test_select_one_returns_none_for_unknown_id(
+        self,
+        query_builder,
+        session,
+        article_cls
+    ):
+        row_set_query = query_builder.select_one_rows(
+            article_cls,
+            99,
+            include=['author']
+        )
+        assert row_set_query.execute(session) is None
+
+    def test_executes_single_statement(
+        self,
+        query_builder,
+        session,
+        connection,
+        article_cls
+    ):
+        row_set_query = query_builder.select_rows(
+            article_cls,
+            fields={'articles': ['name', 'comments']},
+            include=['comments.author'],
+            limit=2
+        )
+        assert len(row_set_query.included) == 2
+        assert row_set_query.main.shape.attributes == ('name', )
+        statements = []
+
+        def count_statements(*args):
+            statements.append(args[2])
+
+        sa.event.listen(connection, 'before_cursor_execute', count_statements)
+        try:
+            row_set_query.execute(session)
+        finally:
+            sa.event.remove(
+                connection,
+                'before_cursor_execute',
+                count_statements
+            )
+        assert len(statements) == 1
+        assert statements[0].count('main_query AS') == 1
@@ -0,0 +1,141 @@
+import hashlib
+import json
+
+import pytest
+
+from sqlalchemy_json_api import execute_conditional, parse_if_none_match
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestSelectWithEtag(object):
+    def test_etag_is_md5_of_document(
+        self,
+        query_builder,
+        session,
+        article_cls
+    ):
+        text = session.execute(
+            query_builder.select(article_cls, as_text=True)
+        ).scalar()
+        result = execute_conditional(
+            session,
+            query_builder.select(article_cls, etag=True)
+        )
+        assert result.etag == hashlib.md5(text.encode('utf-8')).hexdigest()
+        assert result.document == json.loads(text)
+        assert not result.not_modified
+
+    @pytest.mark.parametrize('as_text', (True, False))
+    def test_etag_does_not_depend_on_output_format(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        as_text
+    ):
+        etag = execute_conditional(
+            session,
+            query_builder.select_one(article_cls, 1, etag=True)
+        ).etag
+        result = execute_conditional(
+            session,
+            query_builder.select_one(
+                article_cls,
+                1,
+                etag=True,
+                as_text=as_text,
+                as_bytes=not as_text
+            )
+        )
+        assert result.etag == etag
+
+    @pytest.mark.parametrize(
+        'if_none_match',
+        ('"{0}"', 'W/"{0}"', '"abc", "{0}"', '*')
+    )
+    def test_not_modified(
+        self,
+        query_builder,
+        session,
+        article_cls,
+        if_none_match
+    ):
+        etag = execute_conditional(
+            session,
+            query_builder.select_one(article_cls, 1, etag=True)
+        ).etag
+        result = execute_conditional(
+            session,
+            query_builder.select_one(
+                article_cls,
+                1,
+                etag=True,
+                if_none_match=if_none_match.format(etag)
+            )
+        )
+        assert result.not_modified
+        assert result.document is None
+        assert result.etag == etag
+
+    def test_modified(self, query_builder, session, article_cls):
+        result = execute_conditional(
+            session,
+            query_builder.select_one(
+                article_cls,
+                1,
+                fields={'articles': ['name']},
+                etag=True,
+                if_none_match='"abc"'
+            )
+        )
+        assert not result.not_modified
+        assert result.document == {
+            'data': {
+                'type': 'articles',
+                'id': '1',
+                'attributes': {'name': 'Some article'}
+            }
+        }
+
+    def test_modified_as_bytes(self, query_builder, session, article_cls):
+        result = execute_conditional(
+            session,
+            query_builder.select_one(
+                article_cls,
+                1,
+                etag=True,
+                as_bytes=True,
+                if_none_match='"abc"'
+            )
+        )
+        assert isinstance(result.document, bytes)
+
+    def test_unknown_resource(self, query_builder, session, article_cls):
+        query = query_builder.select_one(article_cls, 99, etag=True)
+        assert execute_conditional(session, query) is None
+
+    def test_select_related(self, query_builder, session, category_cls):
+        result = execute_conditional(
+            session,
+            query_builder.select_related(
+                session.query(category_cls).get(1),
+                'parent',
+                etag=True
+            )
+        )
+        assert result.document == {'data': None}
+        assert result.etag
+
+
+@pytest.mark.parametrize(
+    ('header', 'entity_tags'),
+    (
+        (None, []),
+        ('', []),
+        ('"abc"', ['abc']),
+        ('W/"abc", "def"', ['abc', 'def']),
+        ('*', ['*']),
+    )
+)
+def test_parse_if_none_match(header, entity_tags):
+    assert parse_if_none_match(header) == entity_tags
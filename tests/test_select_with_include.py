@@ -1,6 +1,9 @@
 import pytest
+from sqlalchemy_utils import relationships as relationships_module
 
 from sqlalchemy_json_api import assert_json_document
+from sqlalchemy_json_api import query_builder as query_builder_module
+from sqlalchemy_json_api import UnknownRelationship
 
 
 @pytest.mark.usefixtures('table_creator', 'dataset')
@@ -852,3 +855,84 @@ class TestQueryBuilderSelectWithInclude(object):
             include=include
         )
         assert_json_document(session.execute(query).scalar(), result)
+
+    @pytest.mark.parametrize(
+        'include',
+        (
+            ['unknown'],
+            ['comments.unknown'],
+            ['comments.content'],
+        )
+    )
+    def test_unknown_include_path(self, query_builder, article_cls, include):
+        with pytest.raises(UnknownRelationship):
+            query_builder.select(
+                article_cls,
+                fields={'articles': []},
+                include=include
+            )
+
+    def test_include_paths_are_cached(
+        self,
+        query_builder,
+        article_cls,
+        comment_cls
+    ):
+        include_paths = query_builder.get_include_paths(
+            article_cls,
+            'comments.author'
+        )
+        assert include_paths == (
+            ('comments', (article_cls.comments, )),
+            (
+                'comments.author',
+                (article_cls.comments, comment_cls.author)
+            )
+        )
+        assert query_builder.get_include_paths(
+            article_cls,
+            'comments.author'
+        ) is include_paths
+
+    def test_include_path_cache_is_bounded(
+        self,
+        monkeypatch,
+        query_builder,
+        article_cls
+    ):
+        monkeypatch.setattr(
+            query_builder_module,
+            'INCLUDE_PATH_CACHE_SIZE',
+            2
+        )
+        paths = [
+            'comments',
+            'comments.article',
+            'comments.article.comments',
+        ]
+        for path in paths:
+            query_builder.get_include_paths(article_cls, path)
+        assert list(query_builder._include_paths) == [
+            (article_cls, path) for path in paths[1:]
+        ]
+
+    def test_reuses_include_path_relationships(
+        self,
+        monkeypatch,
+        query_builder,
+        article_cls
+    ):
+        resolved_paths = []
+        path_to_relationships = relationships_module.path_to_relationships
+
+        def spy(path, cls):
+            resolved_paths.append(path)
+            return path_to_relationships(path, cls)
+
+        monkeypatch.setattr(
+            relationships_module,
+            'path_to_relationships',
+            spy
+        )
+        query_builder.select(article_cls, include=['comments.author'])
+        assert not [path for path in resolved_paths if '.' in path]
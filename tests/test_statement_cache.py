@@ -0,0 +1,386 @@
+import gc
+import inspect
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import psycopg2
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.sql.compiler import SQLCompiler
+
+import sqlalchemy_json_api
+from sqlalchemy_json_api import (
+    compile_statement,
+    CompiledStatement,
+    get_metadata_hash,
+    QueryBuilder,
+    StatementCache
+)
+
+
+@pytest.fixture
+def statement_cache(query_builder):
+    return StatementCache(query_builder)
+
+
+class TestStatementCacheCompile(object):
+    def test_caches_compiled_statements(self, statement_cache, article_cls):
+        compiled = statement_cache.compile(
+            'select',
+            article_cls,
+            include=['comments']
+        )
+        assert statement_cache.compile(
+            'select',
+            article_cls,
+            include=['comments']
+        ) is compiled
+        assert statement_cache.compile('select', article_cls) is not compiled
+        assert statement_cache.stats == {'hits': 1, 'misses': 2, 'size': 2}
+
+    def test_offset_flag(self, statement_cache, article_cls):
+        compiled = statement_cache.compile('select', article_cls, offset=True)
+        assert 'page_offset' in compiled.params
+        assert statement_cache.compile(
+            'select',
+            article_cls,
+            offset=False
+        ) is statement_cache.compile('select', article_cls)
+
+    def test_select_one_id_parameter(self, statement_cache, article_cls):
+        compiled = statement_cache.compile('select_one', article_cls)
+        assert 'resource_id' in compiled.params
+
+    @pytest.mark.parametrize('key', ('from_obj', 'if_none_match'))
+    def test_unsupported_parameters(self, statement_cache, article_cls, key):
+        with pytest.raises(TypeError):
+            statement_cache.compile('select', article_cls, **{key: None})
+
+    def test_unknown_method(self, statement_cache, article_cls):
+        with pytest.raises(ValueError):
+            statement_cache.compile('select_related', article_cls)
+
+    def test_warm_up(self, statement_cache, article_cls, user_cls):
+        assert statement_cache.warm_up([
+            {'model': article_cls, 'include': ['comments'], 'limit': 20},
+            {'model': article_cls, 'include': ['comments'], 'limit': 20},
+            {'method': 'select_one', 'model': user_cls, 'sort': None},
+        ]) == 2
+        assert statement_cache.stats['misses'] == 2
+        statement_cache.compile(
+            'select',
+            article_cls,
+            include=['comments'],
+            limit=20
+        )
+        assert statement_cache.stats['hits'] == 2
+
+    @pytest.mark.skipif(
+        not hasattr(gc, 'freeze'),
+        reason='gc.freeze requires Python 3.7+'
+    )
+    def test_warm_up_freeze(self, statement_cache, article_cls):
+        try:
+            statement_cache.warm_up([{'model': article_cls}], freeze=True)
+            assert gc.get_freeze_count() > 0
+        finally:
+            gc.unfreeze()
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestStatementCacheExecute(object):
+    def test_select(self, session, query_builder, statement_cache, user_cls):
+        for offset in (None, 1, 3):
+            row = statement_cache.select(
+                session,
+                user_cls,
+                sort=['id'],
+                limit=2,
+                offset=offset,
+                fields={'users': ['name']}
+            )
+            assert row[0] == session.execute(
+                query_builder.select(
+                    user_cls,
+                    sort=['id'],
+                    limit=2,
+                    offset=offset,
+                    fields={'users': ['name']}
+                )
+            ).scalar()
+        assert statement_cache.stats['size'] == 2
+
+    def test_select_one(self, session, statement_cache, article_cls):
+        row = statement_cache.select_one(
+            session,
+            article_cls,
+            1,
+            include=['comments'],
+            fields={'articles': ['name'], 'comments': ['content']}
+        )
+        assert row[0]['data']['id'] == '1'
+        assert len(row[0]['included']) == 4
+        assert statement_cache.select_one(
+            session,
+            article_cls,
+            2,
+            include=['comments'],
+            fields={'articles': ['name'], 'comments': ['content']}
+        ) is None
+        assert statement_cache.stats['size'] == 1
+
+    def test_etag(self, session, statement_cache, article_cls):
+        row = statement_cache.select_one(session, article_cls, 1, etag=True)
+        assert len(row) == 2
+
+
+@pytest.fixture
+def cache_path(tmpdir):
+    return str(tmpdir.join('statements.json'))
+
+
+class TestGetMetadataHash(object):
+    def test_stable(self, query_builder, model_mapping):
+        assert get_metadata_hash(query_builder) == get_metadata_hash(
+            QueryBuilder(model_mapping)
+        )
+
+    def test_query_builder_options(self, query_builder, model_mapping):
+        assert get_metadata_hash(query_builder) != get_metadata_hash(
+            QueryBuilder(model_mapping, base_url='/')
+        )
+
+    def test_model_mapping(self, query_builder, model_mapping):
+        model_mapping = dict(model_mapping)
+        del model_mapping['organizations']
+        assert get_metadata_hash(query_builder) != get_metadata_hash(
+            QueryBuilder(model_mapping)
+        )
+
+    def test_hybrid_expression(self):
+        def build_model(expression):
+            class Article(declarative_base()):
+                __tablename__ = 'article'
+                id = sa.Column(sa.Integer, primary_key=True)
+                name = sa.Column(sa.String)
+
+                @hybrid_property
+                def display_name(self):
+                    return self.name
+
+                @display_name.expression
+                def display_name(cls):
+                    return expression(cls.name)
+
+            return Article
+
+        assert get_metadata_hash(
+            QueryBuilder({'articles': build_model(sa.func.upper)})
+        ) != get_metadata_hash(
+            QueryBuilder({'articles': build_model(sa.func.lower)})
+        )
+
+    def test_type_formatter(self, model_mapping):
+        def format_datetime(column):
+            return sa.func.to_char(column, 'YYYY-MM-DD')
+
+        other_formatter = format_datetime
+
+        def format_datetime(column):
+            return sa.func.to_char(column, 'DD.MM.YYYY')
+
+        assert get_metadata_hash(QueryBuilder(
+            model_mapping,
+            type_formatters={sa.DateTime: other_formatter}
+        )) != get_metadata_hash(QueryBuilder(
+            model_mapping,
+            type_formatters={sa.DateTime: format_datetime}
+        ))
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestStatementCacheFile(object):
+    def test_save_and_load(
+        self,
+        session,
+        query_builder,
+        cache_path,
+        article_cls
+    ):
+        statement_cache = StatementCache(query_builder, path=cache_path)
+        statement_cache.warm_up([
+            {'method': 'select_one', 'model': article_cls},
+            {'model': article_cls, 'include': ['comments'], 'offset': True},
+        ])
+        assert statement_cache.save() == 2
+
+        loaded_cache = StatementCache(query_builder, path=cache_path)
+        assert loaded_cache.stats['size'] == 2
+        compiled = loaded_cache.compile('select_one', article_cls)
+        assert isinstance(compiled, CompiledStatement)
+        assert loaded_cache.stats['misses'] == 0
+
+        assert loaded_cache.select_one(session, article_cls, 1) == (
+            statement_cache.select_one(session, article_cls, 1)
+        )
+        assert loaded_cache.select(
+            session,
+            article_cls,
+            include=['comments'],
+            offset=1
+        ) == statement_cache.select(
+            session,
+            article_cls,
+            include=['comments'],
+            offset=1
+        )
+
+    @pytest.mark.parametrize(
+        ('key', 'type_'),
+        (('as_text', str), ('as_bytes', bytes))
+    )
+    def test_raw_json(
+        self,
+        session,
+        query_builder,
+        cache_path,
+        article_cls,
+        key,
+        type_
+    ):
+        statement_cache = StatementCache(query_builder, path=cache_path)
+        expected = statement_cache.select_one(
+            session,
+            article_cls,
+            1,
+            **{key: True}
+        )
+        statement_cache.save()
+        row = StatementCache(query_builder, path=cache_path).select_one(
+            session,
+            article_cls,
+            1,
+            **{key: True}
+        )
+        assert isinstance(row[0], type_)
+        assert row == expected
+
+    def test_metadata_change_invalidates(
+        self,
+        query_builder,
+        model_mapping,
+        cache_path,
+        article_cls
+    ):
+        statement_cache = StatementCache(query_builder, path=cache_path)
+        statement_cache.compile('select', article_cls)
+        statement_cache.save()
+        loaded_cache = StatementCache(
+            QueryBuilder(model_mapping, base_url='/'),
+            path=cache_path
+        )
+        assert loaded_cache.stats['size'] == 0
+
+    def test_version_change_invalidates(
+        self,
+        monkeypatch,
+        query_builder,
+        cache_path,
+        article_cls
+    ):
+        statement_cache = StatementCache(query_builder, path=cache_path)
+        statement_cache.compile('select', article_cls)
+        statement_cache.save()
+        monkeypatch.setattr(sqlalchemy_json_api, '__version__', '0.0.0')
+        assert StatementCache(
+            query_builder,
+            path=cache_path
+        ).stats['size'] == 0
+
+    @pytest.mark.parametrize('content', ('', '{"key": []', '[]'))
+    def test_invalid_file(self, query_builder, cache_path, content):
+        with open(cache_path, 'w') as file:
+            file.write(content)
+        assert StatementCache(
+            query_builder,
+            path=cache_path
+        ).stats['size'] == 0
+
+    def test_missing_file(self, query_builder, cache_path):
+        assert StatementCache(
+            query_builder,
+            path=cache_path
+        ).stats['size'] == 0
+
+
+@pytest.mark.usefixtures('table_creator', 'dataset')
+class TestCompactStatements(object):
+    @pytest.mark.parametrize(
+        'kwargs',
+        (
+            {},
+            {'include': ['author', 'comments.author', 'category']},
+            {'fields': {'articles': ['name', 'comments']}, 'sort': ['-id']},
+        )
+    )
+    def test_same_document(self, session, query_builder, article_cls, kwargs):
+        query = query_builder.select(article_cls, **kwargs)
+        dialect = session.bind.dialect
+        compiled = compile_statement(query, dialect)
+        compact = compile_statement(query, dialect, compact=True)
+        assert len(compact.string) < len(compiled.string)
+        assert 'anon_' not in compact.string
+        connection = session.connection()
+        assert connection.execute(compact).scalar() == (
+            connection.execute(compiled).scalar()
+        )
+
+    def test_truncated_identifier_signature(self):
+        # CompactCompilerMixin overrides this private SQLCompiler method.
+        assert inspect.getfullargspec(
+            SQLCompiler._truncated_identifier
+        ).args == ['self', 'ident_class', 'name']
+
+    def test_compact_names(self, article_cls):
+        alias = sa.orm.aliased(article_cls)
+        query = sa.select([
+            sa.func.upper(alias.name),
+            sa.func.lower(alias.name)
+        ])
+        assert str(
+            compile_statement(query, psycopg2.dialect(), compact=True)
+        ) == (
+            'SELECT upper(_a1.name) AS _c1, lower(_a1.name) AS _c2 \n'
+            'FROM article AS _a1'
+        )
+
+    def test_deterministic_names(self, query_builder, article_cls):
+        strings = set(
+            compile_statement(
+                query_builder.select(article_cls, include=['comments']),
+                psycopg2.dialect(),
+                compact=True
+            ).string
+            for _ in range(2)
+        )
+        assert len(strings) == 1
+
+    def test_statement_cache(self, session, query_builder, article_cls):
+        statement_cache = StatementCache(query_builder, compact=True)
+        assert statement_cache.select_one(
+            session,
+            article_cls,
+            1,
+            include=['comments']
+        ) == StatementCache(query_builder).select_one(
+            session,
+            article_cls,
+            1,
+            include=['comments']
+        )
+        compiled = statement_cache.compile(
+            'select_one',
+            article_cls,
+            include=['comments']
+        )
+        assert 'resource_id' in compiled.params
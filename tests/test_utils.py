@@ -1,6 +1,9 @@
+import json
+
 import pytest
 
-from sqlalchemy_json_api import assert_json_document
+from sqlalchemy_json_api import assert_json_document, splice_members
+from sqlalchemy_json_api.utils import s
 
 
 @pytest.mark.parametrize(
@@ -41,3 +44,53 @@ from sqlalchemy_json_api import assert_json_document
 )
 def test_assert_json_document_for_matching_documents(value, expected):
     assert_json_document(value, expected)
+
+
+@pytest.mark.parametrize(
+    ('document', 'members', 'dumps', 'expected'),
+    (
+        (
+            '{"data": []}',
+            {'meta': {'total': 0}},
+            json.dumps,
+            '{"data": [],"meta": {"total": 0}}'
+        ),
+        (
+            b'{"data":null}',
+            {'jsonapi': {'version': '1.0'}},
+            json.dumps,
+            b'{"data":null,"jsonapi": {"version": "1.0"}}'
+        ),
+        (
+            '{"data":null}',
+            {'meta': {}},
+            lambda value: json.dumps(value).encode('utf-8'),
+            '{"data":null,"meta": {}}'
+        ),
+        ('{"data":null}', {}, json.dumps, '{"data":null}'),
+        (None, {'meta': {}}, json.dumps, None),
+    )
+)
+def test_splice_members(document, members, dumps, expected):
+    assert splice_members(document, members, dumps=dumps) == expected
+
+
+class TestLiteralClauses(object):
+    def test_interned_literal(self):
+        assert s('data') is s('data')
+        assert str(s('data')) == "'data'"
+
+    def test_unknown_literal(self):
+        assert s('page[offset]=10') is not s('page[offset]=10')
+        assert str(s('page[offset]=10')) == "'page[offset]=10'"
+
+    def test_registry_literals(self, query_builder):
+        for value in (
+            'articles',
+            'name_upper',
+            'comment_count',
+            'comments',
+            '/relationships/comments',
+        ):
+            assert value in query_builder.get_literal_values()
+            assert s(value) is s(value)